@@ -25,6 +25,14 @@ from vyper.interfaces import ERC20
 PRECISION: constant(uint256) = 10**18
 PERCENTAGE_BASE: constant(uint256) = 10000 # == 100%
 
+MAX_LIQUIDATION_BATCH_SIZE: constant(uint256) = 64
+MAX_TRADES_PAGE_SIZE: constant(uint256) = 32
+MAX_TRADE_SUMMARIES_PAGE_SIZE: constant(uint256) = 512
+MAX_CONDITIONAL_ORDERS: constant(uint256) = 8
+MAX_PURGE_BATCH_SIZE: constant(uint256) = 256
+# bit offset of StopLoss orders in executed_orders
+SL_EXECUTED_OFFSET: constant(uint256) = 8
+
 
 
 # VAULT
@@ -40,6 +48,7 @@ interface Vault:
     def close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256: nonpayable
     def reduce_position(_position_uid: bytes32, _reduce_by_amount: uint256, _min_amount_out: uint256) -> uint256: nonpayable
     def liquidate(_position_uid: bytes32): nonpayable
+    def liquidate_many(_position_uids: DynArray[bytes32, MAX_LIQUIDATION_BATCH_SIZE]) -> DynArray[bool, MAX_LIQUIDATION_BATCH_SIZE]: nonpayable
     def is_enabled_market(_token1: address, _token2: address) -> bool: view
     def debt(_position_uid: bytes32) -> uint256: view
     def position_amount(_position_uid: bytes32) -> uint256: view
@@ -73,6 +82,22 @@ struct Trade:
     tp_orders: DynArray[TakeProfitOrder, 8]
     sl_orders: DynArray[StopLossOrder, 8]
 
+# TP/SL orders as stored, their executed flags are kept in executed_orders
+struct StoredTpOrder:
+    reduce_by_amount: uint256
+    min_amount_out: uint256
+
+struct StoredSlOrder:
+    trigger_price: uint256
+    reduce_by_amount: uint256
+
+struct TradeSummary:
+    uid: bytes32
+    account: address
+    vault_position_uid: bytes32
+    tp_order_count: uint256
+    sl_order_count: uint256
+
 struct LimitOrder:
     uid: bytes32
     account: address
@@ -90,12 +115,22 @@ struct LimitOrder:
 limit_orders: public(HashMap[bytes32, LimitOrder])
 # account -> LimitOrder
 limit_order_uids: public(HashMap[address, DynArray[bytes32, 1024]])
+# LimitOrder.uid -> index in limit_order_uids
+limit_order_uid_index: HashMap[bytes32, uint256]
 
 uid_nonce: uint256
 # account -> Trade.uid
 trades_by_account: public(HashMap[address, DynArray[bytes32, 1024]])
-# uid -> Trade
-open_trades: public(HashMap[bytes32, Trade])
+# Trade.uid -> index in trades_by_account
+trade_uid_index: HashMap[bytes32, uint256]
+# uid -> Trade without its TP/SL orders
+trades: HashMap[bytes32, TradeSummary]
+# Trade.uid -> index -> TakeProfitOrder
+tp_orders: HashMap[bytes32, HashMap[uint256, StoredTpOrder]]
+# Trade.uid -> index -> StopLossOrder
+sl_orders: HashMap[bytes32, HashMap[uint256, StoredSlOrder]]
+# Trade.uid -> bitmap of executed TP (bits 0-7) and SL (bits 8-15) orders
+executed_orders: HashMap[bytes32, uint256]
 
 # owner -> delegate accounts
 is_delegate: public(HashMap[address, HashMap[address, bool]])
@@ -103,6 +138,20 @@ is_delegate: public(HashMap[address, HashMap[address, bool]])
 admin: public(address)
 suggested_admin: public(address)
 
+# escrowed from the poster of every LimitOrder, returned once the
+# order is executed or cancelled and paid to the caller of
+# purge_expired once it expired
+purge_rebate_token: public(address)
+purge_rebate_per_order: public(uint256)
+
+struct PurgeDeposit:
+    payer: address
+    token: address
+    amount: uint256
+
+# LimitOrder uid -> deposit escrowed when the order was posted
+purge_deposits: public(HashMap[bytes32, PurgeDeposit])
+
 is_accepting_new_orders: public(bool)
 
 
@@ -185,26 +234,31 @@ def _open_trade(
         _margin_amount,
     )
 
-    trade: Trade = Trade(
+    self.trades[position_uid] = TradeSummary(
         {
             uid: position_uid,
             account: _account,
             vault_position_uid: position_uid,
-            tp_orders: _tp_orders,
-            sl_orders: _sl_orders,
+            tp_order_count: 0,
+            sl_order_count: 0,
         }
     )
+    for tp_order in _tp_orders:
+        self._add_tp_order(position_uid, tp_order)
+    for sl_order in _sl_orders:
+        self._add_sl_order(position_uid, sl_order)
 
-    self.open_trades[position_uid] = trade
+    self.trade_uid_index[position_uid] = len(self.trades_by_account[_account])
     self.trades_by_account[_account].append(position_uid)
 
+    trade: Trade = self._trade(position_uid)
     log TradeOpened(_account, position_uid, trade)
     return trade
 
 
 @external
 def close_trade(_trade_uid: bytes32, _min_amount_out: uint256) -> uint256:
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
 
     return self._full_close(trade, _min_amount_out)
@@ -218,7 +272,7 @@ event TradeClosed:
 
 @nonreentrant("lock")
 @internal
-def _full_close(_trade: Trade, _min_amount_out: uint256) -> uint256:
+def _full_close(_trade: TradeSummary, _min_amount_out: uint256) -> uint256:
     """
     @notice
         Completely closes the underlying Vault Position, repays all debt
@@ -229,19 +283,30 @@ def _full_close(_trade: Trade, _min_amount_out: uint256) -> uint256:
         _trade.vault_position_uid, _min_amount_out
     )
 
-    # cleanup trade
-    self.open_trades[_trade.uid] = empty(Trade)
-    uids: DynArray[bytes32, 1024] = self.trades_by_account[_trade.account]
-    for i in range(1024):
-        if uids[i] == _trade.uid:
-            uids[i] = uids[len(uids) - 1]
-            uids.pop()
+    # cleanup trade, the TP/SL orders up to their stored counts
+    trade: Trade = self._trade(_trade.uid)
+    for i in range(MAX_CONDITIONAL_ORDERS):
+        if i == len(trade.tp_orders):
             break
-        if i == len(uids) - 1:
-            raise
-    self.trades_by_account[_trade.account] = uids
-
-    log TradeClosed(_trade.account, _trade.uid, _trade, amount_out_received)
+        self.tp_orders[_trade.uid][i] = empty(StoredTpOrder)
+    for i in range(MAX_CONDITIONAL_ORDERS):
+        if i == len(trade.sl_orders):
+            break
+        self.sl_orders[_trade.uid][i] = empty(StoredSlOrder)
+    self.trades[_trade.uid] = empty(TradeSummary)
+    self.executed_orders[_trade.uid] = 0
+
+    # swap the last uid into the removed slot and pop
+    index: uint256 = self.trade_uid_index[_trade.uid]
+    last_index: uint256 = len(self.trades_by_account[_trade.account]) - 1
+    if index != last_index:
+        last_uid: bytes32 = self.trades_by_account[_trade.account][last_index]
+        self.trades_by_account[_trade.account][index] = last_uid
+        self.trade_uid_index[last_uid] = index
+    self.trades_by_account[_trade.account].pop()
+    self.trade_uid_index[_trade.uid] = 0
+
+    log TradeClosed(_trade.account, _trade.uid, trade, amount_out_received)
     return amount_out_received
 
 
@@ -256,14 +321,14 @@ event TradeReduced:
 def partial_close_trade(
     _trade_uid: bytes32, _reduce_by_amount: uint256, _min_amount_out: uint256
 ):
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
     self._partial_close(trade, _reduce_by_amount, _min_amount_out)
 
 
 @internal
 def _partial_close(
-    _trade: Trade, _reduce_by_amount: uint256, _min_amount_out: uint256
+    _trade: TradeSummary, _reduce_by_amount: uint256, _min_amount_out: uint256
 ) -> uint256:
     """
     @notice
@@ -274,7 +339,7 @@ def _partial_close(
         _trade.vault_position_uid, _reduce_by_amount, _min_amount_out
     )
 
-    log TradeReduced(_trade.account, _trade.uid, _trade, amount_out_received)
+    log TradeReduced(_trade.account, _trade.uid, self._trade(_trade.uid), amount_out_received)
     return amount_out_received
 
 
@@ -285,11 +350,113 @@ def get_all_open_trades(_account: address) -> DynArray[Trade, 1024]:
     trades: DynArray[Trade, 1024] = empty(DynArray[Trade, 1024])
 
     for uid in uids:
-        trades.append(self.open_trades[uid])
+        trades.append(self._trade(uid))
 
     return trades
 
 
+@view
+@external
+def open_trades_count(_account: address) -> uint256:
+    return len(self.trades_by_account[_account])
+
+
+@view
+@external
+def get_open_trades(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[Trade, MAX_TRADES_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit open trades of _account
+        starting at _offset.
+        The order changes when trades are closed.
+    """
+    count: uint256 = len(self.trades_by_account[_account])
+    trades: DynArray[Trade, MAX_TRADES_PAGE_SIZE] = []
+    for i in range(MAX_TRADES_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        trades.append(self._trade(self.trades_by_account[_account][_offset + i]))
+    return trades
+
+
+@view
+@external
+def get_open_trade_summaries(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[TradeSummary, MAX_TRADE_SUMMARIES_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit open trades of _account starting
+        at _offset without their TP/SL orders.
+    """
+    count: uint256 = len(self.trades_by_account[_account])
+    summaries: DynArray[TradeSummary, MAX_TRADE_SUMMARIES_PAGE_SIZE] = []
+    for i in range(MAX_TRADE_SUMMARIES_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        summaries.append(self.trades[self.trades_by_account[_account][_offset + i]])
+    return summaries
+
+
+@view
+@external
+def open_trades(_trade_uid: bytes32) -> Trade:
+    return self._trade(_trade_uid)
+
+
+@view
+@internal
+def _trade(_trade_uid: bytes32) -> Trade:
+    """
+    @notice
+        Assembles a Trade from its stored summary, its
+        TP/SL orders and the executed orders bitmap.
+    """
+    summary: TradeSummary = self.trades[_trade_uid]
+    executed: uint256 = self.executed_orders[_trade_uid]
+    trade: Trade = Trade(
+        {
+            uid: summary.uid,
+            account: summary.account,
+            vault_position_uid: summary.vault_position_uid,
+            tp_orders: [],
+            sl_orders: [],
+        }
+    )
+
+    for i in range(MAX_CONDITIONAL_ORDERS):
+        if i == summary.tp_order_count:
+            break
+        tp_order: StoredTpOrder = self.tp_orders[_trade_uid][i]
+        trade.tp_orders.append(
+            TakeProfitOrder(
+                {
+                    reduce_by_amount: tp_order.reduce_by_amount,
+                    min_amount_out: tp_order.min_amount_out,
+                    executed: (executed >> i) & 1 == 1,
+                }
+            )
+        )
+
+    for i in range(MAX_CONDITIONAL_ORDERS):
+        if i == summary.sl_order_count:
+            break
+        sl_order: StoredSlOrder = self.sl_orders[_trade_uid][i]
+        trade.sl_orders.append(
+            StopLossOrder(
+                {
+                    trigger_price: sl_order.trigger_price,
+                    reduce_by_amount: sl_order.reduce_by_amount,
+                    executed: (executed >> (SL_EXECUTED_OFFSET + i)) & 1 == 1,
+                }
+            )
+        )
+
+    return trade
+
+
 @external
 def swap_margin(
     _account: address,
@@ -332,19 +499,33 @@ def add_tp_order(_trade_uid: bytes32, _tp_order: TakeProfitOrder):
     @notice
         Adds a new TakeProfit order to an already open trade.
     """
-    trade: Trade = self.open_trades[_trade_uid]
-    assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
+    account: address = self.trades[_trade_uid].account
+    assert (account == msg.sender) or self.is_delegate[account][msg.sender], "unauthorized"
     assert self.is_accepting_new_orders, "paused"
 
     assert _tp_order.reduce_by_amount > 0, "amount must be set"
 
+    tp_order: TakeProfitOrder = self._add_tp_order(_trade_uid, _tp_order)
+
+    log TpOrderAdded(_trade_uid, tp_order)
+
+
+@internal
+def _add_tp_order(_trade_uid: bytes32, _tp_order: TakeProfitOrder) -> TakeProfitOrder:
+    index: uint256 = self.trades[_trade_uid].tp_order_count
+    assert index < MAX_CONDITIONAL_ORDERS, "too many orders"
+
     tp_order: TakeProfitOrder = _tp_order
     tp_order.executed = False
-    trade.tp_orders.append(tp_order)
-
-    self.open_trades[_trade_uid] = trade
+    self.tp_orders[_trade_uid][index] = StoredTpOrder(
+        {
+            reduce_by_amount: tp_order.reduce_by_amount,
+            min_amount_out: tp_order.min_amount_out,
+        }
+    )
+    self.trades[_trade_uid].tp_order_count = index + 1
 
-    log TpOrderAdded(_trade_uid, tp_order)
+    return tp_order
 
 
 @external
@@ -353,19 +534,33 @@ def add_sl_order(_trade_uid: bytes32, _sl_order: StopLossOrder):
     @notice
         Adds a new StopLoss order to an already open trade.
     """
-    trade: Trade = self.open_trades[_trade_uid]
-    assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
+    account: address = self.trades[_trade_uid].account
+    assert (account == msg.sender) or self.is_delegate[account][msg.sender], "unauthorized"
     assert self.is_accepting_new_orders, "paused"
 
     assert _sl_order.reduce_by_amount > 0, "amount must be set"
 
+    sl_order: StopLossOrder = self._add_sl_order(_trade_uid, _sl_order)
+
+    log SlOrderAdded(_trade_uid, sl_order)
+
+
+@internal
+def _add_sl_order(_trade_uid: bytes32, _sl_order: StopLossOrder) -> StopLossOrder:
+    index: uint256 = self.trades[_trade_uid].sl_order_count
+    assert index < MAX_CONDITIONAL_ORDERS, "too many orders"
+
     sl_order: StopLossOrder = _sl_order
     sl_order.executed = False
-    trade.sl_orders.append(sl_order)
-
-    self.open_trades[_trade_uid] = trade
+    self.sl_orders[_trade_uid][index] = StoredSlOrder(
+        {
+            trigger_price: sl_order.trigger_price,
+            reduce_by_amount: sl_order.reduce_by_amount,
+        }
+    )
+    self.trades[_trade_uid].sl_order_count = index + 1
 
-    log SlOrderAdded(_trade_uid, sl_order)
+    return sl_order
 
 
 event TpExecuted:
@@ -383,15 +578,13 @@ def execute_tp_order(_trade_uid: bytes32, _tp_order_index: uint8):
         The specified min_amount_out ensures TakeProfit orders
         are only executed when intended.
     """
-    trade: Trade = self.open_trades[_trade_uid]
-
-    tp_order: TakeProfitOrder = trade.tp_orders[_tp_order_index]
+    trade: TradeSummary = self.trades[_trade_uid]
 
-    assert tp_order.executed == False, "order already executed"
+    index: uint256 = convert(_tp_order_index, uint256)
+    assert index < trade.tp_order_count, "invalid order index"
+    tp_order: StoredTpOrder = self.tp_orders[_trade_uid][index]
 
-    tp_order.executed = True
-    trade.tp_orders[_tp_order_index] = tp_order
-    self.open_trades[_trade_uid] = trade
+    self._mark_executed(_trade_uid, index)
 
     position_amount: uint256 = Vault(self.vault).position_amount(
         trade.vault_position_uid
@@ -422,19 +615,18 @@ def execute_sl_order(_trade_uid: bytes32, _sl_order_index: uint8):
         The specified trigger_price and Chainlink based current_exchange_rate 
         ensures orders are only executed when intended.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
 
-    sl_order: StopLossOrder = trade.sl_orders[_sl_order_index]
+    index: uint256 = convert(_sl_order_index, uint256)
+    assert index < trade.sl_order_count, "invalid order index"
+    sl_order: StoredSlOrder = self.sl_orders[_trade_uid][index]
 
     current_exchange_rate: uint256 = Vault(self.vault).current_exchange_rate(
         trade.vault_position_uid
     )
     assert sl_order.trigger_price >= current_exchange_rate, "trigger price not reached"
-    assert sl_order.executed == False, "order already executed"
 
-    sl_order.executed = True
-    trade.sl_orders[_sl_order_index] = sl_order
-    self.open_trades[_trade_uid] = trade
+    self._mark_executed(_trade_uid, SL_EXECUTED_OFFSET + index)
 
     position_amount: uint256 = Vault(self.vault).position_amount(
         trade.vault_position_uid
@@ -449,6 +641,13 @@ def execute_sl_order(_trade_uid: bytes32, _sl_order_index: uint8):
     log SlExecuted(_trade_uid, sl_order.reduce_by_amount, amount_out_received)
 
 
+@internal
+def _mark_executed(_trade_uid: bytes32, _bit: uint256):
+    executed: uint256 = self.executed_orders[_trade_uid]
+    assert (executed >> _bit) & 1 == 0, "order already executed"
+    self.executed_orders[_trade_uid] = executed | (1 << _bit)
+
+
 event TpRemoved:
     trade: Trade
 
@@ -459,16 +658,21 @@ def cancel_tp_order(_trade_uid: bytes32, _tp_order_index: uint8):
     @notice
         Removes a pending TakeProfit order.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
 
-    if len(trade.tp_orders) > 1:
-        trade.tp_orders[_tp_order_index] = trade.tp_orders[len(trade.tp_orders) - 1]
+    index: uint256 = convert(_tp_order_index, uint256)
+    assert index < trade.tp_order_count, "invalid order index"
 
-    trade.tp_orders.pop()
-    self.open_trades[_trade_uid] = trade
+    # swap the last order into the removed slot and pop
+    last_index: uint256 = trade.tp_order_count - 1
+    if index != last_index:
+        self.tp_orders[_trade_uid][index] = self.tp_orders[_trade_uid][last_index]
+    self.tp_orders[_trade_uid][last_index] = empty(StoredTpOrder)
+    self.trades[_trade_uid].tp_order_count = last_index
+    self._remove_executed_bit(_trade_uid, index, last_index)
 
-    log TpRemoved(trade)
+    log TpRemoved(self._trade(_trade_uid))
 
 
 event SlRemoved:
@@ -481,16 +685,36 @@ def cancel_sl_order(_trade_uid: bytes32, _sl_order_index: uint8):
     @notice
         Removes a pending StopLoss order.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
 
-    if len(trade.sl_orders) > 1:
-        trade.sl_orders[_sl_order_index] = trade.sl_orders[len(trade.sl_orders) - 1]
+    index: uint256 = convert(_sl_order_index, uint256)
+    assert index < trade.sl_order_count, "invalid order index"
+
+    # swap the last order into the removed slot and pop
+    last_index: uint256 = trade.sl_order_count - 1
+    if index != last_index:
+        self.sl_orders[_trade_uid][index] = self.sl_orders[_trade_uid][last_index]
+    self.sl_orders[_trade_uid][last_index] = empty(StoredSlOrder)
+    self.trades[_trade_uid].sl_order_count = last_index
+    self._remove_executed_bit(
+        _trade_uid, SL_EXECUTED_OFFSET + index, SL_EXECUTED_OFFSET + last_index
+    )
 
-    trade.sl_orders.pop()
-    self.open_trades[_trade_uid] = trade
+    log SlRemoved(self._trade(_trade_uid))
 
-    log SlRemoved(trade)
+
+@internal
+def _remove_executed_bit(_trade_uid: bytes32, _bit: uint256, _last_bit: uint256):
+    """
+    @notice
+        Moves the executed flag of the last order into the
+        removed orders bit and clears the last bit.
+    """
+    executed: uint256 = self.executed_orders[_trade_uid]
+    last_flag: uint256 = (executed >> _last_bit) & 1
+    executed = (executed & ~(1 << _bit)) | (last_flag << _bit)
+    self.executed_orders[_trade_uid] = executed & ~(1 << _last_bit)
 
 
 #####################################
@@ -535,6 +759,7 @@ def post_limit_order(
     assert _debt_amount > _margin_amount, "invalid debt amount"
 
     uid: bytes32 = self._generate_uid()
+    self._escrow_purge_deposit(uid)
 
     limit_order: LimitOrder = LimitOrder(
         {
@@ -552,6 +777,7 @@ def post_limit_order(
     )
 
     self.limit_orders[uid] = limit_order
+    self.limit_order_uid_index[uid] = len(self.limit_order_uids[_account])
     self.limit_order_uids[_account].append(uid)
 
     amount_in: uint256 = _margin_amount + _debt_amount
@@ -591,6 +817,7 @@ def execute_limit_order(_uid: bytes32):
     )
 
     self._remove_limit_order(_uid)
+    self._release_purge_deposit(_uid)
 
     log LimitOrderExecuted(trade.account, trade)
 
@@ -610,24 +837,103 @@ def cancel_limit_order(_uid: bytes32):
     assert (order.account == msg.sender) or self.is_delegate[order.account][msg.sender], "unauthorized"
 
     self._remove_limit_order(_uid)
+    self._release_purge_deposit(_uid)
 
     log LimitOrderCancelled(order.account, _uid)
 
 
 @internal
 def _remove_limit_order(_uid: bytes32):
-    order: LimitOrder = self.limit_orders[_uid]
+    account: address = self.limit_orders[_uid].account
     self.limit_orders[_uid] = empty(LimitOrder)
 
-    uids: DynArray[bytes32, 1024] = self.limit_order_uids[order.account]
-    for i in range(1024):
-        if uids[i] == _uid:
-            uids[i] = uids[len(uids) - 1]
-            uids.pop()
-            break
-        if i == len(uids) - 1:
-            raise
-    self.limit_order_uids[order.account] = uids
+    # swap the last uid into the removed slot and pop
+    index: uint256 = self.limit_order_uid_index[_uid]
+    last_index: uint256 = len(self.limit_order_uids[account]) - 1
+    if index != last_index:
+        last_uid: bytes32 = self.limit_order_uids[account][last_index]
+        self.limit_order_uids[account][index] = last_uid
+        self.limit_order_uid_index[last_uid] = index
+    self.limit_order_uids[account].pop()
+    self.limit_order_uid_index[_uid] = 0
+
+
+event ExpiredLimitOrdersPurged:
+    uids: DynArray[bytes32, MAX_PURGE_BATCH_SIZE]
+    caller: indexed(address)
+    rebate: uint256
+
+
+@nonreentrant("lock")
+@external
+def purge_expired(_uids: DynArray[bytes32, MAX_PURGE_BATCH_SIZE]) -> uint256:
+    """
+    @notice
+        Removes LimitOrders past their valid_until, anyone may
+        call this. Unknown and not yet expired orders are skipped.
+        The caller receives the purge deposits escrowed by the
+        posters of the purged orders, purging own orders only
+        returns the deposit that was paid to post them.
+        Returns the number of purged orders.
+    """
+    rebate_token: address = self.purge_rebate_token
+    purged: DynArray[bytes32, MAX_PURGE_BATCH_SIZE] = []
+    rebate: uint256 = 0
+    for uid in _uids:
+        if self.limit_orders[uid].account == empty(address):
+            continue
+        if self.limit_orders[uid].valid_until >= block.timestamp:
+            continue
+        self._remove_limit_order(uid)
+        purged.append(uid)
+
+        if self.purge_deposits[uid].amount == 0:
+            continue
+        deposit: PurgeDeposit = self.purge_deposits[uid]
+        self.purge_deposits[uid] = empty(PurgeDeposit)
+        if deposit.token == rebate_token:
+            rebate += deposit.amount
+        else:
+            # escrowed before the rebate token was changed
+            assert ERC20(deposit.token).transfer(
+                msg.sender, deposit.amount, default_return_value=True
+            ), "transfer failed"
+
+    if rebate > 0:
+        assert ERC20(rebate_token).transfer(
+            msg.sender, rebate, default_return_value=True
+        ), "transfer failed"
+
+    log ExpiredLimitOrdersPurged(purged, msg.sender, rebate)
+    return len(purged)
+
+
+@internal
+def _escrow_purge_deposit(_uid: bytes32):
+    token: address = self.purge_rebate_token
+    amount: uint256 = self.purge_rebate_per_order
+    if token == empty(address) or amount == 0:
+        return
+
+    assert ERC20(token).transferFrom(
+        msg.sender, self, amount, default_return_value=True
+    ), "transfer failed"
+    self.purge_deposits[_uid] = PurgeDeposit(
+        {payer: msg.sender, token: token, amount: amount}
+    )
+
+
+@internal
+def _release_purge_deposit(_uid: bytes32):
+    amount: uint256 = self.purge_deposits[_uid].amount
+    if amount == 0:
+        return
+
+    deposit: PurgeDeposit = self.purge_deposits[_uid]
+    self.purge_deposits[_uid] = empty(PurgeDeposit)
+    assert ERC20(deposit.token).transfer(
+        deposit.payer, amount, default_return_value=True
+    ), "transfer failed"
 
 
 #####################################
@@ -652,8 +958,7 @@ def is_liquidatable(_trade_uid: bytes32) -> bool:
 @view
 @internal
 def _is_liquidatable(_trade_uid: bytes32) -> bool:
-    trade: Trade = self.open_trades[_trade_uid]
-    return Vault(self.vault).is_liquidatable(trade.vault_position_uid)
+    return Vault(self.vault).is_liquidatable(self.trades[_trade_uid].vault_position_uid)
 
 
 event Liquidation:
@@ -670,11 +975,39 @@ def liquidate(_trade_uid: bytes32):
         Allows to liquidate a Trade that exceeds the maximum
         allowed leverage.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: Trade = self._trade(_trade_uid)
     Vault(self.vault).liquidate(trade.vault_position_uid)
     log Liquidation(trade.account, _trade_uid, trade)
 
 
+@nonreentrant("lock")
+@external
+def liquidate_many(
+    _trade_uids: DynArray[bytes32, MAX_LIQUIDATION_BATCH_SIZE]
+) -> DynArray[bool, MAX_LIQUIDATION_BATCH_SIZE]:
+    """
+    @notice
+        Allows to liquidate multiple Trades that exceed the maximum
+        allowed leverage in a single transaction.
+        Trades that are not liquidatable are skipped.
+        Returns for each Trade whether it was liquidated.
+    """
+    position_uids: DynArray[bytes32, MAX_LIQUIDATION_BATCH_SIZE] = []
+    for uid in _trade_uids:
+        position_uids.append(self.trades[uid].vault_position_uid)
+
+    liquidated: DynArray[bool, MAX_LIQUIDATION_BATCH_SIZE] = Vault(self.vault).liquidate_many(position_uids)
+
+    for i in range(MAX_LIQUIDATION_BATCH_SIZE):
+        if i == len(_trade_uids):
+            break
+        if liquidated[i]:
+            trade: Trade = self._trade(_trade_uids[i])
+            log Liquidation(trade.account, _trade_uids[i], trade)
+
+    return liquidated
+
+
 #####################################
 #
 #     LEVERAGE & TRADE HEALTH
@@ -689,8 +1022,7 @@ def effective_leverage(_trade_uid: bytes32) -> uint256:
 @view
 @internal
 def _effective_leverage(_trade_uid: bytes32) -> uint256:
-    trade: Trade = self.open_trades[_trade_uid]
-    return Vault(self.vault).effective_leverage(trade.vault_position_uid)
+    return Vault(self.vault).effective_leverage(self.trades[_trade_uid].vault_position_uid)
 
 @external
 def add_margin(_trade_uid: bytes32, _amount: uint256):
@@ -699,7 +1031,7 @@ def add_margin(_trade_uid: bytes32, _amount: uint256):
         Allows traders to add additional margin to a Trades underlying
         Vault position and reduce the leverage.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
 
     Vault(self.vault).add_margin(trade.vault_position_uid, _amount)
@@ -712,7 +1044,7 @@ def remove_margin(_trade_uid: bytes32, _amount: uint256):
         Allows traders to remove excess margin from a Trades underlying
         Vault position and increase leverage.
     """
-    trade: Trade = self.open_trades[_trade_uid]
+    trade: TradeSummary = self.trades[_trade_uid]
     assert (trade.account == msg.sender) or self.is_delegate[trade.account][msg.sender], "unauthorized"
 
     Vault(self.vault).remove_margin(trade.vault_position_uid, _amount)
@@ -834,6 +1166,24 @@ def set_is_accepting_new_orders(_is_accepting_new_orders: bool):
     self.is_accepting_new_orders = _is_accepting_new_orders
 
 
+event PurgeRebateSet:
+    token: indexed(address)
+    amount_per_order: uint256
+
+@external
+def set_purge_rebate(_token: address, _amount_per_order: uint256):
+    """
+    @notice
+        Sets the deposit escrowed from the poster of every new
+        LimitOrder and paid to callers of purge_expired once it
+        expired. Orders posted before keep their deposit.
+    """
+    assert msg.sender == self.admin, "unauthorized"
+    self.purge_rebate_token = _token
+    self.purge_rebate_per_order = _amount_per_order
+    log PurgeRebateSet(_token, _amount_per_order)
+
+
 @external
 def set_vault(_vault: address):
     """
@@ -44,9 +44,19 @@ interface UniswapV3SwapRouter:
 
 UNISWAP_ROUTER: constant(address) = 0xE592427A0AEce92De3Edee1F18E0157C05861564
 
+# pre-encoded Uniswap path with the hops it was validated from
+struct Route:
+    path: Bytes[66]
+    tokens: DynArray[address, 3]
+    fees: DynArray[uint24, 2]
+
 # token_in -> token_out -> fee
 direct_route: public(HashMap[address, HashMap[address, uint24]])
-paths: public(HashMap[address, HashMap[address, Bytes[66]]])
+# route id -> Route, ids start at 1
+routes: public(HashMap[uint256, Route])
+route_count: public(uint256)
+# token_in -> token_out -> route id
+route_ids: public(HashMap[address, HashMap[address, uint256]])
 
 admin: public(address)
 
@@ -65,7 +75,9 @@ def swap(
     _min_amount_out: uint256,
 ) -> uint256:
     ERC20(_token_in).transferFrom(msg.sender, self, _amount_in)
-    ERC20(_token_in).approve(UNISWAP_ROUTER, _amount_in)
+    # standing allowance, only topped up once it no longer covers _amount_in
+    if ERC20(_token_in).allowance(self, UNISWAP_ROUTER) < _amount_in:
+        ERC20(_token_in).approve(UNISWAP_ROUTER, max_value(uint256))
 
     if self.direct_route[_token_in][_token_out] != 0:
         return self._direct_swap(_token_in, _token_out, _amount_in, _min_amount_out)
@@ -105,7 +117,7 @@ def _multi_hop_swap(
     _amount_in: uint256,
     _min_amount_out: uint256,
 ) -> uint256:
-    path: Bytes[66] = self.paths[_token_in][_token_out]
+    path: Bytes[66] = self.routes[self.route_ids[_token_in][_token_out]].path
     assert path != empty(Bytes[66]), "no path configured"
 
     uni_params: ExactInputParams = ExactInputParams(
@@ -120,6 +132,17 @@ def _multi_hop_swap(
     return UniswapV3SwapRouter(UNISWAP_ROUTER).exactInput(uni_params)
 
 
+@external
+def revoke_allowance(_token: address):
+    """
+    @notice
+        Emergency path to revoke the standing allowance
+        of the Uniswap router for _token.
+    """
+    assert msg.sender == self.admin, "unauthorized"
+    ERC20(_token).approve(UNISWAP_ROUTER, 0)
+
+
 @external
 def add_direct_route(_token1: address, _token2: address, _fee: uint24):
     assert msg.sender == self.admin, "unauthorized"
@@ -127,8 +150,89 @@ def add_direct_route(_token1: address, _token2: address, _fee: uint24):
     self.direct_route[_token2][_token1] = _fee
 
 
+event RouteAdded:
+    route_id: uint256
+    token_in: indexed(address)
+    token_out: indexed(address)
+    path: Bytes[66]
+
+
+@external
+def add_route(_tokens: DynArray[address, 3], _fees: DynArray[uint24, 2]) -> uint256:
+    """
+    @notice
+        Validates and encodes a Uniswap path once and registers
+        it as the route from _tokens[0] to the last token.
+        Executors refer to it by the returned route id.
+    """
+    assert msg.sender == self.admin, "unauthorized"
+    return self._add_route(_tokens, _fees)
+
+
 @external
 def add_path(_token1: address, _token2: address, _path_t1_to_t2: Bytes[66], _path_t2_to_t1: Bytes[66]):
+    """
+    @notice
+        Registers the encoded Uniswap paths between _token1 and
+        _token2 as the routes of both directions.
+        Each path is decoded into its hops and validated like
+        in add_route.
+    """
     assert msg.sender == self.admin, "unauthorized"
-    self.paths[_token1][_token2] = _path_t1_to_t2
-    self.paths[_token2][_token1] = _path_t2_to_t1
+    assert len(_path_t1_to_t2) in [43, 66] and len(_path_t2_to_t1) in [43, 66], "[path] invlid path"
+    self._add_encoded_path(_token1, _token2, _path_t1_to_t2)
+    self._add_encoded_path(_token2, _token1, _path_t2_to_t1)
+
+
+@internal
+def _add_encoded_path(_token_in: address, _token_out: address, _path: Bytes[66]):
+    tokens: DynArray[address, 3] = [convert(slice(_path, 0, 20), address)]
+    fees: DynArray[uint24, 2] = []
+    for i in range(2):
+        if 23 * i + 20 == len(_path):
+            break
+        fees.append(convert(convert(slice(_path, 23 * i + 20, 3), uint256), uint24))
+        tokens.append(convert(slice(_path, 23 * i + 23, 20), address))
+
+    assert tokens[0] == _token_in, "[path] invalid token_in"
+    assert tokens[len(tokens)-1] == _token_out, "[path] invalid token_out"
+    self._add_route(tokens, fees)
+
+
+@internal
+def _add_route(_tokens: DynArray[address, 3], _fees: DynArray[uint24, 2]) -> uint256:
+    assert len(_tokens) in [2, 3], "[path] invlid path"
+    assert len(_fees) == len(_tokens)-1, "[path] invalid fees"
+    for i in range(2):
+        if i == len(_fees):
+            break
+        assert _fees[i] != 0, "[path] invalid fees"
+        assert _tokens[i] != _tokens[i+1], "[path] invalid hop"
+
+    path: Bytes[66] = empty(Bytes[66])
+    if len(_tokens) == 2:
+        path = concat(convert(_tokens[0], bytes20), convert(_fees[0], bytes3), convert(_tokens[1], bytes20))
+    else:
+        path = concat(convert(_tokens[0], bytes20), convert(_fees[0], bytes3), convert(_tokens[1], bytes20), convert(_fees[1], bytes3), convert(_tokens[2], bytes20))
+
+    token_in: address = _tokens[0]
+    token_out: address = _tokens[len(_tokens)-1]
+    route_id: uint256 = self.route_count + 1
+    self.route_count = route_id
+    self.routes[route_id] = Route({path: path, tokens: _tokens, fees: _fees})
+    self.route_ids[token_in][token_out] = route_id
+
+    log RouteAdded(route_id, token_in, token_out, path)
+    return route_id
+
+
+@view
+@external
+def paths(_token_in: address, _token_out: address) -> Bytes[66]:
+    return self.routes[self.route_ids[_token_in][_token_out]].path
+
+
+@view
+@external
+def route_path(_route_id: uint256) -> Bytes[66]:
+    return self.routes[_route_id].path
@@ -22,6 +22,7 @@ interface ERC20:
     def balanceOf(_account: address) -> uint256: view
     def decimals() -> uint8: view
     def approve(_spender: address, _amount: uint256): nonpayable
+    def allowance(_owner: address, _spender: address) -> uint256: view
 
 interface ChainlinkOracle:
     def latestRoundData() -> (
@@ -55,6 +56,11 @@ ARBITRUM_SEQUENCER_UPTIME_FEED: constant(address) = 0xFdB631F5EE196F0ed6FAa76795
 
 WETH: constant(address) = 0x82aF49447D8a07e3bd95BD0d56f35241523fBab1
 
+MAX_LIQUIDATION_BATCH_SIZE: constant(uint256) = 64
+MAX_HEALTH_BATCH_SIZE: constant(uint256) = 512
+MAX_OPEN_POSITIONS_PAGE_SIZE: constant(uint256) = 512
+MAX_STANDING_ALLOWANCE_TOKENS: constant(uint256) = 32
+
 FULL_UTILIZATION: constant(uint256) = 100_00_000
 FALLBACK_INTEREST_CONFIGURATION: constant(uint256[4]) = [
     3_00_000,
@@ -62,8 +68,28 @@ FALLBACK_INTEREST_CONFIGURATION: constant(uint256[4]) = [
     100_00_000,
     80_00_000,
 ]
+# positions are stored as address + amount * AMOUNT_OFFSET, amounts
+# that do not fit into the upper 96 bits revert on overflow
+ADDRESS_MASK: constant(uint256) = 2**160 - 1
+AMOUNT_OFFSET: constant(uint256) = 2**160
+
+# bit masks to unpack the precomputed interest rate curve
+INTEREST_RATE_MASK: constant(uint256) = 2**32 - 1
+INTEREST_SLOPE_MASK: constant(uint256) = 2**96 - 1
+# FALLBACK_INTEREST_CONFIGURATION packed by _pack_interest_curve, both
+# slopes divide evenly so rounding them up changes nothing
+FALLBACK_INTEREST_CURVE: constant(uint256) = (
+    (80_00_000 << 224)
+    | (3_00_000 << 192)
+    | ((20_00_000 - 3_00_000) * 10**18 / 80_00_000 << 96)
+    | (100_00_000 - 20_00_000) * 10**18 / (100_00_000 - 80_00_000)
+)
 
 swap_router: public(address)
+# token -> allowance the swap_router is topped up to, 0 approves every swap
+swap_router_allowance: public(HashMap[address, uint256])
+# tokens that had a swap_router_allowance, revoked when replacing the swap_router
+standing_allowance_tokens: DynArray[address, MAX_STANDING_ALLOWANCE_TOKENS]
 
 # whitelisted addresses allowed to interact with this vault
 is_whitelisted_dex: public(HashMap[address, bool])
@@ -76,6 +102,10 @@ is_enabled_market: HashMap[address, HashMap[address, bool]]
 max_leverage: public(HashMap[address, HashMap[address, uint256]])
 # token -> Chainlink oracle
 to_usd_oracle: public(HashMap[address, address])
+# token -> decimals, recorded when whitelisting the token
+token_decimals: public(HashMap[address, uint256])
+# token -> 10**decimals
+token_scale: HashMap[address, uint256]
 oracle_freshness_threshold: public(HashMap[address, uint256])
 # token_in -> # token_out -> slippage
 liquidate_slippage: public(HashMap[address, HashMap[address, uint256]])
@@ -123,6 +153,9 @@ acceptable_amount_of_bad_debt: public(HashMap[address, uint256])
 
 # dynamic interest rates [min, mid, max, kink]
 interest_configuration: HashMap[address, uint256[4]]
+# precomputed interest rate curve, packed as
+# [kink: 32 bits | min rate: 32 bits | low slope: 96 bits | high slope: 96 bits]
+interest_curve: HashMap[address, uint256]
 
 struct Position:
     uid: bytes32
@@ -133,8 +166,24 @@ struct Position:
     position_token: address
     position_amount: uint256
 
-# uid -> Position
-positions: public(HashMap[bytes32, Position])
+# Positions are kept in storage in a packed form, addresses share
+# a slot with uint96 amounts and the uid is only the mapping key
+struct PackedPosition:
+    account_and_margin_amount: uint256
+    debt_token: address
+    debt_shares: uint256
+    position_token_and_amount: uint256
+
+# uid -> PackedPosition
+packed_positions: HashMap[bytes32, PackedPosition]
+
+# registry of open positions per market
+# debt_token -> position_token -> index -> uid
+open_positions: HashMap[address, HashMap[address, HashMap[uint256, bytes32]]]
+# debt_token -> position_token -> number of open positions
+open_positions_count: public(HashMap[address, HashMap[address, uint256]])
+# uid -> index in open_positions
+open_position_index: HashMap[bytes32, uint256]
 
 uid_nonce: uint256
 
@@ -170,7 +219,7 @@ def open_position(
         _position_token.
     """
     assert self.is_accepting_new_orders, "paused"
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
+    self._only_whitelisted_dex()
     assert self.is_enabled_market[_debt_token][_position_token], "market not enabled"
     assert self.margin[_account][_debt_token] >= _margin_amount, "not enough margin"
     assert self._available_liquidity(_debt_token) >= _debt_amount, "insufficient liquidity"
@@ -184,19 +233,17 @@ def open_position(
     )
 
     position_uid: bytes32 = self._generate_uid()
-    position: Position = Position(
+    self.packed_positions[position_uid] = PackedPosition(
         {
-            uid: position_uid,
-            account: _account,
+            account_and_margin_amount: convert(_account, uint256)
+            + _margin_amount * AMOUNT_OFFSET,
             debt_token: _debt_token,
-            margin_amount: _margin_amount,
             debt_shares: debt_shares,
-            position_token: _position_token,
-            position_amount: amount_bought,
+            position_token_and_amount: convert(_position_token, uint256)
+            + amount_bought * AMOUNT_OFFSET,
         }
     )
-
-    self.positions[position_uid] = position
+    self._add_open_position(_debt_token, _position_token, position_uid)
 
     # charge fee
     fee: uint256 = token_in_amount * self.trade_open_fee / PERCENTAGE_BASE
@@ -204,9 +251,11 @@ def open_position(
     self.margin[_account][_debt_token] -= fee
     self._distribute_trading_fee(_debt_token, fee)
 
-    assert not self._is_liquidatable(position_uid), "cannot open liquidatable position"
+    assert not self._is_liquidatable(
+        position_uid, self._usd_prices(_position_token, _debt_token)
+    ), "cannot open liquidatable position"
     
-    log PositionOpened(_account, position)
+    log PositionOpened(_account, self._position(position_uid))
 
     return position_uid, amount_bought
 
@@ -227,7 +276,7 @@ event BadDebt:
 @nonreentrant("lock")
 @external
 def close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256:
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
+    self._only_whitelisted_dex()
     assert _min_amount_out >= self._debt(_position_uid), "invalid min_amount_out"
     return self._close_position(_position_uid, _min_amount_out)
 
@@ -241,16 +290,20 @@ def _close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256
         with the remaining PnL.
     """
     # fetch the position from the positions-dict by uid
-    position: Position = self.positions[_position_uid]
+    position: Position = self._position(_position_uid)
 
     # assign to local variable to make it editable
     min_amount_out: uint256 = _min_amount_out
     if min_amount_out == 0:
         # market order, add some slippage protection
         min_amount_out = self._market_order_min_amount_out(
-            position.position_token, position.debt_token, position.position_amount
+            position.position_token,
+            position.debt_token,
+            position.position_amount,
+            self._usd_prices(position.position_token, position.debt_token),
         )
 
+    self._update_debt(position.debt_token)
     position_debt_amount: uint256 = self._debt(_position_uid)
     amount_out_received: uint256 = self._swap(
         position.position_token,
@@ -259,7 +312,10 @@ def _close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256
         min_amount_out,
     )
 
-    self._repay(position.debt_token, position_debt_amount)
+    # burn the shares of the position, converting the repaid amount
+    # back to shares rounds down and would leave them behind
+    self.total_debt_amount[position.debt_token] -= position_debt_amount
+    self.total_debt_shares[position.debt_token] -= position.debt_shares
 
     if amount_out_received >= position_debt_amount:
         # all good, LPs are paid back, remainder goes back to trader
@@ -276,7 +332,8 @@ def _close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256
         log BadDebt(position.debt_token, bad_debt, position.uid)
 
     # cleanup position
-    self.positions[_position_uid] = empty(Position)
+    self.packed_positions[_position_uid] = empty(PackedPosition)
+    self._remove_open_position(position.debt_token, position.position_token, _position_uid)
 
     log PositionClosed(position.account, position.uid, position, amount_out_received)
 
@@ -301,19 +358,21 @@ def reduce_position(
         Reduces both debt and margin in the position, leverage 
         remains as is.
     """
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
-    assert not self._is_liquidatable(_position_uid), "in liquidation"
+    self._only_whitelisted_dex()
 
-    position: Position = self.positions[_position_uid]
+    position: Position = self._position(_position_uid)
+    prices: uint256[2] = self._usd_prices(position.position_token, position.debt_token)
+    assert not self._is_liquidatable(_position_uid, prices), "in liquidation"
     assert position.position_amount >= _reduce_by_amount, "_reduce_by_amount > position"
 
     min_amount_out: uint256 = _min_amount_out
     if min_amount_out == 0:
         # market order, add some slippage protection
         min_amount_out = self._market_order_min_amount_out(
-            position.position_token, position.debt_token, _reduce_by_amount
+            position.position_token, position.debt_token, _reduce_by_amount, prices
         )
 
+    self._update_debt(position.debt_token)
     debt_amount: uint256 = self._debt(_position_uid)
     margin_debt_ratio: uint256 = position.margin_amount * PRECISION / (debt_amount + position.margin_amount)
 
@@ -327,18 +386,26 @@ def reduce_position(
     )
     reduce_debt_by_amount: uint256 = amount_out_received - reduce_margin_by_amount
 
-    position.margin_amount -= reduce_margin_by_amount
+    self.packed_positions[_position_uid].account_and_margin_amount -= (
+        reduce_margin_by_amount * AMOUNT_OFFSET
+    )
     self.margin[position.account][position.debt_token] += reduce_margin_by_amount
 
-    burnt_debt_shares: uint256 = self._repay(position.debt_token, reduce_debt_by_amount)
-    position.debt_shares -= burnt_debt_shares
-    position.position_amount -= _reduce_by_amount
-
-    self.positions[_position_uid] = position
+    # burn the repaid part of the position's own shares, rounding down
+    # keeps the remainder with the position until it is closed
+    burnt_debt_shares: uint256 = position.debt_shares * reduce_debt_by_amount / debt_amount
+    self.total_debt_amount[position.debt_token] -= reduce_debt_by_amount
+    self.total_debt_shares[position.debt_token] -= burnt_debt_shares
+    self.packed_positions[_position_uid].debt_shares -= burnt_debt_shares
+    self.packed_positions[_position_uid].position_token_and_amount -= (
+        _reduce_by_amount * AMOUNT_OFFSET
+    )
 
-    assert not self._is_liquidatable(_position_uid), "cannot reduce into liquidation"
+    assert not self._is_liquidatable(_position_uid, prices), "cannot reduce into liquidation"
 
-    log PositionReduced(position.account, _position_uid, position, amount_out_received)
+    log PositionReduced(
+        position.account, _position_uid, self._position(_position_uid), amount_out_received
+    )
 
     return amount_out_received
 
@@ -357,17 +424,80 @@ def liquidate(_position_uid: bytes32):
         leverage for that market.
         Charges the account a liquidation penalty.
     """
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
-    
-    position: Position = self.positions[_position_uid]
-    
-    self._update_debt(position.debt_token)
-    assert self._is_liquidatable(_position_uid), "position not liquidateable"
+    self._only_whitelisted_dex()
+
+    self._update_debt(self.packed_positions[_position_uid].debt_token)
+    assert self._liquidate(
+        _position_uid, self._position_usd_prices(_position_uid)
+    ), "position not liquidateable"
+
+
+@nonreentrant("lock")
+@external
+def liquidate_many(
+    _position_uids: DynArray[bytes32, MAX_LIQUIDATION_BATCH_SIZE]
+) -> DynArray[bool, MAX_LIQUIDATION_BATCH_SIZE]:
+    """
+    @notice
+        Liquidates all positions in _position_uids that exceed the
+        maximum allowed leverage for their market.
+        Positions that are already closed or not liquidatable are
+        skipped instead of reverting the whole batch.
+        Debt and oracle prices are only refreshed when the token
+        changes, keepers should therefore sort the batch by market.
+        Returns for each uid whether it was liquidated.
+    """
+    self._only_whitelisted_dex()
+    self._assert_sequencer_up()
+
+    debt_token: address = empty(address)
+    debt_token_price: uint256 = 0
+    position_token: address = empty(address)
+    position_token_price: uint256 = 0
+
+    liquidated: DynArray[bool, MAX_LIQUIDATION_BATCH_SIZE] = []
+    for uid in _position_uids:
+        position: Position = self._position(uid)
+        if position.account == empty(address):
+            liquidated.append(False)
+            continue
+
+        if position.debt_token != debt_token:
+            debt_token = position.debt_token
+            self._update_debt(debt_token)
+            debt_token_price = self._oracle_price(debt_token)
+
+        if position.position_token != position_token:
+            position_token = position.position_token
+            position_token_price = self._oracle_price(position_token)
+
+        liquidated.append(self._liquidate(uid, [position_token_price, debt_token_price]))
+
+    return liquidated
 
+
+@internal
+def _liquidate(_position_uid: bytes32, _prices: uint256[2]) -> bool:
+    """
+    @notice
+        Liquidates a position at the given [position_token, debt_token]
+        oracle prices if it exceeds the maximum allowed leverage
+        for that market.
+        Returns False and leaves the position untouched otherwise.
+        Expects the debt of the position to be up to date.
+    """
+    position: Position = self._position(_position_uid)
     debt_amount: uint256 = self._debt(_position_uid)
 
+    leverage: uint256 = self._calculate_leverage(
+        self._usd_value(position.position_token, position.position_amount, _prices[0]),
+        self._usd_value(position.debt_token, debt_amount, _prices[1]),
+    )
+    if leverage <= self.max_leverage[position.debt_token][position.position_token]:
+        return False
+
     min_amount_out: uint256 = self._market_order_min_amount_out(
-        position.position_token, position.debt_token, position.position_amount
+        position.position_token, position.debt_token, position.position_amount, _prices
     )
 
     amount_out_received: uint256 = self._close_position(_position_uid, min_amount_out)
@@ -383,6 +513,7 @@ def liquidate(_position_uid: bytes32):
         self._distribute_trading_fee(position.debt_token, penalty)
 
     log PositionLiquidated(position.account, _position_uid, position)
+    return True
 
 #####################################
 #
@@ -401,8 +532,14 @@ def _swap(
     @notice
         Triggers a swap in the referenced swap_router.
         Ensures min_amount_out is respected.
+        Tokens with a swap_router_allowance keep a standing
+        allowance that is only topped up once it no longer
+        covers _amount_in, others are approved for every swap.
     """
-    ERC20(_token_in).approve(self.swap_router, _amount_in)
+    if ERC20(_token_in).allowance(self, self.swap_router) < _amount_in:
+        ERC20(_token_in).approve(
+            self.swap_router, max(self.swap_router_allowance[_token_in], _amount_in)
+        )
     token_out_balance_before: uint256 = ERC20(_token_out).balanceOf(self)
 
     amount_out_received: uint256 = SwapRouter(self.swap_router).swap(
@@ -419,7 +556,7 @@ def _swap(
 
 @internal
 def _market_order_min_amount_out(
-    _token_in: address, _token_out: address, _amount_in: uint256
+    _token_in: address, _token_out: address, _amount_in: uint256, _prices: uint256[2]
 ) -> uint256:
     """
     @notice
@@ -431,7 +568,7 @@ def _market_order_min_amount_out(
         liquidate_slippage configured for the specific market.
     """
     return (
-        self._quote_token_to_token(_token_in, _token_out, _amount_in)
+        self._quote(_token_in, _token_out, _amount_in, _prices)
         * (PERCENTAGE_BASE - self.liquidate_slippage[_token_in][_token_out])
         / PERCENTAGE_BASE
     )
@@ -446,25 +583,24 @@ def _market_order_min_amount_out(
 @view
 @external
 def effective_leverage(_position_uid: bytes32) -> uint256:
-    return self._effective_leverage(_position_uid)
+    return self._effective_leverage(_position_uid, self._position_usd_prices(_position_uid))
 
 
 @view
 @internal
-def _effective_leverage(_position_uid: bytes32) -> uint256:
+def _effective_leverage(_position_uid: bytes32, _prices: uint256[2]) -> uint256:
     """
     @notice
         Calculated the current leverage of a position based
         on the position current value, the underlying margin 
         and the accrued debt.
     """
-    position: Position = self.positions[_position_uid]
-    debt_amount: uint256 = self._debt(_position_uid)
-
-    position_value: uint256 = self._in_usd(
-        position.position_token, position.position_amount
+    position_value: uint256 = self._usd_value(
+        self._position_token(_position_uid), self._position_amount(_position_uid), _prices[0]
+    )
+    debt_value: uint256 = self._usd_value(
+        self.packed_positions[_position_uid].debt_token, self._debt(_position_uid), _prices[1]
     )
-    debt_value: uint256 = self._in_usd(position.debt_token, debt_amount)
 
     return self._calculate_leverage(position_value, debt_value)
 
@@ -489,19 +625,98 @@ def _calculate_leverage(
 @view
 @external
 def is_liquidatable(_position_uid: bytes32) -> bool:
-    return self._is_liquidatable(_position_uid)
+    return self._is_liquidatable(_position_uid, self._position_usd_prices(_position_uid))
 
 @view
 @internal
-def _is_liquidatable(_position_uid: bytes32) -> bool:
+def _is_liquidatable(_position_uid: bytes32, _prices: uint256[2]) -> bool:
     """
     @notice
         Checks if a position exceeds the maximum leverage
         allowed for that market.
     """
-    position: Position = self.positions[_position_uid]
-    leverage: uint256 = self._effective_leverage(_position_uid)
-    return leverage > self.max_leverage[position.debt_token][position.position_token]
+    leverage: uint256 = self._effective_leverage(_position_uid, _prices)
+    debt_token: address = self.packed_positions[_position_uid].debt_token
+    position_token: address = self._position_token(_position_uid)
+    return leverage > self.max_leverage[debt_token][position_token]
+
+
+struct PositionHealth:
+    debt: uint256
+    position_value: uint256
+    margin_amount: uint256
+    effective_leverage: uint256
+    is_liquidatable: bool
+    exchange_rate: uint256
+
+@view
+@external
+def positions_health(
+    _position_uids: DynArray[bytes32, MAX_HEALTH_BATCH_SIZE]
+) -> DynArray[PositionHealth, MAX_HEALTH_BATCH_SIZE]:
+    """
+    @notice
+        Returns debt, USD position value, margin, effective leverage,
+        liquidation flag and current exchange rate for each position
+        in _position_uids.
+        Oracle prices and the pending interest per debt share are only
+        refreshed when the token changes, callers should therefore sort
+        the batch by market.
+        Positions that do not exist return an empty PositionHealth.
+    """
+    self._assert_sequencer_up()
+
+    debt_token: address = empty(address)
+    debt_token_price: uint256 = 0
+    amount_per_debt_share: uint256 = 0
+    position_token: address = empty(address)
+    position_token_price: uint256 = 0
+
+    health: DynArray[PositionHealth, MAX_HEALTH_BATCH_SIZE] = []
+    for uid in _position_uids:
+        position: Position = self._position(uid)
+        if position.account == empty(address):
+            health.append(empty(PositionHealth))
+            continue
+
+        if position.debt_token != debt_token:
+            debt_token = position.debt_token
+            debt_token_price = self._oracle_price(debt_token)
+            amount_per_debt_share = self._amount_per_debt_share(debt_token)
+
+        if position.position_token != position_token:
+            position_token = position.position_token
+            position_token_price = self._oracle_price(position_token)
+
+        debt_amount: uint256 = (
+            position.debt_shares * amount_per_debt_share / PRECISION / PRECISION
+        )
+        position_value: uint256 = self._usd_value(
+            position_token, position.position_amount, position_token_price
+        )
+        leverage: uint256 = self._calculate_leverage(
+            position_value, self._usd_value(debt_token, debt_amount, debt_token_price)
+        )
+
+        health.append(
+            PositionHealth(
+                {
+                    debt: debt_amount,
+                    position_value: position_value,
+                    margin_amount: position.margin_amount,
+                    effective_leverage: leverage,
+                    is_liquidatable: leverage > self.max_leverage[debt_token][position_token],
+                    exchange_rate: self._quote(
+                        position_token,
+                        debt_token,
+                        self.token_scale[position_token],
+                        [position_token_price, debt_token_price],
+                    ),
+                }
+            )
+        )
+
+    return health
 
 
 event MarginAdded:
@@ -515,16 +730,15 @@ def add_margin(_position_uid: bytes32, _amount: uint256):
         Allows to add additional margin to a Position and 
         reduce the leverage.
     """
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
+    self._only_whitelisted_dex()
 
-    position: Position = self.positions[_position_uid]
+    position: Position = self._position(_position_uid)
 
     assert (self.margin[position.account][position.debt_token] >= _amount), "not enough margin"
 
     self.margin[position.account][position.debt_token] -= _amount
-    position.margin_amount += _amount
+    self.packed_positions[_position_uid].account_and_margin_amount += _amount * AMOUNT_OFFSET
 
-    self.positions[_position_uid] = position
     log MarginAdded(_position_uid, _amount)
 
 
@@ -540,20 +754,21 @@ def remove_margin(_position_uid: bytes32, _amount: uint256):
         Allows to remove margin from a Position and 
         increase the leverage.
     """
-    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
+    self._only_whitelisted_dex()
 
 
-    position: Position = self.positions[_position_uid]
+    position: Position = self._position(_position_uid)
 
     assert position.margin_amount >= _amount, "not enough margin"
 
-    position.margin_amount -= _amount
+    self.packed_positions[_position_uid].account_and_margin_amount -= _amount * AMOUNT_OFFSET
     self.margin[position.account][position.debt_token] += _amount
 
     self._update_debt(position.debt_token)
-    assert not self._is_liquidatable(_position_uid), "exceeds max leverage"
+    assert not self._is_liquidatable(
+        _position_uid, self._usd_prices(position.position_token, position.debt_token)
+    ), "exceeds max leverage"
     
-    self.positions[_position_uid] = position
     log MarginRemoved(_position_uid, _amount)
 
 
@@ -577,8 +792,19 @@ def _to_usd_oracle_price(_token: address) -> uint256:
         Ensures that the Arbitrum sequencer is up and running and
         that the Chainlink feed is fresh.
     """
-    assert self._sequencer_up(), "sequencer down"
+    self._assert_sequencer_up()
+    return self._oracle_price(_token)
 
+
+@view
+@internal
+def _oracle_price(_token: address) -> uint256:
+    """
+    @notice
+        Retrieves the latest Chainlink oracle price for _token
+        and ensures that the feed is fresh.
+        Callers are responsible for checking the sequencer status.
+    """
     round_id: uint80 = 0
     answer: int256 = 0
     started_at: uint256 = 0
@@ -596,25 +822,44 @@ def _to_usd_oracle_price(_token: address) -> uint256:
 
 @view
 @internal
-def _sequencer_up() -> bool:
+def _usd_prices(_token0: address, _token1: address) -> uint256[2]:
+    """
+    @notice
+        Retrieves the oracle prices of both tokens of a market
+        while checking the Arbitrum sequencer only once.
+        The prices are passed down to the valuation helpers so
+        every feed is read at most once per call.
+    """
+    self._assert_sequencer_up()
+    return [self._oracle_price(_token0), self._oracle_price(_token1)]
+
+
+@view
+@internal
+def _position_usd_prices(_position_uid: bytes32) -> uint256[2]:
+    return self._usd_prices(
+        self._position_token(_position_uid),
+        self.packed_positions[_position_uid].debt_token,
+    )
+
+
+@view
+@internal
+def _assert_sequencer_up():
     # answer == 0: Sequencer is up
     # answer == 1: Sequencer is down
     answer: int256 = ChainlinkOracle(ARBITRUM_SEQUENCER_UPTIME_FEED).latestRoundData()[1]
-    return answer == 0
+    assert answer == 0, "sequencer down"
 
 
 @view
 @internal
-def _in_usd(_token: address, _amount: uint256) -> uint256:
+def _usd_value(_token: address, _amount: uint256, _usd_price: uint256) -> uint256:
     """
     @notice
-        Converts _amount of _token to a USD value.
+        Converts _amount of _token to a USD value at _usd_price.
     """
-    return (
-        self._to_usd_oracle_price(_token)
-        * _amount
-        / 10 ** convert(ERC20(_token).decimals(), uint256)
-    )
+    return _usd_price * _amount / self.token_scale[_token]
 
 
 @view
@@ -625,12 +870,11 @@ def current_exchange_rate(_position_uid: bytes32) -> uint256:
         Returns the current exchange rate / price of a 
         Positions underlying tokens.
     """
-    position: Position = self.positions[_position_uid]
-    one_full: uint256 = 1 * 10 ** convert(
-        ERC20(position.position_token).decimals(), uint256
-    )
+    position_token: address = self._position_token(_position_uid)
     return self._quote_token_to_token(
-        position.position_token, position.debt_token, one_full
+        position_token,
+        self.packed_positions[_position_uid].debt_token,
+        self.token_scale[position_token],
     )
 
 
@@ -639,15 +883,21 @@ def current_exchange_rate(_position_uid: bytes32) -> uint256:
 def _quote_token_to_token(
     _token0: address, _token1: address, _amount0: uint256
 ) -> uint256:
-    token0_in_usd: uint256 = self._in_usd(_token0, _amount0)  # 8 decimals
-    token1_decimals: uint256 = convert(ERC20(_token1).decimals(), uint256)
-    token1_usd_price: uint256 = self._to_usd_oracle_price(_token1)
+    return self._quote(_token0, _token1, _amount0, self._usd_prices(_token0, _token1))
+
+
+@view
+@internal
+def _quote(
+    _token0: address, _token1: address, _amount0: uint256, _prices: uint256[2]
+) -> uint256:
+    token0_in_usd: uint256 = self._usd_value(_token0, _amount0, _prices[0])  # 8 decimals
     # token_in_per_token_out = token_in_in_usdc / token_out_in_usdc with additional precision
     token1_value: uint256 = (
         PRECISION    # just for precision
-        * 10**token1_decimals 
+        * self.token_scale[_token1]
         * token0_in_usd
-        / token1_usd_price  # the real thing
+        / _prices[1]  # the real thing
         / PRECISION  # just for precision
     )
     return token1_value
@@ -672,9 +922,7 @@ def fund_account_eth():
     @notice
         Allows a user to fund his WETH margin by depositing ETH.
     """
-    assert self.is_accepting_new_orders, "funding paused"
-    assert self.is_whitelisted_token[WETH], "token not whitelisted"
-    self.margin[msg.sender][WETH] += msg.value
+    self._credit_margin(WETH, msg.value)
     raw_call(WETH, method_id("deposit()"), value=msg.value)
     log AccountFunded(msg.sender, msg.value, WETH)
 
@@ -686,13 +934,18 @@ def fund_account(_token: address, _amount: uint256):
     @notice
         Allows a user to fund his _token margin.
     """
-    assert self.is_accepting_new_orders, "funding paused"
-    assert self.is_whitelisted_token[_token], "token not whitelisted"
-    self.margin[msg.sender][_token] += _amount
+    self._credit_margin(_token, _amount)
     self._safe_transfer_from(_token, msg.sender, self, _amount)
     log AccountFunded(msg.sender, _amount, _token)
 
 
+@internal
+def _credit_margin(_token: address, _amount: uint256):
+    assert self.is_accepting_new_orders, "funding paused"
+    self._only_whitelisted_token(_token)
+    self.margin[msg.sender][_token] += _amount
+
+
 event WithdrawBalance:
     account: indexed(address)
     token: indexed(address)
@@ -707,17 +960,21 @@ def withdraw_from_account_eth(_amount: uint256):
         Allows a user to withdraw from his WETH margin and
         automatically swaps back to ETH.
     """
-    assert self.margin[msg.sender][WETH] >= _amount, "insufficient balance"
-    self.margin[msg.sender][WETH] -= _amount
+    self._debit_margin(msg.sender, WETH, _amount)
+    self._unwrap_weth_to(msg.sender, _amount)
+    log WithdrawBalance(msg.sender, WETH, _amount)
+
+
+@internal
+def _unwrap_weth_to(_receiver: address, _amount: uint256):
     raw_call(
         WETH,
         concat(
             method_id("withdrawTo(address,uint256)"),
-            convert(msg.sender, bytes32),
+            convert(_receiver, bytes32),
             convert(_amount, bytes32),
         ),
     )
-    log WithdrawBalance(msg.sender, WETH, _amount)
 
 
 @nonreentrant("lock")
@@ -727,13 +984,17 @@ def withdraw_from_account(_token: address, _amount: uint256):
     @notice
         Allows a user to withdraw from his _token margin.
     """
-    assert self.margin[msg.sender][_token] >= _amount, "insufficient balance"
-
-    self.margin[msg.sender][_token] -= _amount
+    self._debit_margin(msg.sender, _token, _amount)
     self._safe_transfer(_token, msg.sender, _amount)
     log WithdrawBalance(msg.sender, _token, _amount)
 
 
+@internal
+def _debit_margin(_account: address, _token: address, _amount: uint256):
+    assert self.margin[_account][_token] >= _amount, "insufficient balance"
+    self.margin[_account][_token] -= _amount
+
+
 @nonreentrant("lock")
 @external
 def swap_margin(
@@ -748,9 +1009,7 @@ def swap_margin(
         Allows a user to swap his margin balances between differnt tokens.
     """
     assert self.is_whitelisted_dex[msg.sender] or _account == msg.sender, "unauthorized"
-    assert _amount_in <= self.margin[_account][_token_in], "insufficient balance"
-
-    self.margin[_account][_token_in] -= _amount_in
+    self._debit_margin(_account, _token_in, _amount_in)
 
     amount_out_received: uint256 = self._swap(
         _token_in, _token_out, _amount_in, _min_amount_out
@@ -782,9 +1041,6 @@ def provide_liquidity_eth(_is_safety_module: bool):
     """
     assert msg.value > 0, "zero value"
 
-    assert self.is_accepting_new_orders, "LPing paused"
-    assert self.is_whitelisted_token[WETH], "token not whitelisted"
-
     self._account_for_provide_liquidity(WETH, msg.value, _is_safety_module)
 
     raw_call(WETH, method_id("deposit()"), value=msg.value)
@@ -799,10 +1055,6 @@ def provide_liquidity(_token: address, _amount: uint256, _is_safety_module: bool
     @notice
         Allows LPs to provide _token liquidity.
     """
-    assert self.is_accepting_new_orders, "LPing paused"
-
-    assert self.is_whitelisted_token[_token], "token not whitelisted"
-
     self._account_for_provide_liquidity(_token, _amount, _is_safety_module)
 
     self._safe_transfer_from(_token, msg.sender, self, _amount)
@@ -813,6 +1065,9 @@ def provide_liquidity(_token: address, _amount: uint256, _is_safety_module: bool
 def _account_for_provide_liquidity(
     _token: address, _amount: uint256, _is_safety_module: bool
 ):
+    assert self.is_accepting_new_orders, "LPing paused"
+    self._only_whitelisted_token(_token)
+
     self._update_debt(_token)
     # issue 1 less share to account for potential rounding errors later
     shares: uint256 = self._amount_to_lp_shares(_token, _amount, _is_safety_module) - 1
@@ -845,19 +1100,9 @@ def withdraw_liquidity_eth(_amount: uint256, _is_safety_module: bool):
         Allows LPs to withdraw their WETH liquidity in ETH.
         Only liquidity that is currently not lent out can be withdrawn.
     """
-    assert (self.account_withdraw_liquidity_cooldown[msg.sender] <= block.timestamp), "cooldown"
-    assert _amount <= self._available_liquidity(WETH), "liquidity not available"
-
     self._account_for_withdraw_liquidity(WETH, _amount, _is_safety_module)
 
-    raw_call(
-        WETH,
-        concat(
-            method_id("withdrawTo(address,uint256)"),
-            convert(msg.sender, bytes32),
-            convert(_amount, bytes32),
-        ),
-    )
+    self._unwrap_weth_to(msg.sender, _amount)
 
     log WithdrawLiquidity(msg.sender, WETH, _amount)
 
@@ -870,10 +1115,6 @@ def withdraw_liquidity(_token: address, _amount: uint256, _is_safety_module: boo
         Allows LPs to withdraw their _token liquidity.
         Only liquidity that is currently not lent out can be withdrawn.
     """
-    assert (self.account_withdraw_liquidity_cooldown[msg.sender] <= block.timestamp), "cooldown"
-
-    assert _amount <= self._available_liquidity(_token), "liquidity not available"
-
     self._account_for_withdraw_liquidity(_token, _amount, _is_safety_module)
 
     self._safe_transfer(_token, msg.sender, _amount)
@@ -884,17 +1125,22 @@ def withdraw_liquidity(_token: address, _amount: uint256, _is_safety_module: boo
 def _account_for_withdraw_liquidity(
     _token: address, _amount: uint256, _is_safety_module: bool
 ):
+    assert (self.account_withdraw_liquidity_cooldown[msg.sender] <= block.timestamp), "cooldown"
+    assert _amount <= self._available_liquidity(_token), "liquidity not available"
+
     self._update_debt(_token)
+    shares: uint256 = self._amount_to_lp_shares(_token, _amount, _is_safety_module)
+    owned_shares: uint256 = self.base_lp_shares[_token][msg.sender]
+    if _is_safety_module:
+        owned_shares = self.safety_module_lp_shares[_token][msg.sender]
+    assert (shares <= owned_shares), "cannot withdraw more than you own"
+
     if _is_safety_module:
-        shares: uint256 = self._amount_to_lp_shares(_token, _amount, True)
-        assert (shares <= self.safety_module_lp_shares[_token][msg.sender]), "cannot withdraw more than you own"
         self.safety_module_lp_total_amount[_token] -= _amount
         self.safety_module_lp_total_shares[_token] -= shares
         self.safety_module_lp_shares[_token][msg.sender] -= shares
 
     else:
-        shares: uint256 = self._amount_to_lp_shares(_token, _amount, False)
-        assert (shares <= self.base_lp_shares[_token][msg.sender]), "cannot withdraw more than you own"
         self.base_lp_total_amount[_token] -= _amount
         self.base_lp_total_shares[_token] -= shares
         self.base_lp_shares[_token][msg.sender] -= shares
@@ -1056,18 +1302,6 @@ def _borrow(_debt_token: address, _amount: uint256) -> uint256:
     return debt_shares
 
 
-@internal
-def _repay(_debt_token: address, _amount: uint256) -> uint256:
-    self._update_debt(_debt_token)
-
-    debt_shares: uint256 = self._amount_to_debt_shares(_debt_token, _amount)
-
-    self.total_debt_amount[_debt_token] -= _amount
-    self.total_debt_shares[_debt_token] -= debt_shares
-
-    return debt_shares
-
-
 @internal
 def _update_debt(_debt_token: address):
     """
@@ -1164,8 +1398,8 @@ def debt(_position_uid: bytes32) -> uint256:
 @view
 def _debt(_position_uid: bytes32) -> uint256:
     return self._debt_shares_to_amount(
-        self.positions[_position_uid].debt_token,
-        self.positions[_position_uid].debt_shares,
+        self.packed_positions[_position_uid].debt_token,
+        self.packed_positions[_position_uid].debt_shares,
     )
 
 
@@ -1177,7 +1411,102 @@ def position_amount(_position_uid: bytes32) -> uint256:
         Returns the amount of underlying position_token
         the position is backed by.
     """
-    return self.positions[_position_uid].position_amount
+    return self._position_amount(_position_uid)
+
+
+@external
+@view
+def positions(_position_uid: bytes32) -> Position:
+    return self._position(_position_uid)
+
+
+@internal
+@view
+def _position(_position_uid: bytes32) -> Position:
+    """
+    @notice
+        Unpacks the stored Position with uid _position_uid.
+        Returns an empty Position if it does not exist.
+    """
+    packed: PackedPosition = self.packed_positions[_position_uid]
+    if packed.account_and_margin_amount == 0:
+        return empty(Position)
+
+    return Position(
+        {
+            uid: _position_uid,
+            account: convert(packed.account_and_margin_amount & ADDRESS_MASK, address),
+            debt_token: packed.debt_token,
+            margin_amount: packed.account_and_margin_amount >> 160,
+            debt_shares: packed.debt_shares,
+            position_token: convert(packed.position_token_and_amount & ADDRESS_MASK, address),
+            position_amount: packed.position_token_and_amount >> 160,
+        }
+    )
+
+
+@external
+@view
+def get_open_positions(
+    _debt_token: address, _position_token: address, _offset: uint256, _limit: uint256
+) -> DynArray[bytes32, MAX_OPEN_POSITIONS_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit uids of open positions in the
+        _debt_token/_position_token market starting at _offset.
+        The order changes when positions are closed.
+    """
+    count: uint256 = self.open_positions_count[_debt_token][_position_token]
+    uids: DynArray[bytes32, MAX_OPEN_POSITIONS_PAGE_SIZE] = []
+    for i in range(MAX_OPEN_POSITIONS_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        uids.append(self.open_positions[_debt_token][_position_token][_offset + i])
+    return uids
+
+
+@internal
+def _add_open_position(_debt_token: address, _position_token: address, _position_uid: bytes32):
+    index: uint256 = self.open_positions_count[_debt_token][_position_token]
+    self.open_positions[_debt_token][_position_token][index] = _position_uid
+    self.open_position_index[_position_uid] = index
+    self.open_positions_count[_debt_token][_position_token] = index + 1
+
+
+@internal
+def _remove_open_position(
+    _debt_token: address, _position_token: address, _position_uid: bytes32
+):
+    """
+    @notice
+        Removes _position_uid from the open positions registry by
+        moving the last position of the market into its slot.
+    """
+    last_index: uint256 = self.open_positions_count[_debt_token][_position_token] - 1
+    index: uint256 = self.open_position_index[_position_uid]
+    if index != last_index:
+        last_uid: bytes32 = self.open_positions[_debt_token][_position_token][last_index]
+        self.open_positions[_debt_token][_position_token][index] = last_uid
+        self.open_position_index[last_uid] = index
+
+    self.open_positions[_debt_token][_position_token][last_index] = empty(bytes32)
+    self.open_position_index[_position_uid] = 0
+    self.open_positions_count[_debt_token][_position_token] = last_index
+
+
+@internal
+@view
+def _position_token(_position_uid: bytes32) -> address:
+    return convert(
+        self.packed_positions[_position_uid].position_token_and_amount & ADDRESS_MASK,
+        address,
+    )
+
+
+@internal
+@view
+def _position_amount(_position_uid: bytes32) -> uint256:
+    return self.packed_positions[_position_uid].position_token_and_amount >> 160
 
 
 #####################################
@@ -1194,9 +1523,8 @@ def current_interest_per_second(_debt_token: address) -> uint256:
 @internal
 @view
 def _current_interest_per_second(_debt_token: address) -> uint256:
-    utilization_rate: uint256 = self._utilization_rate(_debt_token) 
-    interest_rate: uint256 = self._interest_rate_by_utilization(
-        _debt_token, utilization_rate
+    interest_rate: uint256 = self._interest_rate(
+        self._interest_curve(_debt_token), self._utilization_rate(_debt_token)
     )
     interest_per_second: uint256 = interest_rate * PRECISION / SECONDS_PER_YEAR
     return interest_per_second
@@ -1227,6 +1555,12 @@ def _utilization_rate(_debt_token: address) -> uint256:
 def _interest_rate_by_utilization(
     _address: address, _utilization_rate: uint256
 ) -> uint256:
+    return self._interest_rate(self._interest_curve(_address), _utilization_rate)
+
+
+@internal
+@pure
+def _interest_rate(_curve: uint256, _utilization_rate: uint256) -> uint256:
     """
     @notice
         we have two tiers of interest rates that are linearily growing from
@@ -1234,69 +1568,83 @@ def _interest_rate_by_utilization(
         _max_interest_rate respectively. The switch between both occurs at
         _rate_switch_utilization
 
-        note: the slope of the first line must be lower then the second line, if
-        not the contact will revert
+        Both lines are precomputed into _curve by _pack_interest_curve,
+        the rate is min_rate + low_slope * x below the switch and
+        mid_rate + high_slope * (x - switch) above it.
     """
-    if _utilization_rate < self._rate_switch_utilization(_address):
-        return self._dynamic_interest_rate_low_utilization(_address, _utilization_rate)
-    else:
-        return self._dynamic_interest_rate_high_utilization(_address, _utilization_rate)
-
-
-@internal
-@view
-def _dynamic_interest_rate_low_utilization(
-    _address: address, _utilization_rate: uint256
-) -> uint256:
-    # if it's zero we return the min-interest-rate without calculation
-    if _utilization_rate == 0:
-        return self._min_interest_rate(_address)
+    rate_switch_utilization: uint256 = _curve >> 224
+    min_interest_rate: uint256 = (_curve >> 192) & INTEREST_RATE_MASK
+    low_slope: uint256 = (_curve >> 96) & INTEREST_SLOPE_MASK
 
-    # default line-equation y = mx + d where m is the slope, x is
-    # _utilization_rate and d is the min_interest_rate, the staring point at 0
-    # utilization thus y = _slope * _utilization_rate -_diff
+    if _utilization_rate < rate_switch_utilization:
+        return min_interest_rate + low_slope * _utilization_rate / PRECISION
 
-    # first part of the equation mx
-    _additional_rate_through_utilization: uint256 = (
-        PRECISION
-        * _utilization_rate
-        * (self._mid_interest_rate(_address) - self._min_interest_rate(_address))
-        / self._rate_switch_utilization(_address)
+    high_slope: uint256 = _curve & INTEREST_SLOPE_MASK
+    mid_interest_rate: uint256 = (
+        min_interest_rate + low_slope * rate_switch_utilization / PRECISION
     )
-
-    # first part of the equation d + mx
     return (
-        self._min_interest_rate(_address) * PRECISION
-        + _additional_rate_through_utilization
-    ) / PRECISION
+        mid_interest_rate
+        + high_slope * (_utilization_rate - rate_switch_utilization) / PRECISION
+    )
 
 
 @internal
 @view
-def _dynamic_interest_rate_high_utilization(
-    _address: address, _utilization_rate: uint256
+def _interest_curve(_address: address) -> uint256:
+    curve: uint256 = self.interest_curve[_address]
+    if curve == 0:
+        return FALLBACK_INTEREST_CURVE
+    return curve
+
+
+@internal
+@pure
+def _pack_interest_curve(
+    _min_interest_rate: uint256,
+    _mid_interest_rate: uint256,
+    _max_interest_rate: uint256,
+    _rate_switch_utilization: uint256,
 ) -> uint256:
-    # if it's smaller switch zero we return the min-interest-rate without
-    # calculation
-    if _utilization_rate < self._rate_switch_utilization(_address):
-        return self._mid_interest_rate(_address)
-
-    # default line-equation y = mx + d where m is _slope, x is _utilization_rate
-    # and m  is _diff
-    # thus y = _slope * _utilization_rate -_diff
-    _slope: uint256 = (
-        (self._max_interest_rate(_address) - self._mid_interest_rate(_address))
-        * PRECISION
-        / (FULL_UTILIZATION - self._rate_switch_utilization(_address))
-    )
+    """
+    @notice
+        Precomputes the slopes of both interest rate lines
+        and packs them together with the min rate and the
+        rate switch utilization into a single word.
 
-    _diff: uint256 = (
-        _slope * PERCENTAGE_BASE_HIGH_PRECISION
-        - self._max_interest_rate(_address) * PRECISION
-    )
-    _additional_rate_through_utilization: uint256 = _slope * _utilization_rate - _diff
+        Both slopes are rounded up. Utilizations are below
+        PRECISION, so the rate comes out as exactly the mid rate
+        at the switch and the max rate at 100% utilization.
 
-    return _additional_rate_through_utilization / PRECISION
+        note: reverts if the rates are not increasing or the
+        switch is not strictly between 0% and 100% utilization
+    """
+    assert (
+        _min_interest_rate <= _mid_interest_rate
+        and _mid_interest_rate <= _max_interest_rate
+        and _max_interest_rate <= INTEREST_RATE_MASK
+    ), "invalid interest rates"
+    assert (
+        _rate_switch_utilization > 0 and _rate_switch_utilization < FULL_UTILIZATION
+    ), "invalid rate switch utilization"
+
+    # bounded by the asserts above, the rounding terms cannot overflow
+    high_utilization: uint256 = unsafe_sub(FULL_UTILIZATION, _rate_switch_utilization)
+    low_slope: uint256 = unsafe_add(
+        (_mid_interest_rate - _min_interest_rate) * PRECISION,
+        unsafe_sub(_rate_switch_utilization, 1),
+    ) / _rate_switch_utilization
+    high_slope: uint256 = unsafe_add(
+        (_max_interest_rate - _mid_interest_rate) * PRECISION,
+        unsafe_sub(high_utilization, 1),
+    ) / high_utilization
+
+    return (
+        (_rate_switch_utilization << 224)
+        | (_min_interest_rate << 192)
+        | (low_slope << 96)
+        | high_slope
+    )
 
 
 @internal
@@ -1379,7 +1727,7 @@ def _generate_uid() -> bytes32:
 
 
 @internal
-def _safe_transfer(_token: address, _to: address, _amount: uint256) -> bool:
+def _safe_transfer(_token: address, _to: address, _amount: uint256):
     res: Bytes[32] = raw_call(
         _token,
         concat(
@@ -1392,8 +1740,6 @@ def _safe_transfer(_token: address, _to: address, _amount: uint256) -> bool:
     if len(res) > 0:
         assert convert(res, bool), "transfer failed"
 
-    return True
-
 
 @internal
 def _safe_transfer_from(
@@ -1430,6 +1776,24 @@ def repay_bad_debt(_token: address, _amount: uint256):
 #
 #####################################
 
+@view
+@internal
+def _only_admin():
+    assert msg.sender == self.admin, "unauthorized"
+
+
+@view
+@internal
+def _only_whitelisted_dex():
+    assert self.is_whitelisted_dex[msg.sender], "unauthorized"
+
+
+@view
+@internal
+def _only_whitelisted_token(_token: address):
+    assert self.is_whitelisted_token[_token], "token not whitelisted"
+
+
 event NewAdminSuggested:
     new_admin: indexed(address)
     suggested_by: indexed(address)
@@ -1444,7 +1808,7 @@ def suggest_admin(_new_admin: address):
     @param _new_admin
         The address of the new admin.
     """
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     assert _new_admin != empty(address), "cannot set admin to zero address"
     self.suggested_admin = _new_admin
     log NewAdminSuggested(_new_admin, msg.sender)
@@ -1475,7 +1839,7 @@ def set_is_accepting_new_orders(_is_accepting_new_orders: bool):
         Allows admin to put protocol in defensive or winddown mode.
         Open Positions can still be managed but no new positions are accepted.
     """
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.is_accepting_new_orders = _is_accepting_new_orders
 
 
@@ -1487,28 +1851,32 @@ def whitelist_token(
     _token: address, 
     _token_to_usd_oracle: address, 
     _oracle_freshness_threshold: uint256) -> uint256:
-    assert msg.sender == self.admin, "unauthorized"
-    assert self.is_whitelisted_token[_token] == False, "already whitelisted"
+    self._only_admin()
+    assert not self.is_whitelisted_token[_token], "already whitelisted"
     assert _oracle_freshness_threshold > 0, "invalid oracle freshness threshold"
 
     self.is_whitelisted_token[_token] = True
     self.to_usd_oracle[_token] = _token_to_usd_oracle
     self.oracle_freshness_threshold[_token_to_usd_oracle] = _oracle_freshness_threshold
 
+    decimals: uint256 = convert(ERC20(_token).decimals(), uint256)
+    self.token_decimals[_token] = decimals
+    self.token_scale[_token] = 10**decimals
+
     return self._to_usd_oracle_price(_token)
 
 
 @external
 def remove_token_from_whitelist(_token: address):
-    assert msg.sender == self.admin, "unauthorized"
-    assert self.is_whitelisted_token[_token] == True, "not whitelisted"
+    self._only_admin()
+    assert self.is_whitelisted_token[_token], "not whitelisted"
     self.to_usd_oracle[_token] = empty(address)
     self.is_whitelisted_token[_token] = False
 
 
 @external
 def enable_market(_token1: address, _token2: address, _max_leverage: uint256):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     assert (self.is_whitelisted_token[_token1] and self.is_whitelisted_token[_token2]), "invalid token"
     self.is_enabled_market[_token1][_token2] = True
     self.max_leverage[_token1][_token2] = _max_leverage
@@ -1518,7 +1886,7 @@ def enable_market(_token1: address, _token2: address, _max_leverage: uint256):
 def set_max_leverage_for_market(
     _token1: address, _token2: address, _max_leverage: uint256
 ):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.max_leverage[_token1][_token2] = _max_leverage
 
 
@@ -1526,13 +1894,13 @@ def set_max_leverage_for_market(
 def set_liquidate_slippage_for_market(
     _token1: address, _token2: address, _slippage: uint256
 ):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.liquidate_slippage[_token1][_token2] = _slippage
 
 
 @external
 def set_acceptable_amount_of_bad_debt(_address: address, _amount: uint256):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.acceptable_amount_of_bad_debt[_address] = _amount
 
 
@@ -1546,18 +1914,18 @@ def set_fee_configuration(
     _trading_fee_safety_module_interest_share_percentage: uint256,
     _trading_fee_lp_share_percentage: uint256
 ):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
 
-    assert _trading_fee <= PERCENTAGE_BASE, "cannot be more than 100%"
-    self.trade_open_fee = _trading_fee
+    assert (
+        _trading_fee <= PERCENTAGE_BASE
+        and _liquidation_penalty <= PERCENTAGE_BASE
+        and _trading_fee_safety_module_interest_share_percentage <= PERCENTAGE_BASE
+        and _trading_fee_lp_share_percentage <= PERCENTAGE_BASE
+    ), "cannot be more than 100%"
 
-    assert _liquidation_penalty <= PERCENTAGE_BASE, "cannot be more than 100%"
+    self.trade_open_fee = _trading_fee
     self.liquidation_penalty = _liquidation_penalty
-
-    assert _trading_fee_safety_module_interest_share_percentage <= PERCENTAGE_BASE, "cannot be more than 100%"
     self.safety_module_interest_share_percentage = _trading_fee_safety_module_interest_share_percentage
-
-    assert _trading_fee_lp_share_percentage <= PERCENTAGE_BASE, "cannot be more than 100%"
     self.trading_fee_lp_share = _trading_fee_lp_share_percentage
 
 
@@ -1566,28 +1934,50 @@ def set_fee_configuration(
 #
 @external
 def set_protocol_fee_receiver(_receiver: address):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.protocol_fee_receiver = _receiver
 
 
 @external
 def set_is_whitelisted_dex(_dex: address, _whitelisted: bool):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.is_whitelisted_dex[_dex] = _whitelisted
 
 
 @external
 def set_swap_router(_swap_router: address):
-    assert msg.sender == self.admin, "unauthorized"
+    """
+    @notice
+        Replaces the swap_router, the standing allowances of the
+        previous one are revoked.
+    """
+    self._only_admin()
+    for token in self.standing_allowance_tokens:
+        ERC20(token).approve(self.swap_router, 0)
     self.swap_router = _swap_router
 
 
+@external
+def set_swap_router_allowance(_token: address, _amount: uint256):
+    """
+    @notice
+        Lets the swap_router keep a standing allowance of up to
+        _amount of _token, topped up once a swap needs more than
+        is left. 0 approves every swap and revokes what is left.
+    """
+    self._only_admin()
+    self.swap_router_allowance[_token] = _amount
+    ERC20(_token).approve(self.swap_router, _amount)
+    if _token not in self.standing_allowance_tokens:
+        self.standing_allowance_tokens.append(_token)
+
+
 #
 # config
 #
 @external
 def set_withdraw_liquidity_cooldown(_seconds: uint256):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
     self.withdraw_liquidity_cooldown = _seconds
 
 
@@ -1599,13 +1989,23 @@ def set_variable_interest_parameters(
     _max_interest_rate: uint256,
     _rate_switch_utilization: uint256,
 ):
-    assert msg.sender == self.admin, "unauthorized"
+    self._only_admin()
 
     self._update_debt(_address)
     
-    self.interest_configuration[_address] = [
+    # unset parameters fall back to the default configuration
+    configuration: uint256[4] = [
         _min_interest_rate,
         _mid_interest_rate,
         _max_interest_rate,
         _rate_switch_utilization,
-    ]
\ No newline at end of file
+    ]
+    for i in range(4):
+        if configuration[i] == 0:
+            configuration[i] = FALLBACK_INTEREST_CONFIGURATION[i]
+
+    self.interest_configuration[_address] = configuration
+
+    self.interest_curve[_address] = self._pack_interest_curve(
+        configuration[0], configuration[1], configuration[2], configuration[3]
+    )
\ No newline at end of file
@@ -39,6 +39,15 @@ struct ExactInputParams:
 interface UniswapV3SwapRouter:
     def exactInput(_params: ExactInputParams) -> uint256: payable
 
+# pre-encoded Uniswap path with the hops it was validated from
+struct Route:
+    path: Bytes[66]
+    tokens: DynArray[address, 3]
+    fees: DynArray[uint24, 2]
+
+interface RouteRegistry:
+    def routes(_route_id: uint256) -> Route: view
+
 interface Univ3Twap:
     def getTwap(_path: DynArray[address, 3], _fees: DynArray[uint24, 2], _twapLength: uint32) -> uint256: view
 
@@ -57,6 +66,11 @@ VALID_BASE_TOKENS: constant(address[4]) = [
 TWAP: constant(address) = 0xFa64f316e627aD8360de2476aF0dD9250018CFc5 
 
 FEE_BASE: constant(uint256) = 1000000 # 100 percent
+
+MAX_PAGE_SIZE: constant(uint256) = 128
+MAX_UIDS_PAGE_SIZE: constant(uint256) = 1024
+MAX_EXECUTION_BATCH_SIZE: constant(uint256) = 64
+
 fee: public(uint256) # = 1000 # 0.1%
 
 MAX_SLIPPAGE: constant(uint256) = 10000 # 1 percent
@@ -82,6 +96,8 @@ struct DcaOrder:
 
 # user address -> DcaOrder UID
 dca_order_uids: public(HashMap[address, DynArray[bytes32, 1024]])
+# UID -> index in dca_order_uids
+dca_order_uid_index: HashMap[bytes32, uint256]
 # UID -> DcaOrder
 dca_orders: public(HashMap[bytes32, DcaOrder])
 position_nonce: uint256
@@ -89,6 +105,9 @@ position_nonce: uint256
 is_paused: public(bool)
 is_accepting_new_orders: public(bool)
 
+# SwapRouter holding the pre-encoded routes
+route_registry: public(address)
+
 @external
 def __init__():
     self.owner = msg.sender
@@ -146,6 +165,7 @@ def post_dca_order(
     order.uid = uid
 
     self.dca_orders[uid] = order
+    self.dca_order_uid_index[uid] = len(self.dca_order_uids[msg.sender])
     self.dca_order_uids[msg.sender].append(uid)
 
     log DcaOrderPosted(uid, msg.sender, _token_in, _token_out, _amount_in_per_execution, _seconds_between_executions, _max_number_of_executions, _twap_length)
@@ -171,6 +191,29 @@ event DcaCompleted:
 @external
 @nonreentrant('lock')
 def execute_dca_order(_uid: bytes32, _uni_hop_path: DynArray[address, 3], _uni_pool_fees: DynArray[uint24, 2], _share_profit: bool):
+    # ensure path is valid
+    assert len(_uni_hop_path) in [2, 3], "[path] invlid path"
+    assert len(_uni_pool_fees) == len(_uni_hop_path)-1, "[path] invalid fees"
+
+    self._execute_dca_order(_uid, _uni_hop_path, _uni_pool_fees, self._uni_path(_uni_hop_path, _uni_pool_fees), _share_profit)
+
+
+@external
+@nonreentrant('lock')
+def execute_dca_order_with_route(_uid: bytes32, _route_id: uint256, _share_profit: bool):
+    """
+    @notice
+        Executes a DCA order along a route pre-encoded in the
+        route_registry instead of a caller supplied path.
+    """
+    route: Route = RouteRegistry(self.route_registry).routes(_route_id)
+    assert len(route.tokens) != 0, "[path] unknown route"
+
+    self._execute_dca_order(_uid, route.tokens, route.fees, route.path, _share_profit)
+
+
+@internal
+def _execute_dca_order(_uid: bytes32, _uni_hop_path: DynArray[address, 3], _uni_pool_fees: DynArray[uint24, 2], _path: Bytes[66], _share_profit: bool):
     assert not self.is_paused, "paused"
 
     order: DcaOrder = self.dca_orders[_uid]
@@ -179,9 +222,6 @@ def execute_dca_order(_uid: bytes32, _uni_hop_path: DynArray[address, 3], _uni_p
     assert order.number_of_executions < order.max_number_of_executions, "max executions completed"
     assert order.last_execution + order.seconds_between_executions < block.timestamp, "too soon"
 
-    # ensure path is valid
-    assert len(_uni_hop_path) in [2, 3], "[path] invlid path"
-    assert len(_uni_pool_fees) == len(_uni_hop_path)-1, "[path] invalid fees"
     assert _uni_hop_path[0] == order.token_in, "[path] invalid token_in"
     assert _uni_hop_path[len(_uni_hop_path)-1] == order.token_out, "[path] invalid token_out"
 
@@ -216,20 +256,12 @@ def execute_dca_order(_uid: bytes32, _uni_hop_path: DynArray[address, 3], _uni_p
 
     execution_amount: uint256 = ERC20(order.token_in).balanceOf(self) - balance_before
 
-    # approve UNISWAP_ROUTER to spend token_in
-    ERC20(order.token_in).approve(UNISWAP_ROUTER, execution_amount)
+    self._approve_router(order.token_in, execution_amount)
 
-    # Vyper way to accommodate abi.encode_packed
-    path: Bytes[66] = empty(Bytes[66])
-    if(len(_uni_hop_path) == 2):
-        path = concat(convert(_uni_hop_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_uni_hop_path[1], bytes20))
-    elif(len(_uni_hop_path) == 3):
-        path = concat(convert(_uni_hop_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_uni_hop_path[1], bytes20), convert(_uni_pool_fees[1], bytes3), convert(_uni_hop_path[2], bytes20))
-    
     min_amount_out: uint256 = self._calc_min_amount_out(execution_amount, _uni_hop_path, _uni_pool_fees, order.twap_length, order.max_slippage)
 
     uni_params: ExactInputParams = ExactInputParams({
-        path: path,
+        path: _path,
         recipient: self,
         deadline: block.timestamp,
         amountIn: execution_amount,
@@ -253,6 +285,122 @@ def execute_dca_order(_uid: bytes32, _uni_hop_path: DynArray[address, 3], _uni_p
         log DcaCompleted(_uid, order.account)
 
 
+@external
+@nonreentrant('lock')
+def execute_dca_orders(_uids: DynArray[bytes32, MAX_EXECUTION_BATCH_SIZE], _uni_hop_path: DynArray[address, 3], _uni_pool_fees: DynArray[uint24, 2], _share_profit: bool):
+    """
+    @notice
+        Executes multiple due DCA orders on the same pair with a
+        single swap and splits the output pro rata by amount in.
+        The TWAP is read once, using the twap_length of the first
+        executed order, and the batch min_amount_out is based on the lowest
+        max_slippage among the executed orders.
+        Orders that cannot be executed are skipped and logged
+        with DcaOrderFailed instead of reverting the batch.
+    """
+    assert not self.is_paused, "paused"
+    assert len(_uids) > 0, "empty batch"
+
+    # ensure path is valid
+    assert len(_uni_hop_path) in [2, 3], "[path] invlid path"
+    assert len(_uni_pool_fees) == len(_uni_hop_path)-1, "[path] invalid fees"
+    if len(_uni_hop_path) == 3:
+        assert _uni_hop_path[1] in VALID_BASE_TOKENS, "[path] invalid base token"
+
+    token_in: address = _uni_hop_path[0]
+    token_out: address = _uni_hop_path[len(_uni_hop_path)-1]
+    twap_length: uint32 = 0
+    max_slippage: uint256 = max_value(uint256)
+
+    executed_uids: DynArray[bytes32, MAX_EXECUTION_BATCH_SIZE] = []
+    execution_amounts: DynArray[uint256, MAX_EXECUTION_BATCH_SIZE] = []
+    total_execution_amount: uint256 = 0
+
+    for uid in _uids:
+        order: DcaOrder = self.dca_orders[uid]
+
+        if order.token_in != token_in or order.token_out != token_out:
+            log DcaOrderFailed(uid, order.account, "[path] invalid pair")
+            continue
+        if order.number_of_executions >= order.max_number_of_executions:
+            log DcaOrderFailed(uid, order.account, "max executions completed")
+            continue
+        if order.last_execution + order.seconds_between_executions >= block.timestamp:
+            log DcaOrderFailed(uid, order.account, "too soon")
+            continue
+        if len(executed_uids) > 0 and order.twap_length != twap_length:
+            log DcaOrderFailed(uid, order.account, "twap length mismatch")
+            continue
+
+        # effects
+        self.dca_orders[uid].last_execution = block.timestamp
+        self.dca_orders[uid].number_of_executions = order.number_of_executions + 1
+
+        # ensure user has enough token_in
+        account_balance: uint256 = ERC20(order.token_in).balanceOf(order.account)
+        if account_balance < order.amount_in_per_execution:
+            log DcaOrderFailed(uid, order.account, "insufficient balance")
+            self._cancel_dca_order(uid, "insufficient balance")
+            continue
+
+        # ensure self has enough allowance to spend amount token_in
+        account_allowance: uint256 = ERC20(order.token_in).allowance(order.account, self)
+        if account_allowance < order.amount_in_per_execution:
+            log DcaOrderFailed(uid, order.account, "insufficient allowance")
+            self._cancel_dca_order(uid, "insufficient allowance")
+            continue
+
+        balance_before: uint256 = ERC20(token_in).balanceOf(self)
+        self._safe_transfer_from(token_in, order.account, self, order.amount_in_per_execution)
+        execution_amount: uint256 = ERC20(token_in).balanceOf(self) - balance_before
+
+        if len(executed_uids) == 0:
+            twap_length = order.twap_length
+        executed_uids.append(uid)
+        execution_amounts.append(execution_amount)
+        total_execution_amount += execution_amount
+        max_slippage = min(max_slippage, order.max_slippage)
+
+    if len(executed_uids) == 0:
+        return
+
+    self._approve_router(token_in, total_execution_amount)
+
+    min_amount_out: uint256 = self._calc_min_amount_out(total_execution_amount, _uni_hop_path, _uni_pool_fees, twap_length, max_slippage)
+
+    uni_params: ExactInputParams = ExactInputParams({
+        path: self._uni_path(_uni_hop_path, _uni_pool_fees),
+        recipient: self,
+        deadline: block.timestamp,
+        amountIn: total_execution_amount,
+        amountOutMinimum: min_amount_out
+    })
+    amount_out: uint256 = UniswapV3SwapRouter(UNISWAP_ROUTER).exactInput(uni_params)
+
+    total_profit: uint256 = 0
+    for i in range(MAX_EXECUTION_BATCH_SIZE):
+        if i == len(executed_uids):
+            break
+        uid: bytes32 = executed_uids[i]
+        order: DcaOrder = self.dca_orders[uid]
+
+        # transfer pro rata amount_out - fee to user
+        order_amount_out: uint256 = amount_out * execution_amounts[i] / total_execution_amount
+        amount_minus_fee: uint256 = order_amount_out * (FEE_BASE - self.fee) / FEE_BASE
+        self._safe_transfer(token_out, order.account, amount_minus_fee)
+        total_profit += order_amount_out - amount_minus_fee
+
+        log DcaOrderExecuted(uid, order.account, order.number_of_executions, order.amount_in_per_execution, amount_minus_fee)
+
+        if order.number_of_executions == order.max_number_of_executions:
+            self._cleanup_order(uid)
+            log DcaCompleted(uid, order.account)
+
+    # allows searchers to execute for 50% of profits
+    if _share_profit:
+        self._safe_transfer(token_out, msg.sender, total_profit/2)
+
+
 @view
 @external
 def calc_min_amount_out(
@@ -292,6 +440,15 @@ def _calc_min_amount_out(
     return min_amount_out
 
 
+@pure
+@internal
+def _uni_path(_path: DynArray[address, 3], _uni_pool_fees: DynArray[uint24, 2]) -> Bytes[66]:
+    # Vyper way to accommodate abi.encode_packed
+    if len(_path) == 2:
+        return concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20))
+    return concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20), convert(_uni_pool_fees[1], bytes3), convert(_path[2], bytes20))
+
+
 event DcaOrderCanceled:
     uid: bytes32
     reason: String[32]
@@ -317,15 +474,15 @@ def _cleanup_order(_uid: bytes32):
     order: DcaOrder = self.dca_orders[_uid]
     self.dca_orders[_uid] = empty(DcaOrder)
 
-    uids: DynArray[bytes32, 1024] = self.dca_order_uids[order.account]
-    for i in range(1024):
-        if uids[i] == _uid:
-            uids[i] = uids[len(uids) - 1]
-            uids.pop()
-            break
-        if i == len(uids)-1:
-            raise
-    self.dca_order_uids[order.account] = uids
+    # swap the last uid into the removed slot and pop
+    index: uint256 = self.dca_order_uid_index[_uid]
+    last_index: uint256 = len(self.dca_order_uids[order.account]) - 1
+    if index != last_index:
+        last_uid: bytes32 = self.dca_order_uids[order.account][last_index]
+        self.dca_order_uids[order.account][index] = last_uid
+        self.dca_order_uid_index[last_uid] = index
+    self.dca_order_uids[order.account].pop()
+    self.dca_order_uid_index[_uid] = 0
     
     log OrderCleanedUp(_uid, order.account)
 
@@ -342,6 +499,51 @@ def get_all_open_positions(_account: address) -> DynArray[DcaOrder, 1024]:
     return orders
 
 
+@view
+@external
+def open_positions_count(_account: address) -> uint256:
+    return len(self.dca_order_uids[_account])
+
+
+@view
+@external
+def get_open_positions(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[DcaOrder, MAX_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit open DCA orders of _account
+        starting at _offset.
+        The order changes when DCA orders are removed.
+    """
+    count: uint256 = len(self.dca_order_uids[_account])
+    orders: DynArray[DcaOrder, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        orders.append(self.dca_orders[self.dca_order_uids[_account][_offset + i]])
+    return orders
+
+
+@view
+@external
+def get_open_position_uids(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[bytes32, MAX_UIDS_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit uids of open DCA orders of
+        _account starting at _offset.
+    """
+    count: uint256 = len(self.dca_order_uids[_account])
+    uids: DynArray[bytes32, MAX_UIDS_PAGE_SIZE] = []
+    for i in range(MAX_UIDS_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        uids.append(self.dca_order_uids[_account][_offset + i])
+    return uids
+
+
 @external
 def withdraw_fees(_token: address):
     amount: uint256 = ERC20(_token).balanceOf(self)
@@ -393,6 +595,13 @@ def _safe_transfer_from(
         assert convert(res, bool), "transfer failed"
 
 
+@internal
+def _approve_router(_token: address, _amount: uint256):
+    # standing allowance, only topped up once it no longer covers _amount
+    if ERC20(_token).allowance(self, UNISWAP_ROUTER) < _amount:
+        ERC20(_token).approve(UNISWAP_ROUTER, max_value(uint256))
+
+
 #############################
 #
 #           ADMIN
@@ -411,6 +620,33 @@ def pause(_is_paused: bool):
     log Paused(_is_paused)
 
 
+event RouteRegistrySet:
+    route_registry: indexed(address)
+
+@external
+def set_route_registry(_route_registry: address):
+    assert msg.sender == self.owner, "unauthorized"
+
+    self.route_registry = _route_registry
+    log RouteRegistrySet(_route_registry)
+
+
+event AllowanceRevoked:
+    token: indexed(address)
+
+@external
+def revoke_allowance(_token: address):
+    """
+    @notice
+        Emergency path to revoke the standing allowance
+        of the Uniswap router for _token.
+    """
+    assert msg.sender == self.owner, "unauthorized"
+
+    ERC20(_token).approve(UNISWAP_ROUTER, 0)
+    log AllowanceRevoked(_token)
+
+
 event AcceptingNewOrders: 
     is_accepting_new_orders: bool
 
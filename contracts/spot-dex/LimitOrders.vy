@@ -39,9 +39,17 @@ struct ExactInputParams:
 interface UniswapV3SwapRouter:
     def exactInput(_params: ExactInputParams) -> uint256: payable
 
+interface RouteRegistry:
+    def route_path(_route_id: uint256) -> Bytes[66]: view
+
 
 UNISWAP_ROUTER: constant(address) = 0xE592427A0AEce92De3Edee1F18E0157C05861564
 
+MAX_PAGE_SIZE: constant(uint256) = 128
+MAX_UIDS_PAGE_SIZE: constant(uint256) = 1024
+MAX_EXECUTION_BATCH_SIZE: constant(uint256) = 64
+MAX_PURGE_BATCH_SIZE: constant(uint256) = 256
+
 # owner
 owner: public(address)
 suggested_owner: public(address)
@@ -58,6 +66,8 @@ struct LimitOrder:
 
 # user address -> position UID
 limit_order_uids: public(HashMap[address, DynArray[bytes32, 1024]])
+# UID -> index in limit_order_uids
+limit_order_uid_index: HashMap[bytes32, uint256]
 # UID -> position
 limit_orders: public(HashMap[bytes32, LimitOrder])
 position_nonce: uint256
@@ -65,6 +75,24 @@ position_nonce: uint256
 is_paused: public(bool)
 is_accepting_new_orders: public(bool)
 
+# SwapRouter holding the pre-encoded routes
+route_registry: public(address)
+
+# escrowed from the poster of every order, returned once the order
+# is executed or canceled and paid to the caller of purge_expired
+# once it expired
+purge_rebate_token: public(address)
+purge_rebate_per_order: public(uint256)
+
+struct PurgeDeposit:
+    token: address
+    amount: uint256
+
+# UID -> deposit escrowed when the order was posted
+purge_deposits: public(HashMap[bytes32, PurgeDeposit])
+# token -> sum of all escrowed deposits, not withdrawable as fees
+escrowed_purge_deposits: public(HashMap[address, uint256])
+
 @external
 def __init__():
     self.owner = msg.sender
@@ -91,8 +119,12 @@ def post_limit_order(
     assert self.is_accepting_new_orders, "not accepting new orders"
 
     # validate
+    assert _amount_in > 0, "invalid amount_in"
     assert _valid_until >= block.timestamp, "invalid timestamp"
 
+    uid: bytes32 = self._generate_uid()
+    self._escrow_purge_deposit(uid)
+
     # check msg.sender approved contract to spend amount token_in
     allowance: uint256 = ERC20(_token_in).allowance(msg.sender, self)
     assert allowance >= _amount_in, "insufficient allowance"
@@ -107,10 +139,10 @@ def post_limit_order(
         valid_until: _valid_until
     })
 
-    uid: bytes32 = self._generate_uid()
     order.uid = uid
 
     self.limit_orders[uid] = order
+    self.limit_order_uid_index[uid] = len(self.limit_order_uids[msg.sender])
     self.limit_order_uids[msg.sender].append(uid)
 
     log LimitOrderPosted(uid, _token_in, _token_out, _amount_in, _min_amount_out, _valid_until)
@@ -131,7 +163,6 @@ def execute_limit_order(_uid: bytes32, _path: DynArray[address, 3], _uni_pool_fe
     assert not self.is_paused, "paused"
 
     order: LimitOrder = self.limit_orders[_uid]
-    # TODO how to clean up expired orders?
     assert order.valid_until >= block.timestamp, "order expired"
 
     # ensure path is valid
@@ -140,6 +171,33 @@ def execute_limit_order(_uid: bytes32, _path: DynArray[address, 3], _uni_pool_fe
     assert _path[0] == order.token_in, "[path] invalid token_in"
     assert _path[len(_path)-1] == order.token_out, "[path] invalid token_out"
 
+    self._execute_limit_order(_uid, order, self._uni_path(_path, _uni_pool_fees), _share_profit)
+
+
+@external
+def execute_limit_order_with_route(_uid: bytes32, _route_id: uint256, _share_profit: bool):
+    """
+    @notice
+        Executes a limit order along a route pre-encoded in the
+        route_registry instead of a caller supplied path.
+    """
+    assert not self.is_paused, "paused"
+
+    order: LimitOrder = self.limit_orders[_uid]
+    assert order.valid_until >= block.timestamp, "order expired"
+
+    path: Bytes[66] = RouteRegistry(self.route_registry).route_path(_route_id)
+    assert len(path) != 0, "[path] unknown route"
+    assert convert(slice(path, 0, 20), address) == order.token_in, "[path] invalid token_in"
+    assert convert(slice(path, len(path)-20, 20), address) == order.token_out, "[path] invalid token_out"
+
+    self._execute_limit_order(_uid, order, path, _share_profit)
+
+
+@internal
+def _execute_limit_order(_uid: bytes32, _order: LimitOrder, _path: Bytes[66], _share_profit: bool):
+    order: LimitOrder = _order
+
     # ensure user has enough token_in
     account_balance: uint256 = ERC20(order.token_in).balanceOf(order.account)
     if account_balance < order.amount_in:
@@ -156,6 +214,7 @@ def execute_limit_order(_uid: bytes32, _path: DynArray[address, 3], _uni_pool_fe
 
     # cleanup storage
     self._cleanup_order(_uid)
+    self._release_purge_deposit(_uid, order.account)
 
     balance_before: uint256 = ERC20(order.token_in).balanceOf(self)
     
@@ -164,35 +223,234 @@ def execute_limit_order(_uid: bytes32, _path: DynArray[address, 3], _uni_pool_fe
 
     execution_amount: uint256 = ERC20(order.token_in).balanceOf(self) - balance_before
 
-    # approve UNISWAP_ROUTER to spend token_in
-    ERC20(order.token_in).approve(UNISWAP_ROUTER, execution_amount)
+    self._approve_router(order.token_in, execution_amount)
+
+    uni_params: ExactInputParams = ExactInputParams({
+        path: _path,
+        recipient: self,
+        deadline: block.timestamp,
+        amountIn: execution_amount,
+        amountOutMinimum: order.min_amount_out
+    })
+    amount_out: uint256 = UniswapV3SwapRouter(UNISWAP_ROUTER).exactInput(uni_params)
 
-    path: Bytes[66] = empty(Bytes[66])
-    if(len(_path) == 2):
-        path = concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20))
-    elif(len(_path) == 3):
-        path = concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20), convert(_uni_pool_fees[1], bytes3), convert(_path[2], bytes20))
+    self._pay_out(order, amount_out, _share_profit)
     
+    log LimitOrderExecuted(_uid, order.account)
+
+
+@external
+def execute_limit_orders(
+    _uids: DynArray[bytes32, MAX_EXECUTION_BATCH_SIZE],
+    _paths: DynArray[DynArray[address, 3], MAX_EXECUTION_BATCH_SIZE],
+    _uni_pool_fees: DynArray[DynArray[uint24, 2], MAX_EXECUTION_BATCH_SIZE],
+    _share_profit: bool
+):
+    """
+    @notice
+        Executes multiple limit orders in a single transaction.
+        Orders that cannot be executed are skipped and logged
+        with LimitOrderFailed instead of reverting the batch.
+        The standing router allowance is only topped up by an
+        order whose token_in it no longer covers.
+    """
+    assert not self.is_paused, "paused"
+    assert len(_paths) == len(_uids) and len(_uni_pool_fees) == len(_uids), "invalid batch"
+
+    for i in range(MAX_EXECUTION_BATCH_SIZE):
+        if i == len(_uids):
+            break
+        self._try_execute_limit_order(_uids[i], _paths[i], _uni_pool_fees[i], _share_profit)
+
+
+@internal
+def _try_execute_limit_order(
+    _uid: bytes32,
+    _path: DynArray[address, 3],
+    _uni_pool_fees: DynArray[uint24, 2],
+    _share_profit: bool
+):
+    order: LimitOrder = self.limit_orders[_uid]
+    if order.account == empty(address):
+        log LimitOrderFailed(_uid, order.account, "unknown order")
+        return
+
+    if order.valid_until < block.timestamp:
+        log LimitOrderFailed(_uid, order.account, "order expired")
+        return
+
+    is_valid_path: bool = len(_path) in [2, 3] and len(_uni_pool_fees) + 1 == len(_path)
+    if is_valid_path:
+        is_valid_path = _path[0] == order.token_in and _path[len(_path) - 1] == order.token_out
+    if not is_valid_path:
+        log LimitOrderFailed(_uid, order.account, "invalid path")
+        return
+
+    # ensure user has enough token_in
+    account_balance: uint256 = ERC20(order.token_in).balanceOf(order.account)
+    if account_balance < order.amount_in:
+        log LimitOrderFailed(_uid, order.account, "insufficient balance")
+        self._cancel_limit_order(_uid)
+        return
+
+    # ensure self has enough allowance to spend amount token_in
+    account_allowance: uint256 = ERC20(order.token_in).allowance(order.account, self)
+    if account_allowance < order.amount_in:
+        log LimitOrderFailed(_uid, order.account, "insufficient allowance")
+        self._cancel_limit_order(_uid)
+        return
+
+    balance_before: uint256 = ERC20(order.token_in).balanceOf(self)
+    self._safe_transfer_from(order.token_in, order.account, self, order.amount_in)
+    execution_amount: uint256 = ERC20(order.token_in).balanceOf(self) - balance_before
+
+    self._approve_router(order.token_in, execution_amount)
 
     uni_params: ExactInputParams = ExactInputParams({
-        path: path,
+        path: self._uni_path(_path, _uni_pool_fees),
         recipient: self,
         deadline: block.timestamp,
         amountIn: execution_amount,
         amountOutMinimum: order.min_amount_out
     })
-    amount_out: uint256 = UniswapV3SwapRouter(UNISWAP_ROUTER).exactInput(uni_params)
+    success: bool = False
+    response: Bytes[32] = b""
+    success, response = raw_call(
+        UNISWAP_ROUTER,
+        _abi_encode(uni_params, method_id=method_id("exactInput((bytes,address,uint256,uint256,uint256))")),
+        max_outsize=32,
+        revert_on_failure=False
+    )
+    if not success:
+        # return token_in, the order stays open
+        self._safe_transfer(order.token_in, order.account, execution_amount)
+        log LimitOrderFailed(_uid, order.account, "swap failed")
+        return
+
+    self._cleanup_order(_uid)
+    self._release_purge_deposit(_uid, order.account)
+    self._pay_out(order, convert(response, uint256), _share_profit)
+
+    log LimitOrderExecuted(_uid, order.account)
+
+
+event LimitOrdersMatched:
+    token_x: indexed(address)
+    token_y: indexed(address)
+    # token_x paid to makers selling token_y and vice versa
+    amount_x: uint256
+    amount_y: uint256
+    # token_x swapped through Uniswap
+    amount_swapped: uint256
+
+@external
+@nonreentrant("lock")
+def match_limit_orders(
+    _uids: DynArray[bytes32, MAX_EXECUTION_BATCH_SIZE],
+    _path: DynArray[address, 3],
+    _uni_pool_fees: DynArray[uint24, 2],
+    _share_profit: bool
+):
+    """
+    @notice
+        Settles crossing limit orders of both directions on a pair
+        against each other.
+        Every maker receives exactly its min_amount_out. The side
+        with a surplus of token_in covers the other side and only
+        the net remainder is swapped through Uniswap along _path,
+        which must go from the surplus token to the short token.
+        Anything above the min amounts out stays in the contract
+        as profit.
+    """
+    assert not self.is_paused, "paused"
+
+    # ensure path is valid
+    assert len(_path) in [2, 3], "[path] invlid path"
+    assert len(_uni_pool_fees) == len(_path)-1, "[path] invalid fees"
+
+    token_x: address = _path[0]
+    token_y: address = _path[len(_path)-1]
+    assert token_x != token_y, "[path] invalid pair"
+
+    balance_x: uint256 = ERC20(token_x).balanceOf(self)
+    balance_y: uint256 = ERC20(token_y).balanceOf(self)
+
+    orders: DynArray[LimitOrder, MAX_EXECUTION_BATCH_SIZE] = []
+    # amounts of token_x owed to makers selling token_y and vice versa
+    needed_x: uint256 = 0
+    needed_y: uint256 = 0
+    for uid in _uids:
+        order: LimitOrder = self.limit_orders[uid]
+        assert order.account != empty(address), "unknown order"
+        assert order.valid_until >= block.timestamp, "order expired"
+
+        if order.token_in == token_x and order.token_out == token_y:
+            needed_y += order.min_amount_out
+        elif order.token_in == token_y and order.token_out == token_x:
+            needed_x += order.min_amount_out
+        else:
+            raise "[path] invalid pair"
+
+        self._cleanup_order(uid)
+        self._safe_transfer_from(order.token_in, order.account, self, order.amount_in)
+        orders.append(order)
+
+    amount_x: uint256 = ERC20(token_x).balanceOf(self) - balance_x
+    amount_y: uint256 = ERC20(token_y).balanceOf(self) - balance_y
+    if amount_x < needed_x:
+        assert amount_y > needed_y, "orders do not cross"
+        raise "[path] invalid direction"
+
+    # swap the surplus of token_x for the shortfall of token_y
+    amount_swapped: uint256 = 0
+    if amount_y < needed_y:
+        assert amount_x > needed_x, "orders do not cross"
+        amount_swapped = amount_x - needed_x
+        self._approve_router(token_x, amount_swapped)
+        uni_params: ExactInputParams = ExactInputParams({
+            path: self._uni_path(_path, _uni_pool_fees),
+            recipient: self,
+            deadline: block.timestamp,
+            amountIn: amount_swapped,
+            amountOutMinimum: needed_y - amount_y
+        })
+        amount_y += UniswapV3SwapRouter(UNISWAP_ROUTER).exactInput(uni_params)
+        amount_x = needed_x
+
+    log LimitOrdersMatched(token_x, token_y, needed_x, needed_y, amount_swapped)
+
+    for order in orders:
+        self._safe_transfer(order.token_out, order.account, order.min_amount_out)
+        # after settling, the token balances above exclude the deposits
+        self._release_purge_deposit(order.uid, order.account)
+        log LimitOrderExecuted(order.uid, order.account)
+
+    # allows searchers to execute for 50% of profits
+    if _share_profit:
+        if amount_x > needed_x:
+            self._safe_transfer(token_x, msg.sender, (amount_x - needed_x)/2)
+        if amount_y > needed_y:
+            self._safe_transfer(token_y, msg.sender, (amount_y - needed_y)/2)
+
 
+@internal
+def _pay_out(_order: LimitOrder, _amount_out: uint256, _share_profit: bool):
     # transfer min_amount_out of token_out from self back to user
     # anything > min_amount_out stays in contract as profit
-    self._safe_transfer(order.token_out, order.account, order.min_amount_out)
+    self._safe_transfer(_order.token_out, _order.account, _order.min_amount_out)
 
     # allows searchers to execute for 50% of profits
     if _share_profit:
-        profit: uint256 = amount_out - order.min_amount_out
-        self._safe_transfer(order.token_out, msg.sender, profit/2)
-    
-    log LimitOrderExecuted(_uid, order.account)
+        profit: uint256 = _amount_out - _order.min_amount_out
+        self._safe_transfer(_order.token_out, msg.sender, profit/2)
+
+
+@pure
+@internal
+def _uni_path(_path: DynArray[address, 3], _uni_pool_fees: DynArray[uint24, 2]) -> Bytes[66]:
+    if len(_path) == 2:
+        return concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20))
+    return concat(convert(_path[0], bytes20), convert(_uni_pool_fees[0], bytes3), convert(_path[1], bytes20), convert(_uni_pool_fees[1], bytes3), convert(_path[2], bytes20))
 
 
 
@@ -207,7 +465,9 @@ def cancel_limit_order(_uid: bytes32):
 
 @internal
 def _cancel_limit_order(_uid: bytes32):
+    account: address = self.limit_orders[_uid].account
     self._cleanup_order(_uid)
+    self._release_purge_deposit(_uid, account)
     log LimitOrderCanceled(_uid)
 
 
@@ -217,22 +477,94 @@ event OrderCleanedUp:
 
 @internal
 def _cleanup_order(_uid: bytes32):
-    order: LimitOrder = self.limit_orders[_uid]
+    account: address = self.limit_orders[_uid].account
+    self._remove_order(_uid, account)
+    
+    log OrderCleanedUp(_uid, account)
+
+
+@internal
+def _remove_order(_uid: bytes32, _account: address):
     self.limit_orders[_uid] = empty(LimitOrder)
 
-    uids: DynArray[bytes32, 1024] = self.limit_order_uids[order.account]
-    for i in range(1024):
-        if uids[i] == _uid:
-            uids[i] = uids[len(uids) - 1]
-            uids.pop()
-            break
-        if i == len(uids)-1:
-            raise
-    self.limit_order_uids[order.account] = uids
-    
-    log OrderCleanedUp(_uid, order.account)
+    # swap the last uid into the removed slot and pop
+    index: uint256 = self.limit_order_uid_index[_uid]
+    last_index: uint256 = len(self.limit_order_uids[_account]) - 1
+    if index != last_index:
+        last_uid: bytes32 = self.limit_order_uids[_account][last_index]
+        self.limit_order_uids[_account][index] = last_uid
+        self.limit_order_uid_index[last_uid] = index
+    self.limit_order_uids[_account].pop()
+    self.limit_order_uid_index[_uid] = 0
+
+
+event ExpiredOrdersPurged:
+    uids: DynArray[bytes32, MAX_PURGE_BATCH_SIZE]
+    caller: indexed(address)
+    rebate: uint256
+
+@external
+@nonreentrant("lock")
+def purge_expired(_uids: DynArray[bytes32, MAX_PURGE_BATCH_SIZE]) -> uint256:
+    """
+    @notice
+        Removes expired limit orders, anyone may call this.
+        Unknown and not yet expired orders are skipped.
+        The caller receives the purge deposits escrowed by the
+        posters of the purged orders, so purging own orders
+        only returns the deposit that was paid to post them.
+        Returns the number of purged orders.
+    """
+    rebate_token: address = self.purge_rebate_token
+    purged: DynArray[bytes32, MAX_PURGE_BATCH_SIZE] = []
+    rebate: uint256 = 0
+    for uid in _uids:
+        account: address = self.limit_orders[uid].account
+        if account == empty(address) or self.limit_orders[uid].valid_until >= block.timestamp:
+            continue
+        self._remove_order(uid, account)
+        purged.append(uid)
+
+        if self.purge_deposits[uid].amount == 0:
+            continue
+        deposit: PurgeDeposit = self.purge_deposits[uid]
+        self.purge_deposits[uid] = empty(PurgeDeposit)
+        self.escrowed_purge_deposits[deposit.token] -= deposit.amount
+        if deposit.token == rebate_token:
+            rebate += deposit.amount
+        else:
+            # escrowed before the rebate token was changed
+            self._safe_transfer(deposit.token, msg.sender, deposit.amount)
+
+    if rebate > 0:
+        self._safe_transfer(rebate_token, msg.sender, rebate)
+
+    log ExpiredOrdersPurged(purged, msg.sender, rebate)
+    return len(purged)
+
+
+@internal
+def _escrow_purge_deposit(_uid: bytes32):
+    token: address = self.purge_rebate_token
+    amount: uint256 = self.purge_rebate_per_order
+    if token == empty(address) or amount == 0:
+        return
+
+    self._safe_transfer_from(token, msg.sender, self, amount)
+    self.purge_deposits[_uid] = PurgeDeposit({token: token, amount: amount})
+    self.escrowed_purge_deposits[token] += amount
 
-# TODO def cleanup_exired(_uids: bytes32[])
+
+@internal
+def _release_purge_deposit(_uid: bytes32, _account: address):
+    amount: uint256 = self.purge_deposits[_uid].amount
+    if amount == 0:
+        return
+
+    token: address = self.purge_deposits[_uid].token
+    self.purge_deposits[_uid] = empty(PurgeDeposit)
+    self.escrowed_purge_deposits[token] -= amount
+    self._safe_transfer(token, _account, amount)
 
 
 @view
@@ -247,9 +579,54 @@ def get_all_open_positions(_account: address) -> DynArray[LimitOrder, 1024]:
     return orders
 
 
+@view
+@external
+def open_positions_count(_account: address) -> uint256:
+    return len(self.limit_order_uids[_account])
+
+
+@view
+@external
+def get_open_positions(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[LimitOrder, MAX_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit open limit orders of _account
+        starting at _offset.
+        The order changes when limit orders are removed.
+    """
+    count: uint256 = len(self.limit_order_uids[_account])
+    orders: DynArray[LimitOrder, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        orders.append(self.limit_orders[self.limit_order_uids[_account][_offset + i]])
+    return orders
+
+
+@view
+@external
+def get_open_position_uids(
+    _account: address, _offset: uint256, _limit: uint256
+) -> DynArray[bytes32, MAX_UIDS_PAGE_SIZE]:
+    """
+    @notice
+        Returns up to _limit uids of open limit orders of
+        _account starting at _offset.
+    """
+    count: uint256 = len(self.limit_order_uids[_account])
+    uids: DynArray[bytes32, MAX_UIDS_PAGE_SIZE] = []
+    for i in range(MAX_UIDS_PAGE_SIZE):
+        if i >= _limit or _offset + i >= count:
+            break
+        uids.append(self.limit_order_uids[_account][_offset + i])
+    return uids
+
+
 @external
 def withdraw_fees(_token: address):
-    amount: uint256 = ERC20(_token).balanceOf(self)
+    amount: uint256 = ERC20(_token).balanceOf(self) - self.escrowed_purge_deposits[_token]
     assert amount > 0, "zero balance"
 
     self._safe_transfer(_token, self.owner, amount)
@@ -297,6 +674,13 @@ def _safe_transfer_from(
         assert convert(res, bool), "transfer failed"
 
 
+@internal
+def _approve_router(_token: address, _amount: uint256):
+    # standing allowance, only topped up once it no longer covers _amount
+    if ERC20(_token).allowance(self, UNISWAP_ROUTER) < _amount:
+        ERC20(_token).approve(UNISWAP_ROUTER, max_value(uint256))
+
+
 #############################
 #
 #           ADMIN
@@ -315,6 +699,51 @@ def pause(_is_paused: bool):
     log Paused(_is_paused)
 
 
+event PurgeRebateSet:
+    token: indexed(address)
+    amount_per_order: uint256
+
+@external
+def set_purge_rebate(_token: address, _amount_per_order: uint256):
+    """
+    @notice
+        Sets the deposit escrowed from the poster of every new
+        order. Orders posted before keep their deposit.
+    """
+    assert msg.sender == self.owner, "unauthorized"
+
+    self.purge_rebate_token = _token
+    self.purge_rebate_per_order = _amount_per_order
+    log PurgeRebateSet(_token, _amount_per_order)
+
+
+event RouteRegistrySet:
+    route_registry: indexed(address)
+
+@external
+def set_route_registry(_route_registry: address):
+    assert msg.sender == self.owner, "unauthorized"
+
+    self.route_registry = _route_registry
+    log RouteRegistrySet(_route_registry)
+
+
+event AllowanceRevoked:
+    token: indexed(address)
+
+@external
+def revoke_allowance(_token: address):
+    """
+    @notice
+        Emergency path to revoke the standing allowance
+        of the Uniswap router for _token.
+    """
+    assert msg.sender == self.owner, "unauthorized"
+
+    ERC20(_token).approve(UNISWAP_ROUTER, 0)
+    log AllowanceRevoked(_token)
+
+
 event AcceptingNewOrders: 
     is_accepting_new_orders: bool
 
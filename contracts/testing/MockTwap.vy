@@ -0,0 +1,21 @@
+# @version ^0.3.7
+
+interface Univ3Twap:
+    def getTwap(_path: DynArray[address, 3], _fees: DynArray[uint24, 2], _twapLength: uint32) -> uint256: view
+
+implements: Univ3Twap
+
+@external
+def __init__(_twap: uint256):
+    self.twap = _twap
+
+twap: public(uint256)
+
+@external
+def set_twap(_twap: uint256):
+    self.twap = _twap
+
+@view
+@external
+def getTwap(_path: DynArray[address, 3], _fees: DynArray[uint24, 2], _twapLength: uint32) -> uint256:
+    return self.twap
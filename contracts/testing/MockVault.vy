@@ -67,3 +67,39 @@ def _generate_uid() -> bytes32:
     self.uid_nonce += 1
     return uid
 
+
+
+mock_position_amount: uint256
+mock_exchange_rate: uint256
+
+
+@external
+def set_position_amount(_amount: uint256):
+    self.mock_position_amount = _amount
+
+
+@external
+def set_current_exchange_rate(_rate: uint256):
+    self.mock_exchange_rate = _rate
+
+
+@external
+@view
+def position_amount(_position_uid: bytes32) -> uint256:
+    return self.mock_position_amount
+
+
+@external
+@view
+def current_exchange_rate(_position_uid: bytes32) -> uint256:
+    return self.mock_exchange_rate
+
+
+@external
+def close_position(_position_uid: bytes32, _min_amount_out: uint256) -> uint256:
+    return _min_amount_out
+
+
+@external
+def reduce_position(_position_uid: bytes32, _reduce_by_amount: uint256, _min_amount_out: uint256) -> uint256:
+    return _min_amount_out
@@ -0,0 +1,137 @@
+"""
+On-disk cache of compiled contracts for boa.
+
+boa compiles every contract from source in every process. The cache
+stores the compiler outputs boa reads, content addressed by source,
+compiler settings, compiler version and boa version, and later loads
+deploy from those instead of compiling again. Changing any of them changes the
+address, stale entries are simply never read again.
+
+Contracts importing interfaces from other files are not cached, their
+address would also depend on the imported files.
+"""
+import copyreg
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+from importlib.metadata import version
+from pathlib import Path
+
+import boa.interpret
+import vyper
+from vyper.compiler.phases import CompilerData
+from vyper.semantics.namespace import Namespace
+
+# compiler outputs boa reads when deploying and calling a contract,
+# the ASTs are needed to encode calls and decode events and errors
+CACHED_OUTPUTS = (
+    "vyper_module",
+    "_folded_module",
+    "bytecode",
+    "bytecode_runtime",
+    "assembly_runtime",
+)
+
+_IMPORT = re.compile(r"^\s*(?:from\s+(\S+)\s+import|import\s+(\S+))", re.MULTILINE)
+_BUILTIN_INTERFACES = "vyper.interfaces"
+
+_BOA_VERSION = version("titanoboa")
+_boa_compiler_data = boa.interpret.compiler_data
+_cache_dir = None
+
+
+def set_cache_dir(cache_dir):
+    """
+    Caches everything compiled through boa.load and friends in cache_dir,
+    None turns the cache off again.
+    """
+    global _cache_dir
+    if cache_dir is None:
+        _cache_dir = None
+        boa.interpret.compiler_data = _boa_compiler_data
+        return
+
+    _cache_dir = Path(cache_dir).expanduser()
+    _cache_dir.mkdir(parents=True, exist_ok=True)
+    boa.interpret.compiler_data = compiler_data
+
+
+def compiler_data(source_code, contract_name):
+    if _cache_dir is None or _imports_interface_files(source_code):
+        return _boa_compiler_data(source_code, contract_name)
+
+    data = CompilerData(source_code, contract_name, interface_codes={})
+    path = _cache_dir / f"{cache_key(data)}.pickle"
+    try:
+        outputs = pickle.loads(path.read_bytes())
+    except Exception:
+        # missing, partial or unreadable entries are compiled again
+        outputs = {name: getattr(data, name) for name in CACHED_OUTPUTS}
+        _write(path, _dumps(outputs))
+
+    # CompilerData outputs are cached properties, filling them in
+    # skips compilation
+    data.__dict__.update(outputs)
+    return data
+
+
+def cache_key(data):
+    preimage = json.dumps(
+        {
+            "compiler": f"{vyper.__version__}+commit.{vyper.__commit__}",
+            # the cached objects are the ones boa reads, their shape
+            # may change with boa
+            "titanoboa": _BOA_VERSION,
+            "source": data.source_code,
+            "no_optimize": data.no_optimize,
+            "no_bytecode_metadata": data.no_bytecode_metadata,
+            "storage_layout_override": data.storage_layout_override,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(preimage.encode()).hexdigest()
+
+
+def _imports_interface_files(source_code):
+    for match in _IMPORT.finditer(source_code):
+        module = match.group(1) or match.group(2)
+        if module != _BUILTIN_INTERFACES:
+            return True
+    return False
+
+
+def _write(path, content):
+    # pytest-xdist workers may compile the same contract at once,
+    # rename is atomic so readers never see a partial file
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(path)
+
+
+# Namespace is a dict validating every assignment against its scopes,
+# pickle would assign the items before restoring the scopes
+def _restore_namespace(items, attributes):
+    namespace = Namespace.__new__(Namespace)
+    namespace.__dict__.update(attributes)
+    dict.update(namespace, items)
+    return namespace
+
+
+def _reduce_namespace(namespace):
+    return _restore_namespace, (dict(namespace), namespace.__dict__)
+
+
+class _Pickler(pickle.Pickler):
+    # registered per pickler, copyreg.pickle would change how Namespace
+    # pickles for every other user of pickle in the process
+    dispatch_table = {**copyreg.dispatch_table, Namespace: _reduce_namespace}
+
+
+def _dumps(obj):
+    buffer = io.BytesIO()
+    _Pickler(buffer).dump(obj)
+    return buffer.getvalue()
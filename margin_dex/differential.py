@@ -0,0 +1,184 @@
+"""
+Differential testing of margin_dex.vault_model against a deployed Vault.
+
+The model evaluates a large batch of random vault states at once, a
+sample of them is then written into the Vault's storage for a token
+nobody else uses and recomputed by the contract. Values and reverts
+have to match exactly.
+"""
+from collections import namedtuple
+
+import boa
+import numpy as np
+from eth_utils import keccak, to_canonical_address
+
+from margin_dex import vault_model as model
+from margin_dex.vault_model import Uint256, VaultState
+
+# model function -> Vault internal function
+CONTRACT_FUNCTIONS = {
+    model.utilization_rate: "_utilization_rate",
+    model.interest_rate_by_utilization: "_interest_rate_by_utilization",
+    model.debt_interest_since_last_update: "_debt_interest_since_last_update",
+    model.amount_to_debt_shares: "_amount_to_debt_shares",
+    model.amount_to_lp_shares: "_amount_to_lp_shares",
+    model.lp_shares_to_amount: "_lp_shares_to_amount",
+}
+
+# expected and actual are None when the call reverts
+Mismatch = namedtuple("Mismatch", ["index", "expected", "actual"])
+
+MAX_SECONDS_SINCE_DEBT_UPDATE = 10 * 365 * 24 * 60 * 60
+
+
+#
+# sampling
+#
+def random_uint256(rng, n, max_bits=256, zero_fraction=0.05):
+    """
+    n random values with a uniformly drawn bit length up to max_bits, so
+    small amounts and values close to overflowing are equally likely.
+    """
+    bits = rng.integers(0, max_bits + 1, n).astype(object)
+    word = np.zeros(n, dtype=object)
+    for i in range(5):  # 5 * 63 random bits
+        word |= rng.integers(0, 2**63, n).astype(object) << (63 * i)
+
+    values = word >> (315 - bits)
+    return Uint256(np.where(rng.random(n) < zero_fraction, 0, values).astype(object))
+
+
+def random_interest_curves(rng, n, fallback_fraction=0.1):
+    """Valid packed interest curves, some left at 0 for the fallback curve."""
+    rates = np.sort(rng.integers(0, model.INTEREST_RATE_MASK + 1, (n, 3)), axis=1)
+    min_rate, mid_rate, max_rate = (Uint256(rates[:, i].astype(object)) for i in range(3))
+    rate_switch = Uint256(rng.integers(1, model.FULL_UTILIZATION, n).astype(object))
+
+    curves = model.pack_interest_curve(min_rate, mid_rate, max_rate, rate_switch)
+    return Uint256(np.where(rng.random(n) < fallback_fraction, 0, curves.values).astype(object))
+
+
+def random_states(rng, n, max_bits=128, independent_fraction=0.2):
+    """
+    Mostly consistent states, amounts up to max_bits, debt and bad debt
+    within the liquidity and shares worth about one wei per PRECISION.
+    independent_fraction of the values are drawn on their own from the
+    whole uint256 range to reach the reverting edge cases.
+    """
+    base_lp_total_amount = random_uint256(rng, n, max_bits).values
+    safety_module_lp_total_amount = random_uint256(rng, n, max_bits).values
+    bad_debt = _fraction_of(
+        rng,
+        np.where(
+            rng.random(n) < 0.5,
+            safety_module_lp_total_amount,
+            base_lp_total_amount + safety_module_lp_total_amount,
+        ),
+    )
+    total_debt_amount = _fraction_of(
+        rng,
+        np.maximum(base_lp_total_amount + safety_module_lp_total_amount - bad_debt, 0),
+    )
+    values = {
+        "base_lp_total_amount": base_lp_total_amount,
+        "base_lp_total_shares": _shares_of(rng, base_lp_total_amount),
+        "safety_module_lp_total_amount": safety_module_lp_total_amount,
+        "safety_module_lp_total_shares": _shares_of(rng, safety_module_lp_total_amount),
+        "bad_debt": bad_debt,
+        "total_debt_amount": total_debt_amount,
+        "total_debt_shares": _shares_of(rng, total_debt_amount),
+    }
+
+    for name, consistent in values.items():
+        consistent = np.minimum(consistent, model.MAX_UINT256)
+        independent = random_uint256(rng, n).values
+        values[name] = Uint256(
+            np.where(rng.random(n) < independent_fraction, independent, consistent)
+            .astype(object)
+        )
+
+    return VaultState(
+        **values,
+        interest_curve=random_interest_curves(rng, n),
+        seconds_since_debt_update=Uint256(
+            rng.integers(0, MAX_SECONDS_SINCE_DEBT_UPDATE, n).astype(object)
+        ),
+    )
+
+
+def _fraction_of(rng, values):
+    return values * rng.integers(0, 2**32, len(values)).astype(object) >> 32
+
+
+def _shares_of(rng, amounts):
+    # between 0.5 and 2 shares of PRECISION per wei
+    return amounts * model.PRECISION * rng.integers(2**31, 2**33, len(amounts)).astype(
+        object
+    ) >> 32
+
+
+#
+# contract
+#
+def write_state(vault, token, state):
+    """Writes a single vault state into the storage of token."""
+    layout = vault.compiler_data.storage_layout["storage_layout"]
+    values = {
+        name: getattr(state, name).values[()]
+        for name in (
+            "base_lp_total_amount",
+            "base_lp_total_shares",
+            "safety_module_lp_total_amount",
+            "safety_module_lp_total_shares",
+            "bad_debt",
+            "total_debt_amount",
+            "total_debt_shares",
+            "interest_curve",
+        )
+    }
+    values["last_debt_update"] = (
+        boa.env.vm.state.timestamp - state.seconds_since_debt_update.values[()]
+    )
+
+    for name, value in values.items():
+        _set_mapping_value(vault, layout[name]["slot"], token, value)
+
+
+def _set_mapping_value(contract, slot, key, value):
+    # HashMap[address, uint256] values live at keccak256(slot . key)
+    key = to_canonical_address(key)
+    location = keccak(slot.to_bytes(32, "big") + key.rjust(32, b"\x00"))
+    boa.env.vm.state.set_storage(
+        to_canonical_address(contract.address), int.from_bytes(location, "big"), value
+    )
+
+
+def differential(vault, token, function, states, *args, sample=None, rng=None):
+    """
+    Evaluates function of the model on all states and a sample of them
+    on the Vault, returns the mismatching samples. args are the model
+    arguments besides the state, Uint256 or numpy bool arrays.
+    """
+    expected = function(states, *args)
+
+    indices = range(len(states))
+    if sample is not None:
+        indices = sorted(rng.choice(len(states), size=sample, replace=False))
+
+    contract_function = getattr(vault.internal, CONTRACT_FUNCTIONS[function])
+    mismatches = []
+    for i in indices:
+        write_state(vault, token, states[i])
+        call_args = [
+            arg.values[i] if isinstance(arg, Uint256) else bool(arg[i]) for arg in args
+        ]
+        try:
+            actual = contract_function(token, *call_args)
+        except boa.BoaError:
+            actual = None
+
+        value = None if expected.reverted[i] else expected.values[i]
+        if actual != value:
+            mismatches.append(Mismatch(i, value, actual))
+
+    return mismatches
@@ -0,0 +1,360 @@
+"""
+Incremental SQLite indexer for the events of Vault, MarginDex,
+LimitOrders and Dca.
+
+Every event type gets its own table, <contract>_<event>, with one typed
+column per field. Struct fields are flattened into <field>_<member>
+columns and arrays are stored as JSON. uint256 values do not fit
+SQLite's 64 bit integers and are stored as decimal TEXT. Indexed event
+arguments get a table index.
+
+Logs are read from a source in (block_number, log_index) order, the
+position of the last indexed log is the cursor. It is saved in the same
+transaction as the rows, so sync() picks up exactly where it stopped.
+
+The common queries are answered from aggregates maintained while
+indexing instead of rescanning the events:
+  * positions / open_interest: the open Vault positions and the position
+    amount they hold per market
+  * fees: trading fees and liquidation penalties distributed per token
+    and day
+  * pnl: realized PnL per account and debt token, amount received on
+    close minus the repaid debt and the margin left in the position.
+    Trading fees and liquidation penalties are not included.
+    PositionClosed does not log the repaid debt, it is a state read of
+    Vault.debt(uid) before the closing transaction, see debt_reader.
+"""
+import bisect
+import json
+import sqlite3
+from collections import namedtuple
+
+import boa
+from vyper.semantics.types import AddressT, BoolT, BytesM_T, IntegerT, StructT
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+LogEntry = namedtuple("LogEntry", ["block_number", "log_index", "timestamp", "event"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    uid BLOB PRIMARY KEY,
+    account TEXT NOT NULL,
+    debt_token TEXT NOT NULL,
+    position_token TEXT NOT NULL,
+    margin_amount TEXT NOT NULL,
+    debt_shares TEXT NOT NULL,
+    position_amount TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS positions_market ON positions (debt_token, position_token);
+CREATE TABLE IF NOT EXISTS open_interest (
+    debt_token TEXT NOT NULL,
+    position_token TEXT NOT NULL,
+    position_amount TEXT NOT NULL,
+    PRIMARY KEY (debt_token, position_token)
+);
+CREATE TABLE IF NOT EXISTS fees (
+    token TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (token, day)
+);
+CREATE TABLE IF NOT EXISTS pnl (
+    account TEXT NOT NULL,
+    token TEXT NOT NULL,
+    realized TEXT NOT NULL,
+    PRIMARY KEY (account, token)
+);
+"""
+
+
+class BoaLogRecorder:
+    """
+    Log source for boa runs. Record the logs of every transaction, in
+    order, with record(contract.get_logs()).
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._positions = []
+        self._debts = {}
+
+    def record(self, logs):
+        block_number = boa.env.vm.state.block_number
+        timestamp = boa.env.vm.state.timestamp
+        log_index = 0
+        if self.entries and self.entries[-1].block_number == block_number:
+            log_index = self.entries[-1].log_index + 1
+
+        for log in logs:
+            self.entries.append(LogEntry(block_number, log_index, timestamp, log))
+            self._positions.append((block_number, log_index))
+            log_index += 1
+
+    def entries_after(self, cursor):
+        if cursor is None:
+            return list(self.entries)
+        return self.entries[bisect.bisect_right(self._positions, cursor) :]
+
+    def read_debts(self, vault, uids):
+        """
+        Reads the debt of the Vault positions uids, call it right before
+        the transaction that closes them. debt_before() is the Indexer's
+        debt_reader for boa runs.
+        """
+        for uid in uids:
+            self._debts[uid] = vault.debt(uid)
+
+    def debt_before(self, entry, uid):
+        return self._debts[uid]
+
+
+class Indexer:
+    """
+    Indexes the events of the contracts in contracts, a dict of contract
+    name to address, into the SQLite database at path.
+
+    debt_reader(entry, uid) returns Vault.debt(uid) in the state the
+    transaction of entry started from, e.g. an eth_call against the
+    parent block with the timestamp of entry's block. Realized PnL is
+    only tracked when it is given.
+    """
+
+    def __init__(self, path, contracts, debt_reader=None):
+        self.db = sqlite3.connect(path)
+        self.debt_reader = debt_reader
+        self.db.executescript(SCHEMA)
+        self.contracts = {address: name for name, address in contracts.items()}
+        self._tables = {
+            name
+            for (name,) in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        self._aggregates = {
+            ("Vault", "PositionOpened"): self._position_opened,
+            ("Vault", "PositionReduced"): self._position_reduced,
+            ("Vault", "PositionClosed"): self._position_closed,
+            ("Vault", "MarginAdded"): self._margin_added,
+            ("Vault", "MarginRemoved"): self._margin_removed,
+            ("Vault", "TradingFeeDistributed"): self._trading_fee_distributed,
+        }
+
+    def cursor(self):
+        """(block_number, log_index) of the last indexed log or None."""
+        return self.db.execute("SELECT block_number, log_index FROM cursor").fetchone()
+
+    def sync(self, source):
+        """Indexes the logs of source after the cursor, returns how many."""
+        entries = source.entries_after(self.cursor())
+        with self.db:
+            for entry in entries:
+                self._index(entry)
+            if entries:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO cursor VALUES (0, ?, ?)",
+                    (entries[-1].block_number, entries[-1].log_index),
+                )
+        return len(entries)
+
+    #
+    # queries
+    #
+    def open_interest(self):
+        """{(debt_token, position_token): position amount held}"""
+        rows = self.db.execute("SELECT debt_token, position_token, position_amount FROM open_interest")
+        return {(debt, position): int(amount) for debt, position, amount in rows if amount != "0"}
+
+    def fees_per_day(self, token):
+        """{day: fees distributed} for token, days since the epoch."""
+        rows = self.db.execute("SELECT day, amount FROM fees WHERE token = ? ORDER BY day", (token,))
+        return {day: int(amount) for day, amount in rows}
+
+    def pnl(self, account):
+        """{debt_token: realized pnl} of account."""
+        rows = self.db.execute("SELECT token, realized FROM pnl WHERE account = ?", (account,))
+        return {token: int(realized) for token, realized in rows}
+
+    #
+    # event tables
+    #
+    def _index(self, entry):
+        event = entry.event
+        contract = self.contracts.get(getattr(event, "address", None))
+        if contract is None:
+            return
+
+        table = f"{contract}_{event.event_type.name}"
+        if table not in self._tables:
+            self._create_table(table, event.event_type)
+
+        fields = _event_fields(event)
+        values = [entry.block_number, entry.log_index, entry.timestamp]
+        for typ, value in zip(event.event_type.arguments.values(), fields.values()):
+            values += _flatten_value(typ, value)
+        placeholders = ", ".join("?" * len(values))
+        self.db.execute(f"INSERT INTO {table} VALUES ({placeholders})", values)
+
+        aggregate = self._aggregates.get((contract, event.event_type.name))
+        if aggregate is not None:
+            aggregate(entry, fields)
+
+    def _create_table(self, table, event_type):
+        columns = ["block_number INTEGER NOT NULL", "log_index INTEGER NOT NULL", "timestamp INTEGER NOT NULL"]
+        indexed_columns = []
+        for (name, typ), indexed in zip(event_type.arguments.items(), event_type.indexed):
+            for column, sql_type in _flatten_type(name, typ):
+                columns.append(f"{column} {sql_type}")
+                if indexed:
+                    indexed_columns.append(column)
+
+        columns.append("PRIMARY KEY (block_number, log_index)")
+        self.db.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        for column in indexed_columns:
+            self.db.execute(f"CREATE INDEX {table}_{column} ON {table} ({column})")
+        self._tables.add(table)
+
+    #
+    # aggregates
+    #
+    def _position_opened(self, entry, fields):
+        self._set_position(fields["position"])
+
+    def _position_reduced(self, entry, fields):
+        self._remove_position(fields["uid"])
+        self._set_position(fields["position"])
+
+    def _position_closed(self, entry, fields):
+        uid, account, debt_token, margin_amount, _, _, _ = fields["position"]
+        self._remove_position(uid)
+        if self.debt_reader is None:
+            return
+
+        # bad debt leaves nothing for the trader
+        received = max(fields["amount_received"] - self.debt_reader(entry, uid), 0)
+        self._add(
+            "pnl", ("account", "token"), (account, debt_token), "realized", received - margin_amount
+        )
+
+    def _margin_added(self, entry, fields):
+        self._add_margin(fields["uid"], fields["amount"])
+
+    def _margin_removed(self, entry, fields):
+        self._add_margin(fields["uid"], -fields["amount"])
+
+    def _trading_fee_distributed(self, entry, fields):
+        day = entry.timestamp // SECONDS_PER_DAY
+        self._add("fees", ("token", "day"), (fields["token"], day), "amount", fields["amount"])
+
+    def _set_position(self, position):
+        uid, account, debt_token, margin_amount, debt_shares, position_token, position_amount = (
+            position
+        )
+        self.db.execute(
+            "INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                uid,
+                account,
+                debt_token,
+                position_token,
+                str(margin_amount),
+                str(debt_shares),
+                str(position_amount),
+            ),
+        )
+        self._add(
+            "open_interest",
+            ("debt_token", "position_token"),
+            (debt_token, position_token),
+            "position_amount",
+            position_amount,
+        )
+
+    def _remove_position(self, uid):
+        row = self.db.execute(
+            "SELECT debt_token, position_token, position_amount FROM positions WHERE uid = ?",
+            (uid,),
+        ).fetchone()
+        if row is None:
+            return  # opened before the first indexed log
+
+        debt_token, position_token, position_amount = row
+        self.db.execute("DELETE FROM positions WHERE uid = ?", (uid,))
+        self._add(
+            "open_interest",
+            ("debt_token", "position_token"),
+            (debt_token, position_token),
+            "position_amount",
+            -int(position_amount),
+        )
+
+    def _add_margin(self, uid, amount):
+        row = self.db.execute("SELECT margin_amount FROM positions WHERE uid = ?", (uid,)).fetchone()
+        if row is not None:
+            self.db.execute(
+                "UPDATE positions SET margin_amount = ? WHERE uid = ?",
+                (str(int(row[0]) + amount), uid),
+            )
+
+    def _add(self, table, key_columns, key, column, amount):
+        # exact uint256 arithmetic in python, sqlite only stores the text
+        where = " AND ".join(f"{name} = ?" for name in key_columns)
+        row = self.db.execute(f"SELECT {column} FROM {table} WHERE {where}", key).fetchone()
+        total = amount if row is None else int(row[0]) + amount
+        columns = ", ".join(key_columns + (column,))
+        placeholders = ", ".join("?" * (len(key_columns) + 1))
+        self.db.execute(
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+            (*key, str(total)),
+        )
+
+
+def _event_fields(event):
+    """{name: value} of all event arguments, indexed or not, in order."""
+    topics = iter(event.topics)
+    args = iter(event.args)
+    return {
+        name: next(topics) if indexed else next(args)
+        for name, indexed in zip(event.event_type.arguments, event.event_type.indexed)
+    }
+
+
+def _flatten_type(name, typ):
+    if isinstance(typ, StructT):
+        for member, member_typ in typ.members.items():
+            yield from _flatten_type(f"{name}_{member}", member_typ)
+    elif isinstance(typ, IntegerT):
+        yield name, "INTEGER" if typ.bits < 64 else "TEXT"
+    elif isinstance(typ, BoolT):
+        yield name, "INTEGER"
+    elif isinstance(typ, BytesM_T):
+        yield name, "BLOB"
+    else:
+        # addresses, strings and arrays
+        yield name, "TEXT"
+
+
+def _flatten_value(typ, value):
+    if isinstance(typ, StructT):
+        values = []
+        for member_typ, member_value in zip(typ.members.values(), value):
+            values += _flatten_value(member_typ, member_value)
+        return values
+    if isinstance(typ, IntegerT):
+        return [value if typ.bits < 64 else str(value)]
+    if isinstance(typ, (AddressT, BoolT, BytesM_T)) or isinstance(value, str):
+        return [value]
+    return [json.dumps(_jsonable(value))]
+
+
+def _jsonable(value):
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, int) and not isinstance(value, bool) and value.bit_length() > 53:
+        return str(value)
+    return value
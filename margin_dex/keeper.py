@@ -0,0 +1,216 @@
+"""
+Liquidation keeper following the Vault's position events.
+
+Whether a position is liquidatable only depends on the max_leverage L
+of its market, its debt and position amounts and the two oracle prices.
+Vault._calculate_leverage exceeds L once
+
+    (L + 1) * debt_value >= L * position_value
+
+The debt is debt_shares * amount_per_debt_share, so with the exchange
+rate of the position token in the debt token this becomes
+
+    debt_shares / position_amount
+        >= L * rate / ((L + 1) * amount_per_debt_share)
+
+The left side, the liquidation key, only changes with the position's
+own events, prices and accruing interest only move the cutoff on the
+right. Each market keeps a heap of its positions by liquidation key and
+an oracle update pops only the positions above the cutoff, instead of
+polling is_liquidatable on every open position. Around the cutoff the
+contract's integer rounding decides, candidates are submitted through
+MarginDex.liquidate_many, which skips positions that are not
+liquidatable, and those go back on the heap.
+"""
+import heapq
+from collections import namedtuple
+
+PRECISION = 10**18
+# MarginDex.MAX_LIQUIDATION_BATCH_SIZE
+MAX_LIQUIDATION_BATCH_SIZE = 64
+# Vault.MAX_OPEN_POSITIONS_PAGE_SIZE
+MAX_OPEN_POSITIONS_PAGE_SIZE = 512
+# keys this close below the cutoff are submitted as well
+CUTOFF_TOLERANCE = 1e-9
+
+# Vault.Position
+Position = namedtuple(
+    "Position",
+    [
+        "uid",
+        "account",
+        "debt_token",
+        "margin_amount",
+        "debt_shares",
+        "position_token",
+        "position_amount",
+    ],
+)
+
+
+def liquidation_key(position):
+    """debt_shares per position_amount, higher keys liquidate first."""
+    if position.position_amount == 0:
+        return float("inf")
+    return position.debt_shares / position.position_amount
+
+
+def liquidation_cutoff(
+    max_leverage, position_price, debt_price, position_scale, debt_scale, amount_per_debt_share
+):
+    """Lowest liquidation key liquidatable at the given oracle prices."""
+    if amount_per_debt_share == 0:
+        return float("inf")
+    return (
+        max_leverage
+        * position_price
+        * debt_scale
+        * PRECISION
+        * PRECISION
+        / ((max_leverage + 1) * amount_per_debt_share * debt_price * position_scale)
+    )
+
+
+class LiquidationHeap:
+    """
+    Open positions of one market by liquidation key. Updating a position
+    pushes a new entry, entries with an outdated key are skipped when
+    they reach the top.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def push(self, uid, key):
+        self.keys[uid] = key
+        heapq.heappush(self._heap, (-key, uid))
+        if len(self._heap) > 2 * len(self.keys) + MAX_LIQUIDATION_BATCH_SIZE:
+            self._heap = [(-key, uid) for uid, key in self.keys.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, uid):
+        self.keys.pop(uid, None)
+
+    def pop_crossed(self, cutoff):
+        """Removes and returns the uids with a key of at least cutoff."""
+        threshold = cutoff * (1 - CUTOFF_TOLERANCE)
+        crossed = []
+        while self._heap and -self._heap[0][0] >= threshold:
+            negative_key, uid = heapq.heappop(self._heap)
+            if self.keys.get(uid) == -negative_key:
+                del self.keys[uid]
+                crossed.append(uid)
+        return crossed
+
+
+class LiquidationKeeper:
+    """
+    Tracks the open positions of a Vault from its events and liquidates
+    them through MarginDex.liquidate_many once the oracle prices cross
+    their liquidation price. Feed it the logs of every transaction with
+    apply_logs() and call on_oracle_update() whenever a price changes.
+    """
+
+    def __init__(self, vault, dex, batch_size=MAX_LIQUIDATION_BATCH_SIZE):
+        self.vault = vault
+        self.dex = dex
+        self.batch_size = batch_size
+        # (debt_token, position_token) -> LiquidationHeap
+        self.markets = {}
+        # uid -> Position
+        self.positions = {}
+        self._handlers = {
+            "PositionOpened": lambda args: self.on_position(Position(*args[0])),
+            "PositionReduced": lambda args: self.on_position(Position(*args[1])),
+            "PositionClosed": lambda args: self.on_position_removed(args[0]),
+            "PositionLiquidated": lambda args: self.on_position_removed(args[0]),
+            # margin is not part of the leverage, the key stays the same
+            "MarginAdded": lambda args: None,
+            "MarginRemoved": lambda args: None,
+        }
+
+    #
+    # events
+    #
+    def apply_logs(self, logs):
+        """Applies the Vault's events among boa logs in order."""
+        for log in logs:
+            if getattr(log, "address", None) != self.vault.address:
+                continue
+            handler = self._handlers.get(log.event_type.name)
+            if handler is not None:
+                handler(log.args)
+
+    def on_position(self, position):
+        """A position was opened or changed."""
+        market = (position.debt_token, position.position_token)
+        if market not in self.markets:
+            self.markets[market] = LiquidationHeap()
+        self.positions[position.uid] = position
+        self.markets[market].push(position.uid, liquidation_key(position))
+
+    def on_position_removed(self, uid):
+        """A position was closed or liquidated."""
+        position = self.positions.pop(uid, None)
+        if position is not None:
+            self.markets[(position.debt_token, position.position_token)].remove(uid)
+
+    def load_market(self, debt_token, position_token):
+        """Starts tracking the positions already open in a market."""
+        count = self.vault.open_positions_count(debt_token, position_token)
+        for offset in range(0, count, MAX_OPEN_POSITIONS_PAGE_SIZE):
+            uids = self.vault.get_open_positions(
+                debt_token, position_token, offset, MAX_OPEN_POSITIONS_PAGE_SIZE
+            )
+            for uid in uids:
+                self.on_position(Position(*self.vault.positions(uid)))
+
+    #
+    # liquidations
+    #
+    def cutoff(self, debt_token, position_token):
+        """Lowest liquidation key liquidatable at the current prices."""
+        if self.vault.total_debt_shares(debt_token) == 0:
+            return float("inf")
+        return liquidation_cutoff(
+            self.vault.max_leverage(debt_token, position_token),
+            self.vault.to_usd_oracle_price(position_token),
+            self.vault.to_usd_oracle_price(debt_token),
+            10 ** self.vault.token_decimals(position_token),
+            10 ** self.vault.token_decimals(debt_token),
+            self.vault.debt_shares_to_amount(debt_token, PRECISION * PRECISION),
+        )
+
+    def candidates(self):
+        """Pops the positions past the cutoff, grouped by market."""
+        candidates = []
+        for market, heap in self.markets.items():
+            if len(heap) > 0:
+                candidates += heap.pop_crossed(self.cutoff(*market))
+        return candidates
+
+    def on_oracle_update(self):
+        """
+        Liquidates the positions the current prices crossed, returns
+        the liquidated uids.
+        """
+        candidates = self.candidates()
+
+        liquidated = []
+        for i in range(0, len(candidates), self.batch_size):
+            batch = candidates[i : i + self.batch_size]
+            results = self.dex.liquidate_many(batch)
+            self.apply_logs(self.dex.get_logs())
+
+            for uid, was_liquidated in zip(batch, results):
+                if was_liquidated:
+                    liquidated.append(uid)
+                elif uid in self.positions:
+                    # rounded the other way, back on the heap
+                    self.on_position(self.positions[uid])
+
+        return liquidated
@@ -0,0 +1,384 @@
+"""
+Monte Carlo bad debt stress test of a book of Vault positions.
+
+Draws correlated USD price paths for the tokens (GBM with optional
+common jumps) and replays the Vault's liquidation rules on every path:
+
+  * Vault._calculate_leverage exceeds max_leverage L once
+        (L + 1) * debt_value >= L * position_value
+    (see margin_dex.keeper), checked at every step like a keeper would.
+  * Vault._liquidate swaps the position amount with a min_amount_out of
+    the oracle quote minus liquidate_slippage. A swap slipping more than
+    that reverts, the position stays open until a later step.
+  * Vault._close_position repays the debt from the swap proceeds, a
+    shortfall is booked as bad debt of the debt token. Otherwise the
+    liquidation penalty is charged on the remaining margin.
+  * bad debt is covered by the safety module first and then by the base
+    LPs, above acceptable_amount_of_bad_debt the Vault stops accepting
+    new orders.
+
+The slippage of a liquidation swap is the market's swap_fee plus the
+price impact of selling into a constant product pool holding liquidity
+USD on each side.
+
+Amounts are floats in token units, not wei. Paths are processed in
+chunks of whole position-path matrices; per step only the crossed
+positions are evaluated, against a precomputed per position threshold
+on the position/debt token exchange rate.
+"""
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Vault.PERCENTAGE_BASE
+PERCENTAGE_BASE = 100_00
+# Vault.PRECISION, Vault.SECONDS_PER_YEAR, Vault.PERCENTAGE_BASE_HIGH_PRECISION
+PRECISION = 10**18
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+PERCENTAGE_BASE_HIGH_PRECISION = 100_00_000
+# Vault.MAX_OPEN_POSITIONS_PAGE_SIZE
+MAX_OPEN_POSITIONS_PAGE_SIZE = 512
+# position-path cells per chunk
+CHUNK_SIZE = 2**21
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class Market:
+    """
+    Risk parameters of a debt_token/position_token market.
+    liquidate_slippage is the Vault's
+    liquidate_slippage[position_token][debt_token], the slippage of
+    the liquidation swap selling position_token for debt_token.
+    """
+
+    debt_token: str
+    position_token: str
+    max_leverage: int
+    liquidate_slippage: int
+    liquidity: float = math.inf
+    swap_fee: float = 0.0
+
+    @classmethod
+    def from_vault(cls, vault, debt_token, position_token, liquidity=math.inf, swap_fee=0.0):
+        return cls(
+            _address(debt_token),
+            _address(position_token),
+            vault.max_leverage(debt_token, position_token),
+            vault.liquidate_slippage(position_token, debt_token),
+            liquidity,
+            swap_fee,
+        )
+
+
+@dataclass
+class Pool:
+    """
+    Lending pool of a debt token. safety_module_amount is what is left
+    of the safety module after bad_debt, interest_rate is per year.
+    """
+
+    token: str
+    safety_module_amount: float
+    bad_debt: float = 0.0
+    acceptable_amount_of_bad_debt: float = math.inf
+    interest_rate: float = 0.0
+
+    @classmethod
+    def from_vault(cls, vault, token):
+        scale = 10 ** vault.token_decimals(token)
+        bad_debt = vault.bad_debt(token)
+        safety_module_amount = max(vault.safety_module_lp_total_amount(token) - bad_debt, 0)
+        interest_per_second = vault.current_interest_per_second(token)
+        return cls(
+            _address(token),
+            safety_module_amount / scale,
+            bad_debt / scale,
+            vault.acceptable_amount_of_bad_debt(token) / scale,
+            interest_per_second * SECONDS_PER_YEAR / PRECISION / PERCENTAGE_BASE_HIGH_PRECISION,
+        )
+
+
+@dataclass
+class PositionBook:
+    """Open positions, market is the index of their Market."""
+
+    market: np.ndarray
+    position_amount: np.ndarray
+    debt_amount: np.ndarray
+
+    def __len__(self):
+        return len(self.market)
+
+    @classmethod
+    def from_vault(cls, vault, markets):
+        """The open positions of a deployed Vault in markets."""
+        market, position_amount, debt_amount = [], [], []
+        for index, m in enumerate(markets):
+            position_scale = 10 ** vault.token_decimals(m.position_token)
+            debt_scale = 10 ** vault.token_decimals(m.debt_token)
+            count = vault.open_positions_count(m.debt_token, m.position_token)
+            for offset in range(0, count, MAX_OPEN_POSITIONS_PAGE_SIZE):
+                uids = vault.get_open_positions(
+                    m.debt_token, m.position_token, offset, MAX_OPEN_POSITIONS_PAGE_SIZE
+                )
+                for uid in uids:
+                    market.append(index)
+                    position_amount.append(vault.position_amount(uid) / position_scale)
+                    debt_amount.append(vault.debt(uid) / debt_scale)
+
+        return cls(
+            np.array(market, dtype=np.intp),
+            np.array(position_amount, dtype=float),
+            np.array(debt_amount, dtype=float),
+        )
+
+
+@dataclass
+class PriceModel:
+    """
+    Correlated geometric Brownian motion of USD prices with annualized
+    volatility and drift. Jumps arrive for all tokens at once with
+    jump_intensity per year, the log jump size of each token is normal
+    with jump_mean and jump_std. The drift is compensated for the
+    jumps, so prices stay martingales with drift 0.
+    """
+
+    tokens: list
+    prices: np.ndarray
+    volatility: np.ndarray
+    correlation: np.ndarray = None
+    drift: np.ndarray = None
+    jump_intensity: float = 0.0
+    jump_mean: np.ndarray = None
+    jump_std: np.ndarray = None
+
+    def __post_init__(self):
+        n = len(self.tokens)
+        self.prices = np.asarray(self.prices, dtype=float)
+        self.volatility = np.asarray(self.volatility, dtype=float)
+        self.correlation = np.eye(n) if self.correlation is None else np.asarray(self.correlation)
+        for name in ("drift", "jump_mean", "jump_std"):
+            value = getattr(self, name)
+            setattr(self, name, np.zeros(n) if value is None else np.asarray(value, dtype=float))
+
+    def paths(self, rng, n_paths, horizon, n_steps):
+        """Prices of shape (n_steps + 1, tokens, n_paths) over horizon years."""
+        dt = horizon / n_steps
+        cholesky = np.linalg.cholesky(self.correlation)
+        jump_compensation = self.jump_intensity * (
+            np.exp(self.jump_mean + self.jump_std**2 / 2) - 1
+        )
+        step_drift = (self.drift - self.volatility**2 / 2 - jump_compensation) * dt
+
+        shocks = cholesky @ rng.standard_normal((n_steps, len(self.tokens), n_paths))
+        log_returns = step_drift[:, None] + self.volatility[:, None] * math.sqrt(dt) * shocks
+        if self.jump_intensity > 0:
+            jumps = rng.poisson(self.jump_intensity * dt, (n_steps, 1, n_paths))
+            log_returns += jumps * self.jump_mean[:, None] + np.sqrt(jumps) * self.jump_std[
+                :, None
+            ] * rng.standard_normal(log_returns.shape)
+
+        log_prices = np.concatenate(
+            [np.zeros((1, len(self.tokens), n_paths)), np.cumsum(log_returns, axis=0)]
+        )
+        return self.prices[None, :, None] * np.exp(log_prices)
+
+
+@dataclass
+class StressResult:
+    """
+    Outcome per path. Per market, of shape (markets, paths):
+      bad_debt: booked when liquidating, in the debt token
+      open_bad_debt: debt exceeding the position value of positions
+        still open at the horizon, their liquidation swaps slipped more
+        than liquidate_slippage
+      penalties: liquidation penalties charged, in the debt token
+      liquidations / failed_liquidations: number of liquidations and of
+        steps a liquidatable position could not be liquidated
+    Per pool, of shape (pools, paths):
+      safety_module_drawdown: fraction of the safety module lost
+      base_lp_loss: bad debt exceeding the safety module
+      defensive_step: step the Vault stopped accepting new orders, -1
+        if it did not
+    """
+
+    markets: list
+    pools: list
+    bad_debt: np.ndarray
+    open_bad_debt: np.ndarray
+    penalties: np.ndarray
+    liquidations: np.ndarray
+    failed_liquidations: np.ndarray
+    safety_module_drawdown: np.ndarray
+    base_lp_loss: np.ndarray
+    defensive_step: np.ndarray
+    quantiles: tuple = field(default=QUANTILES)
+
+    def summary(self):
+        """Distribution of the results per market and pool."""
+        markets = {
+            (m.debt_token, m.position_token): {
+                "bad_debt": _distribution(self.bad_debt[i], self.quantiles),
+                "open_bad_debt": _distribution(self.open_bad_debt[i], self.quantiles),
+                "probability_of_bad_debt": float(np.mean(self.bad_debt[i] > 0)),
+                "penalties": float(np.mean(self.penalties[i])),
+                "liquidations": float(np.mean(self.liquidations[i])),
+                "failed_liquidations": float(np.mean(self.failed_liquidations[i])),
+            }
+            for i, m in enumerate(self.markets)
+        }
+        pools = {
+            p.token: {
+                "safety_module_drawdown": _distribution(
+                    self.safety_module_drawdown[i], self.quantiles
+                ),
+                "probability_of_wipeout": float(np.mean(self.base_lp_loss[i] > 0)),
+                "base_lp_loss": _distribution(self.base_lp_loss[i], self.quantiles),
+                "probability_of_defensive_mode": float(np.mean(self.defensive_step[i] >= 0)),
+            }
+            for i, p in enumerate(self.pools)
+        }
+        return {"markets": markets, "pools": pools}
+
+
+def _address(token):
+    return getattr(token, "address", token)
+
+
+def _distribution(values, quantiles):
+    result = {"mean": float(np.mean(values))}
+    for q, value in zip(quantiles, np.quantile(values, quantiles)):
+        result[q] = float(value)
+    return result
+
+
+def simulate(
+    book, markets, pools, tokens, paths, horizon, liquidation_penalty, chunk_size=CHUNK_SIZE
+):
+    """
+    Replays the liquidations of book along paths, USD prices of tokens
+    of shape (steps + 1, tokens, paths) spanning horizon years, the
+    first step being the current prices. liquidation_penalty is the
+    Vault's, in PERCENTAGE_BASE.
+    """
+    n_steps = paths.shape[0] - 1
+    n_paths = paths.shape[2]
+    token_index = {token: i for i, token in enumerate(tokens)}
+    pool_index = {pool.token: i for i, pool in enumerate(pools)}
+
+    position_token = np.array([token_index[m.position_token] for m in markets], dtype=np.intp)
+    debt_token = np.array([token_index[m.debt_token] for m in markets], dtype=np.intp)
+    market_pool = np.array([pool_index[m.debt_token] for m in markets], dtype=np.intp)
+    max_leverage = np.array([m.max_leverage for m in markets], dtype=float)
+    slippage_limit = np.array([m.liquidate_slippage / PERCENTAGE_BASE for m in markets])
+    liquidity = np.array([m.liquidity for m in markets], dtype=float)
+    swap_fee = np.array([m.swap_fee for m in markets], dtype=float)
+
+    # debt growth per pool and step, the Vault accrues interest on every update
+    interest_rate = np.array([pool.interest_rate for pool in pools], dtype=float)
+    growth = (1 + interest_rate * horizon / n_steps) ** np.arange(n_steps + 1)[:, None]
+
+    # liquidatable once position_price / debt_price <= growth * threshold
+    market = book.market
+    with np.errstate(divide="ignore"):
+        threshold = (
+            (max_leverage[market] + 1)
+            * book.debt_amount
+            / (max_leverage[market] * book.position_amount)
+        )
+
+    n_markets, n_pools = len(markets), len(pools)
+    result = {
+        name: np.zeros((n_markets, n_paths))
+        for name in (
+            "bad_debt",
+            "open_bad_debt",
+            "penalties",
+            "liquidations",
+            "failed_liquidations",
+        )
+    }
+    pool_bad_debt = np.zeros((n_pools, n_paths))
+    acceptable = np.array([p.acceptable_amount_of_bad_debt - p.bad_debt for p in pools])
+    # already defensive before the first step
+    defensive_step = np.where(acceptable < 0, 0, -1)[:, None].repeat(n_paths, axis=1)
+
+    def per_market(name, rows, cols, weights, start):
+        # sums weights into result[name][market, start + path]
+        sums = np.bincount(
+            market[rows] * width + cols, weights=weights, minlength=n_markets * width
+        ).reshape(n_markets, width)
+        result[name][:, start : start + width] += sums
+
+    chunk = max(1, chunk_size // max(len(book), 1))
+    for start in range(0, n_paths, chunk):
+        prices = paths[:, :, start : start + chunk]
+        width = prices.shape[2]
+        rate = prices[:, position_token] / prices[:, debt_token]
+        alive = np.ones((len(book), width), dtype=bool)
+
+        for step in range(1, n_steps + 1):
+            crossed = alive & (
+                rate[step][market] <= (threshold * growth[step, market_pool[market]])[:, None]
+            )
+            rows, cols = np.nonzero(crossed)
+            if len(rows) == 0:
+                continue
+
+            m = market[rows]
+            position_amount = book.position_amount[rows]
+            debt = book.debt_amount[rows] * growth[step, market_pool[m]]
+            usd_value = position_amount * prices[step, position_token[m], cols]
+            slippage = swap_fee[m] + usd_value / (liquidity[m] + usd_value)
+
+            executed = slippage <= slippage_limit[m]
+            per_market("failed_liquidations", rows, cols, (~executed).astype(float), start)
+
+            rows, cols, m = rows[executed], cols[executed], m[executed]
+            alive[rows, cols] = False
+            debt = debt[executed]
+            received = position_amount[executed] * rate[step, m, cols] * (1 - slippage[executed])
+
+            bad_debt = np.maximum(debt - received, 0)
+            penalty = np.minimum(
+                debt * liquidation_penalty / PERCENTAGE_BASE, np.maximum(received - debt, 0)
+            )
+            per_market("liquidations", rows, cols, np.ones(len(rows)), start)
+            per_market("bad_debt", rows, cols, bad_debt, start)
+            per_market("penalties", rows, cols, penalty, start)
+
+            pools_bad_debt = np.bincount(
+                market_pool[m] * width + cols, weights=bad_debt, minlength=n_pools * width
+            ).reshape(n_pools, width)
+            window = slice(start, start + width)
+            pool_bad_debt[:, window] += pools_bad_debt
+            defensive_step[:, window] = np.where(
+                (defensive_step[:, window] < 0) & (pool_bad_debt[:, window] > acceptable[:, None]),
+                step,
+                defensive_step[:, window],
+            )
+
+        rows, cols = np.nonzero(alive)
+        debt = book.debt_amount[rows] * growth[n_steps, market_pool[market[rows]]]
+        value = book.position_amount[rows] * rate[n_steps, market[rows], cols]
+        per_market("open_bad_debt", rows, cols, np.maximum(debt - value, 0), start)
+
+    safety_module = np.array([p.safety_module_amount for p in pools])[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = np.where(
+            safety_module > 0, np.minimum(pool_bad_debt, safety_module) / safety_module, 0
+        )
+
+    result["liquidations"] = result["liquidations"].astype(int)
+    result["failed_liquidations"] = result["failed_liquidations"].astype(int)
+    return StressResult(
+        markets,
+        pools,
+        safety_module_drawdown=drawdown,
+        base_lp_loss=np.maximum(pool_bad_debt - safety_module, 0),
+        defensive_step=defensive_step,
+        **result,
+    )
@@ -0,0 +1,339 @@
+"""
+NumPy reference model of the share and interest math in Vault.vy.
+
+Every function evaluates whole arrays of vault states at once. Values
+are object arrays of python ints, so the arithmetic is exact at any
+size. Uint256 applies the EVM semantics of the contract: division
+rounds down, and an element reverts on overflow, underflow or division
+by zero. The functions mirror their Vyper counterparts line by line,
+and the differential harness in margin_dex.differential compares them
+against a deployed Vault.
+"""
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+MAX_UINT256 = 2**256 - 1
+
+PRECISION = 10**18
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+PERCENTAGE_BASE_HIGH_PRECISION = 100_00_000
+
+FULL_UTILIZATION = 100_00_000
+FALLBACK_INTEREST_CONFIGURATION = (3_00_000, 20_00_000, 100_00_000, 80_00_000)
+INTEREST_RATE_MASK = 2**32 - 1
+INTEREST_SLOPE_MASK = 2**96 - 1
+
+
+class Uint256:
+    """
+    Array of uint256 values with checked arithmetic. Reverted elements
+    are zeroed and stay reverted through every following operation.
+    """
+
+    def __init__(self, values, reverted=None):
+        self.values = np.asarray(values, dtype=object)
+        if reverted is None:
+            reverted = np.zeros(self.values.shape, dtype=bool)
+        self.reverted = reverted
+
+    def _operands(self, other):
+        if isinstance(other, Uint256):
+            return other.values, self.reverted | other.reverted
+        return other, self.reverted
+
+    @staticmethod
+    def _checked(values, reverted):
+        reverted = reverted | (values < 0) | (values > MAX_UINT256)
+        return Uint256(np.where(reverted, 0, values).astype(object), reverted)
+
+    def __add__(self, other):
+        values, reverted = self._operands(other)
+        return self._checked(self.values + values, reverted)
+
+    def __sub__(self, other):
+        values, reverted = self._operands(other)
+        return self._checked(self.values - values, reverted)
+
+    def __rsub__(self, other):
+        return self._checked(other - self.values, self.reverted)
+
+    def __mul__(self, other):
+        values, reverted = self._operands(other)
+        return self._checked(self.values * values, reverted)
+
+    def __floordiv__(self, other):
+        values, reverted = self._operands(other)
+        reverted = reverted | (values == 0)
+        return self._checked(self.values // np.where(values == 0, 1, values), reverted)
+
+    def __rshift__(self, bits):
+        return Uint256(self.values >> bits, self.reverted)
+
+    def __lshift__(self, bits):
+        # shifting out of the word does not revert
+        return Uint256((self.values << bits) & MAX_UINT256, self.reverted)
+
+    def __and__(self, mask):
+        return Uint256(self.values & mask, self.reverted)
+
+    def __or__(self, other):
+        values, reverted = self._operands(other)
+        return Uint256(self.values | values, reverted)
+
+    def __lt__(self, other):
+        return self.values < self._operands(other)[0]
+
+    def __le__(self, other):
+        return self.values <= self._operands(other)[0]
+
+    def __gt__(self, other):
+        return self.values > self._operands(other)[0]
+
+    def __eq__(self, other):
+        return self.values == self._operands(other)[0]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return Uint256(self.values[index], self.reverted[index])
+
+    def revert_if(self, condition):
+        """Reverts the elements failing an assert."""
+        reverted = self.reverted | condition
+        return Uint256(np.where(reverted, 0, self.values).astype(object), reverted)
+
+
+def select(condition, if_true, if_false):
+    """Vectorized if/else, only the reverts of the taken branch count."""
+    if not isinstance(if_true, Uint256):
+        if_true = Uint256(np.full(condition.shape, if_true, dtype=object))
+    if not isinstance(if_false, Uint256):
+        if_false = Uint256(np.full(condition.shape, if_false, dtype=object))
+    return Uint256(
+        np.where(condition, if_true.values, if_false.values).astype(object),
+        np.where(condition, if_true.reverted, if_false.reverted),
+    )
+
+
+@dataclass
+class VaultState:
+    """
+    Storage of the Vault for one token, every field is a Uint256 of
+    the same length. seconds_since_debt_update stands in for
+    block.timestamp - last_debt_update.
+    """
+
+    base_lp_total_amount: Uint256
+    base_lp_total_shares: Uint256
+    safety_module_lp_total_amount: Uint256
+    safety_module_lp_total_shares: Uint256
+    bad_debt: Uint256
+    total_debt_amount: Uint256
+    total_debt_shares: Uint256
+    interest_curve: Uint256
+    seconds_since_debt_update: Uint256
+
+    def __len__(self):
+        return len(self.total_debt_amount)
+
+    def __getitem__(self, index):
+        return VaultState(
+            **{field.name: getattr(self, field.name)[index] for field in fields(self)}
+        )
+
+
+#
+# liquidity
+#
+def base_lp_total_amount(state):
+    return select(
+        state.bad_debt <= state.safety_module_lp_total_amount,
+        state.base_lp_total_amount,
+        state.base_lp_total_amount + state.safety_module_lp_total_amount - state.bad_debt,
+    )
+
+
+def safety_module_total_amount(state):
+    return select(
+        state.bad_debt > state.safety_module_lp_total_amount,
+        0,
+        state.safety_module_lp_total_amount - state.bad_debt,
+    )
+
+
+def total_liquidity(state):
+    return (
+        state.base_lp_total_amount
+        + state.safety_module_lp_total_amount
+        - state.bad_debt
+    )
+
+
+def available_liquidity(state):
+    return total_liquidity(state) - state.total_debt_amount
+
+
+#
+# lp shares
+#
+def amount_per_base_lp_share(state):
+    return base_lp_total_amount(state) * PRECISION * PRECISION // state.base_lp_total_shares
+
+
+def amount_per_safety_module_lp_share(state):
+    return (
+        safety_module_total_amount(state)
+        * PRECISION
+        * PRECISION
+        // state.safety_module_lp_total_shares
+    )
+
+
+def amount_to_lp_shares(state, amount, is_safety_module):
+    safety_module_shares = select(
+        state.safety_module_lp_total_shares == 0,
+        amount * PRECISION,
+        amount * PRECISION * PRECISION // amount_per_safety_module_lp_share(state),
+    )
+    base_lp_shares = select(
+        state.base_lp_total_shares == 0,
+        amount * PRECISION,
+        amount * PRECISION * PRECISION // amount_per_base_lp_share(state),
+    )
+    return select(is_safety_module, safety_module_shares, base_lp_shares)
+
+
+def lp_shares_to_amount(state, shares, is_safety_module):
+    safety_module_amount = (
+        shares * amount_per_safety_module_lp_share(state) // PRECISION // PRECISION
+    )
+    base_lp_amount = shares * amount_per_base_lp_share(state) // PRECISION // PRECISION
+    return select(
+        shares == 0,
+        0,
+        select(is_safety_module, safety_module_amount, base_lp_amount),
+    )
+
+
+#
+# interest
+#
+def utilization_rate(state):
+    return (
+        (
+            PRECISION
+            - available_liquidity(state) * PRECISION // total_liquidity(state)
+        )
+        * PERCENTAGE_BASE_HIGH_PRECISION
+        // PRECISION
+    )
+
+
+def pack_interest_curve(
+    min_interest_rate, mid_interest_rate, max_interest_rate, rate_switch_utilization
+):
+    invalid = (
+        (min_interest_rate > mid_interest_rate)
+        | (mid_interest_rate > max_interest_rate)
+        | (max_interest_rate > INTEREST_RATE_MASK)
+        | (rate_switch_utilization == 0)
+        | ~(rate_switch_utilization < FULL_UTILIZATION)
+    )
+    # slopes are only computed for valid curves, like the asserts in Vyper
+    min_interest_rate = min_interest_rate.revert_if(invalid)
+    mid_interest_rate = mid_interest_rate.revert_if(invalid)
+    max_interest_rate = max_interest_rate.revert_if(invalid)
+    rate_switch_utilization = rate_switch_utilization.revert_if(invalid)
+
+    # rounded up, see Vault._pack_interest_curve
+    low_slope = (
+        (mid_interest_rate - min_interest_rate) * PRECISION + rate_switch_utilization - 1
+    ) // rate_switch_utilization
+    high_slope = (
+        (max_interest_rate - mid_interest_rate) * PRECISION
+        + (FULL_UTILIZATION - rate_switch_utilization - 1)
+    ) // (FULL_UTILIZATION - rate_switch_utilization)
+    return (
+        (rate_switch_utilization << 224)
+        | (min_interest_rate << 192)
+        | (low_slope << 96)
+        | high_slope
+    )
+
+
+def interest_curve(state):
+    fallback = pack_interest_curve(
+        *(
+            Uint256(np.full(len(state), value, dtype=object))
+            for value in FALLBACK_INTEREST_CONFIGURATION
+        )
+    )
+    return select(state.interest_curve == 0, fallback, state.interest_curve)
+
+
+def interest_rate(curve, utilization_rate):
+    rate_switch_utilization = curve >> 224
+    min_interest_rate = (curve >> 192) & INTEREST_RATE_MASK
+    low_slope = (curve >> 96) & INTEREST_SLOPE_MASK
+    high_slope = curve & INTEREST_SLOPE_MASK
+
+    mid_interest_rate = min_interest_rate + low_slope * rate_switch_utilization // PRECISION
+    return select(
+        utilization_rate < rate_switch_utilization,
+        min_interest_rate + low_slope * utilization_rate // PRECISION,
+        mid_interest_rate
+        + high_slope * (utilization_rate - rate_switch_utilization) // PRECISION,
+    )
+
+
+def interest_rate_by_utilization(state, utilization_rate):
+    return interest_rate(interest_curve(state), utilization_rate)
+
+
+def current_interest_per_second(state):
+    rate = interest_rate(interest_curve(state), utilization_rate(state))
+    return rate * PRECISION // SECONDS_PER_YEAR
+
+
+def debt_interest_since_last_update(state):
+    return (
+        state.seconds_since_debt_update
+        * current_interest_per_second(state)
+        * state.total_debt_amount
+        // PERCENTAGE_BASE_HIGH_PRECISION
+        // PRECISION
+    )
+
+
+#
+# debt shares
+#
+def total_debt_plus_pending_interest(state):
+    return state.total_debt_amount + debt_interest_since_last_update(state)
+
+
+def amount_per_debt_share(state):
+    return (
+        total_debt_plus_pending_interest(state)
+        * PRECISION
+        * PRECISION
+        // state.total_debt_shares
+    )
+
+
+def amount_to_debt_shares(state, amount):
+    return select(
+        state.total_debt_shares == 0,
+        amount * PRECISION,
+        amount * PRECISION * PRECISION // amount_per_debt_share(state),
+    )
+
+
+def debt_shares_to_amount(state, shares):
+    return select(
+        shares == 0,
+        0,
+        shares * amount_per_debt_share(state) // PRECISION // PRECISION,
+    )
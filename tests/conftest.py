@@ -1,9 +1,14 @@
+import importlib.metadata
+
 import pytest
 import boa
 from vyper.utils import checksum_encode
+from eth.db.account import AccountDB
+from eth_utils import to_canonical_address
+from margin_dex import compiler_cache
 
 
-def pytest_configure():
+def pytest_configure(config):
     pytest.ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
     pytest.WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
     pytest.USDC = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
@@ -15,6 +20,12 @@ def pytest_configure():
     pytest.USDC_USD_ORACLE = "0x50834f3163758fcc1df9973b6e91f0f0f0434ad3"
     pytest.WBTC_USD_ORACLE = "0x6ce185860a4963106506c203335a2910413708e9"
     pytest.ARBITRUM_SEQUENCER_FEED = "0xFdB631F5EE196F0ed6FAa767959853A9F217697D"
+    pytest.TWAP = "0xFa64f316e627aD8360de2476aF0dD9250018CFc5"
+
+    # compiled contracts are cached in .pytest_cache across runs and
+    # xdist workers, -p no:cacheprovider compiles everything again
+    if hasattr(config, "cache"):
+        compiler_cache.set_cache_dir(config.cache.mkdir("compiled-contracts"))
 
 
 # ----------
@@ -23,6 +34,11 @@ def pytest_configure():
 OWNER = boa.env.generate_address("owner")
 boa.env.eoa = OWNER
 
+# boa starts the chain at the wall clock time, pinning it keeps uids and
+# timestamps identical between a serial run and every pytest-xdist worker.
+GENESIS_TIMESTAMP = 1_700_000_000
+boa.env.vm.patch.timestamp = GENESIS_TIMESTAMP
+
 
 @pytest.fixture(scope="session")
 def owner():
@@ -42,6 +58,9 @@ def bob():
 # -----------
 #  Contracts
 # -----------
+# Every pytest-xdist worker is its own process and deploys these itself.
+# The mocks sit at their override_address and all other contracts are
+# deployed in autouse order, so addresses match a serial run.
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -64,7 +83,7 @@ def dex():
 
 
 @pytest.fixture(scope="session", autouse=True)
-def vault(eth_usd_oracle, usdc_usd_oracle, wbtc_usd_oracle):
+def vault(eth_usd_oracle, usdc_usd_oracle, wbtc_usd_oracle, weth, usdc, wbtc):
     vault = boa.load("contracts/margin-dex/Vault.vy")
     vault.whitelist_token(pytest.WETH, pytest.ETH_USD_ORACLE, 60*60*24)
     vault.whitelist_token(pytest.USDC, pytest.USDC_USD_ORACLE, 60*60*24)
@@ -114,6 +133,16 @@ def arbitrum_sequencer():
     )
 
 
+@pytest.fixture(scope="session", autouse=True)
+def twap():
+    # 1 USDC = 0.0008 WETH
+    return boa.load(
+        "contracts/testing/MockTwap.vy",
+        8 * 10**14,
+        override_address=pytest.TWAP,
+    )
+
+
 @pytest.fixture(scope="session", autouse=True)
 def swap_router():
     swap_router = boa.load("contracts/margin-dex/SwapRouter.vy")
@@ -178,7 +207,193 @@ def wbtc():
 #    setup
 # -----------
 @pytest.fixture(scope="session", autouse=True)
-def setup(swap_router, vault, dex):
+def connect_contracts(swap_router, vault, dex):
     vault.set_is_whitelisted_dex(dex.address, True)
     vault.set_swap_router(swap_router)
     dex.set_vault(vault.address)
+
+
+# -----------
+#  Snapshots
+# -----------
+# boa has no public API to export or restore the chain state, the
+# checkpoints below swap the account db of the py-evm state instead.
+# Every use of boa and py-evm internals goes through VmState, which
+# refuses to run against any titanoboa but the pinned version.
+TITANOBOA_VERSION = "0.1.7"
+
+
+class VmState:
+    def __init__(self, env):
+        version = importlib.metadata.version("titanoboa")
+        if version != TITANOBOA_VERSION:
+            raise RuntimeError(
+                f"checkpoints rely on titanoboa {TITANOBOA_VERSION} internals, found {version}"
+            )
+        self.env = env
+
+    @property
+    def account_db(self):
+        return self.env.vm.state._account_db
+
+    @account_db.setter
+    def account_db(self, account_db):
+        self.env.vm.state._account_db = account_db
+
+    def raw_db(self):
+        return self.account_db._raw_store_db.wrapped_db
+
+    def written_slots(self):
+        """Storage slots written since boa started, by address."""
+        return self.env.sstore_trace
+
+    def contract_addresses(self):
+        return set(self.env._contracts) | set(self.env.sstore_trace)
+
+    def patched_values(self):
+        """Block and chain values boa patches into the vm, e.g. timestamp."""
+        patch = self.env.vm.patch
+        return {attr: getattr(patch, attr) for attrs, _ in patch._patchables for attr in attrs}
+
+    def restore_patched_values(self, patched):
+        for attr, value in patched.items():
+            setattr(self.env.vm.patch, attr, value)
+
+
+vm_state = VmState(boa.env)
+
+
+# boa only anchors the test call itself, the isolation fixture also
+# rolls back state changed while setting up function scoped fixtures.
+@pytest.fixture(autouse=True)
+def isolation(base_snapshot):
+    account_db = vm_state.account_db
+    with boa.env.anchor():
+        yield
+        # restoring a checkpoint swaps the account db
+        vm_state.account_db = account_db
+
+
+# Checkpoints are persisted and restored by pointing the vm at their
+# state root, which is cheap compared to replaying the transactions
+# that lead to that state. Persisting commits the storage, so the
+# first write to a slot in a test pays the full SSTORE cost like it
+# would on chain.
+def take_snapshot():
+    account_db = vm_state.account_db
+    account_db.persist()
+    return account_db.state_root, vm_state.patched_values()
+
+
+def restore_snapshot(snapshot):
+    state_root, patched = snapshot
+    vm_state.account_db = AccountDB(vm_state.raw_db(), state_root)
+    vm_state.restore_patched_values(patched)
+
+
+def export_snapshot():
+    """
+    Snapshot of the current state built by copying all deployed contracts
+    into a fresh account db, the live one is never persisted so storage
+    written before keeps counting as dirty like in a plain boa session.
+    """
+    state = boa.env.vm.state
+    account_db = AccountDB(vm_state.raw_db())
+    written_slots = vm_state.written_slots()
+    for address in vm_state.contract_addresses():
+        account = to_canonical_address(address)
+        account_db.set_code(account, state.get_code(account))
+        account_db.set_nonce(account, state.get_nonce(account))
+        account_db.set_balance(account, state.get_balance(account))
+        for slot in written_slots.get(address, ()):
+            key = int.from_bytes(slot, "big")
+            account_db.set_storage(account, key, state.get_storage(account, key))
+
+    account_db.persist()
+    return account_db.state_root, vm_state.patched_values()
+
+
+_checkpoints = {}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def base_snapshot(
+    connect_contracts,
+    spot_limit,
+    spot_dca,
+    mock_vault,
+    mock_router,
+    mock_uniswap_router,
+    arbitrum_sequencer,
+    twap,
+):
+    # state after all contracts are deployed and connected
+    _checkpoints["base"] = export_snapshot(), None
+    return _checkpoints["base"][0]
+
+
+def checkpoint(name, build, parent="base"):
+    """
+    Restores the named checkpoint and returns the result of its build.
+    The first time it is requested, build() runs on top of the parent
+    checkpoint. Restoring replaces all state changed before.
+    """
+    if name not in _checkpoints:
+        checkpoint(parent, None)
+        result = build()
+        _checkpoints[name] = take_snapshot(), result
+
+    snapshot, result = _checkpoints[name]
+    restore_snapshot(snapshot)
+    return result
+
+
+@pytest.fixture(scope="session")
+def checkpoints():
+    """
+    checkpoint() for fixtures outside this file building their own
+    checkpoints on top of the ones below.
+    """
+    return checkpoint
+
+
+# -------------
+#  Checkpoints
+# -------------
+@pytest.fixture
+def funded_vault(base_snapshot, vault, mock_router, owner, usdc):
+    """
+    Vault swapping through the mock router with owner whitelisted as
+    dex, 1000 USDC of owner margin and 1M USDC of base LP liquidity.
+    """
+
+    def build():
+        vault.set_swap_router(mock_router.address)
+        vault.set_is_whitelisted_dex(owner, True)
+        usdc.approve(vault.address, 999999999999999999)
+        vault.fund_account(usdc, 1000000000)
+        vault.provide_liquidity(usdc, 1000000000000, False)
+        return vault
+
+    return checkpoint("funded vault", build)
+
+
+@pytest.fixture
+def weth_position(funded_vault, owner, weth, usdc):
+    """
+    Uid of a 10x leveraged WETH position of owner in the funded
+    vault, 10 USDC margin and 90 USDC debt.
+    """
+
+    def build():
+        uid, _ = funded_vault.open_position(
+            owner,  # account
+            weth,  # position_token
+            int(0.081 * 10**18),  # min_position_amount_out
+            usdc,  # debt_token
+            90 * 10**6,  # debt_amount
+            10 * 10**6,  # margin_amount
+        )
+        return uid
+
+    return checkpoint("weth position", build, parent="funded vault")
@@ -1,4 +1,5 @@
 import pytest
+import boa
 
 @pytest.fixture(autouse=True)
 def setup(dex, mock_vault):
@@ -53,3 +54,84 @@ def test_post_limit_order(dex, owner, usdc, weth):
     assert limit_order[7] == 999999999999
     assert limit_order[8] == []
     assert limit_order[9] == []
+
+
+def test_purge_expired_limit_orders(dex, owner, usdc, weth, alice):
+    now = boa.env.vm.state.timestamp
+    expiring = [
+        dex.post_limit_order(owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1, now + 60, [], [])[0]
+        for _ in range(2)
+    ]
+    valid = dex.post_limit_order(owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1, now + 600, [], [])[0]
+    boa.env.time_travel(seconds=120)
+
+    with boa.env.prank(alice):
+        purged = dex.purge_expired(expiring + [valid, b"\x01" * 32])
+
+    assert purged == 2
+    assert dex.limit_orders(expiring[0])[1] == pytest.ZERO_ADDRESS
+    assert dex.limit_orders(expiring[1])[1] == pytest.ZERO_ADDRESS
+    assert dex.limit_orders(valid)[0] == valid
+    assert dex.limit_order_uids(owner, 0) == valid
+
+
+def test_purge_expired_pays_the_escrowed_deposits(dex, owner, usdc, weth, alice):
+    now = boa.env.vm.state.timestamp
+    dex.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(dex, 3 * 10**6)
+    expiring = [
+        dex.post_limit_order(owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1, now + 60, [], [])[0]
+        for _ in range(2)
+    ]
+    valid = dex.post_limit_order(owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1, now + 600, [], [])[0]
+    assert usdc.balanceOf(dex) == 3 * 10**6
+    boa.env.time_travel(seconds=120)
+    alice_usdc = usdc.balanceOf(alice)
+
+    with boa.env.prank(alice):
+        purged = dex.purge_expired(expiring + [valid])
+
+    assert purged == 2
+    assert usdc.balanceOf(alice) == alice_usdc + 2 * 10**6
+    assert dex.get_logs()[-1].args[-1] == 2 * 10**6
+    assert dex.purge_deposits(valid)[2] == 1 * 10**6
+
+
+def test_purging_own_orders_only_returns_the_deposits(dex, owner, usdc, weth):
+    now = boa.env.vm.state.timestamp
+    # tokens held by the dex are not paid out as rebates
+    usdc.transfer(dex, 10 * 10**6)
+    dex.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(dex, 3 * 10**6)
+    uids = [
+        dex.post_limit_order(owner, weth, usdc, 1, 2, 1, now, [], [])[0]
+        for _ in range(3)
+    ]
+    boa.env.time_travel(seconds=1)
+    usdc_before = usdc.balanceOf(owner)
+
+    assert dex.purge_expired(uids) == 3
+
+    assert usdc.balanceOf(owner) == usdc_before + 3 * 10**6
+    assert usdc.balanceOf(dex) == 10 * 10**6
+
+
+def test_deposit_is_returned_to_the_poster_on_cancel(dex, owner, usdc, weth, alice):
+    dex.set_purge_rebate(usdc, 1 * 10**6)
+    dex.add_delegate(alice)
+    with boa.env.prank(alice):
+        usdc.approve(dex, 1 * 10**6)
+        uid = dex.post_limit_order(owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1, 99999999999, [], [])[0]
+    assert dex.purge_deposits(uid)[0] == alice
+    alice_usdc = usdc.balanceOf(alice)
+
+    dex.cancel_limit_order(uid)
+
+    assert usdc.balanceOf(alice) == alice_usdc + 1 * 10**6
+    assert dex.purge_deposits(uid)[2] == 0
+
+
+def test_NON_admin_CANNOT_set_purge_rebate(dex, usdc, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            dex.set_purge_rebate(usdc, 1)
@@ -0,0 +1,59 @@
+import pytest
+import boa
+
+
+@pytest.fixture(autouse=True)
+def setup(dex, mock_vault):
+    dex.set_vault(mock_vault.address)
+
+
+def open_trade(dex, owner, weth, usdc, tp_orders=[], sl_orders=[]):
+    return dex.open_trade(
+        owner,  # account
+        weth,  # position_token
+        1 * 10**18,  # min_position_amount_out
+        usdc,  # debt_token
+        1000 * 10**6,  # debt_amount
+        234 * 10**6,  # margin_amount
+        tp_orders,
+        sl_orders,
+    )
+
+
+def test_open_trades_count(dex, owner, weth, usdc):
+    count = dex.open_trades_count(owner)
+
+    open_trade(dex, owner, weth, usdc)
+
+    assert dex.open_trades_count(owner) == count + 1
+    assert dex.open_trades_count(owner) == len(dex.get_all_open_trades(owner))
+
+
+def test_get_open_trades_is_paginated(dex, owner, weth, usdc):
+    count = dex.open_trades_count(owner)
+    for _ in range(3):
+        open_trade(dex, owner, weth, usdc)
+
+    all_trades = dex.get_all_open_trades(owner)
+
+    assert dex.get_open_trades(owner, 0, count + 3) == all_trades
+    assert dex.get_open_trades(owner, count, 2) == all_trades[count : count + 2]
+    assert dex.get_open_trades(owner, count + 2, 2) == all_trades[count + 2 :]
+    assert dex.get_open_trades(owner, count + 3, 2) == []
+
+
+def test_get_open_trade_summaries(dex, owner, weth, usdc):
+    count = dex.open_trades_count(owner)
+    tp_orders = [(1, 2, False), (3, 4, False)]
+    sl_orders = [(5, 6, False)]
+    trade = open_trade(dex, owner, weth, usdc, tp_orders, sl_orders)
+
+    summaries = dex.get_open_trade_summaries(owner, count, 1)
+
+    # struct TradeSummary:
+    #     uid: bytes32
+    #     account: address
+    #     vault_position_uid: bytes32
+    #     tp_order_count: uint256
+    #     sl_order_count: uint256
+    assert summaries == [(trade[0], owner, trade[2], 2, 1)]
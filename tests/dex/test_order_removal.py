@@ -0,0 +1,62 @@
+import pytest
+import boa
+
+
+@pytest.fixture(autouse=True)
+def setup(dex, mock_vault):
+    dex.set_vault(mock_vault.address)
+
+
+def open_trade(dex, owner, weth, usdc):
+    return dex.open_trade(owner, weth, 1 * 10**18, usdc, 1000 * 10**6, 234 * 10**6, [], [])[0]
+
+
+def post_limit_order(dex, owner, weth, usdc):
+    return dex.post_limit_order(
+        owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1 * 10**18, 99999999999, [], []
+    )[0]
+
+
+def uid_index(dex, index_name, uid):
+    return dex.eval(f"self.{index_name}[0x{uid.hex()}]")
+
+
+def test_closing_a_middle_trade_moves_the_last_trade_into_its_slot(dex, owner, weth, usdc):
+    uids = [open_trade(dex, owner, weth, usdc) for _ in range(4)]
+
+    dex.close_trade(uids[1], 0)
+
+    remaining = [uids[0], uids[3], uids[2]]
+    assert dex.eval(f"self.trades_by_account[{owner}]") == remaining
+    for index, uid in enumerate(remaining):
+        assert uid_index(dex, "trade_uid_index", uid) == index
+    assert uid_index(dex, "trade_uid_index", uids[1]) == 0
+
+
+def test_closing_the_last_trade_only_pops(dex, owner, weth, usdc):
+    uids = [open_trade(dex, owner, weth, usdc) for _ in range(3)]
+
+    dex.close_trade(uids[2], 0)
+
+    assert dex.eval(f"self.trades_by_account[{owner}]") == uids[:2]
+    assert uid_index(dex, "trade_uid_index", uids[0]) == 0
+    assert uid_index(dex, "trade_uid_index", uids[1]) == 1
+
+
+def test_cancelling_a_middle_limit_order_moves_the_last_order_into_its_slot(
+    dex, owner, weth, usdc
+):
+    uids = [post_limit_order(dex, owner, weth, usdc) for _ in range(4)]
+
+    dex.cancel_limit_order(uids[1])
+
+    remaining = [uids[0], uids[3], uids[2]]
+    assert dex.eval(f"self.limit_order_uids[{owner}]") == remaining
+    for index, uid in enumerate(remaining):
+        assert uid_index(dex, "limit_order_uid_index", uid) == index
+    assert uid_index(dex, "limit_order_uid_index", uids[1]) == 0
+
+    # the moved order is still removed from its new slot
+    dex.cancel_limit_order(uids[3])
+    assert dex.eval(f"self.limit_order_uids[{owner}]") == [uids[0], uids[2]]
+    assert uid_index(dex, "limit_order_uid_index", uids[2]) == 1
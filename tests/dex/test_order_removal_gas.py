@@ -0,0 +1,52 @@
+import pytest
+
+# closing a trade and cancelling a limit order must cost the same
+# regardless of how many other trades or orders the account has open
+ORDER_COUNTS = [1, 100, 1000]
+MAX_GAS_SPREAD = 1_000
+
+
+@pytest.fixture(autouse=True)
+def setup(dex, mock_vault):
+    dex.set_vault(mock_vault.address)
+
+
+def close_trade_gas(dex, owner, weth, usdc, count):
+    for uid in dex.eval(f"self.trades_by_account[{owner}]"):
+        dex.close_trade(uid, 0)
+
+    for _ in range(count):
+        dex.open_trade(owner, weth, 1 * 10**18, usdc, 1000 * 10**6, 234 * 10**6, [], [])
+
+    uid = dex.trades_by_account(owner, 0)
+    dex.close_trade(uid, 0)
+    return dex._computation.get_gas_used()
+
+
+def cancel_limit_order_gas(dex, owner, weth, usdc, count):
+    for uid in dex.eval(f"self.limit_order_uids[{owner}]"):
+        dex.cancel_limit_order(uid)
+
+    for _ in range(count):
+        dex.post_limit_order(
+            owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1 * 10**18, 99999999999, [], []
+        )
+
+    uid = dex.limit_order_uids(owner, 0)
+    dex.cancel_limit_order(uid)
+    return dex._computation.get_gas_used()
+
+
+def test_close_trade_gas_is_constant(dex, owner, weth, usdc):
+    # the first close also initialises the nonreentrant lock slot
+    close_trade_gas(dex, owner, weth, usdc, 1)
+
+    gas = [close_trade_gas(dex, owner, weth, usdc, n) for n in ORDER_COUNTS]
+
+    assert max(gas) - min(gas) < MAX_GAS_SPREAD
+
+
+def test_cancel_limit_order_gas_is_constant(dex, owner, weth, usdc):
+    gas = [cancel_limit_order_gas(dex, owner, weth, usdc, n) for n in ORDER_COUNTS]
+
+    assert max(gas) - min(gas) < MAX_GAS_SPREAD
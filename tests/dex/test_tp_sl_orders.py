@@ -3,6 +3,10 @@ import boa
 
 BASE_LP = False
 
+# executing a StopLoss order only flips one bit in the executed
+# orders bitmap instead of rewriting the whole Trade (46_231 before)
+EXECUTE_SL_ORDER_GAS = 45_000
+
 
 @pytest.fixture(autouse=True)
 def setup(dex, mock_vault):
@@ -70,3 +74,91 @@ def test_cancel_tp_sl_orders(dex, owner, weth, usdc):
 
     assert trade_after[3] == []
     assert trade_after[4] == [(888, 321, False)]
+
+
+def open_trade_with_orders(dex, owner, weth, usdc, tp_orders, sl_orders):
+    return dex.open_trade(
+        owner,  # account
+        weth,  # position_token
+        1 * 10**18,  # min_position_amount_out
+        usdc,  # debt_token
+        1000 * 10**6,  # debt_amount
+        234 * 10**6,  # margin_amount
+        tp_orders,
+        sl_orders,
+    )
+
+
+def test_execute_tp_order_marks_order_executed(dex, owner, weth, usdc, mock_vault):
+    trade = open_trade_with_orders(
+        dex, owner, weth, usdc, [(123, 321, False), (456, 654, False)], []
+    )
+    uid = trade[0]
+    mock_vault.set_position_amount(10**18)
+
+    dex.execute_tp_order(uid, 1)
+
+    assert dex.open_trades(uid)[3] == [(123, 321, False), (456, 654, True)]
+    with boa.reverts("order already executed"):
+        dex.execute_tp_order(uid, 1)
+    with boa.reverts("invalid order index"):
+        dex.execute_tp_order(uid, 2)
+
+
+def test_execute_sl_order_marks_order_executed(dex, owner, weth, usdc, mock_vault):
+    trade = open_trade_with_orders(dex, owner, weth, usdc, [], [(999, 321, False)])
+    uid = trade[0]
+    mock_vault.set_position_amount(10**18)
+
+    mock_vault.set_current_exchange_rate(1000)
+    with boa.reverts("trigger price not reached"):
+        dex.execute_sl_order(uid, 0)
+
+    mock_vault.set_current_exchange_rate(999)
+    dex.execute_sl_order(uid, 0)
+
+    assert dex.open_trades(uid)[4] == [(999, 321, True)]
+    with boa.reverts("order already executed"):
+        dex.execute_sl_order(uid, 0)
+
+
+def test_cancel_moves_executed_flag_of_last_order(dex, owner, weth, usdc, mock_vault):
+    tp_orders = [(1, 1, False), (2, 2, False), (3, 3, False)]
+    trade = open_trade_with_orders(dex, owner, weth, usdc, tp_orders, [])
+    uid = trade[0]
+    mock_vault.set_position_amount(10**18)
+
+    dex.execute_tp_order(uid, 2)
+    dex.cancel_tp_order(uid, 0)
+
+    assert dex.open_trades(uid)[3] == [(3, 3, True), (2, 2, False)]
+    with boa.reverts("order already executed"):
+        dex.execute_tp_order(uid, 0)
+    dex.execute_tp_order(uid, 1)
+
+
+def test_execute_sl_order_gas(dex, owner, weth, usdc, mock_vault):
+    sl_orders = [(999, 321, False)] * 8
+    trade = open_trade_with_orders(dex, owner, weth, usdc, [], sl_orders)
+    uid = trade[0]
+    mock_vault.set_position_amount(10**18)
+    mock_vault.set_current_exchange_rate(999)
+
+    dex.execute_sl_order(uid, 3)
+    assert dex._computation.get_gas_used() < EXECUTE_SL_ORDER_GAS
+
+
+def test_close_trade_clears_stored_tp_sl_orders(dex, owner, weth, usdc):
+    tp_orders = [(1, 1, False), (2, 2, False)]
+    sl_orders = [(3, 3, False), (4, 4, False), (5, 5, False)]
+    trade = open_trade_with_orders(dex, owner, weth, usdc, tp_orders, sl_orders)
+    uid = f"0x{trade[0].hex()}"
+
+    dex.close_trade(trade[0], 0)
+
+    for i in range(len(tp_orders)):
+        assert dex.eval(f"self.tp_orders[{uid}][{i}].reduce_by_amount") == 0
+        assert dex.eval(f"self.tp_orders[{uid}][{i}].min_amount_out") == 0
+    for i in range(len(sl_orders)):
+        assert dex.eval(f"self.sl_orders[{uid}][{i}].trigger_price") == 0
+        assert dex.eval(f"self.sl_orders[{uid}][{i}].reduce_by_amount") == 0
@@ -0,0 +1,443 @@
+import os
+from collections import namedtuple
+
+import pytest
+import boa
+from hypothesis import HealthCheck, settings, strategies as st
+from hypothesis.stateful import (
+    RuleBasedStateMachine,
+    invariant,
+    precondition,
+    rule,
+    run_state_machine_as_test,
+)
+
+# Random sequences of funding, LP provision and withdrawal, trading,
+# TP/SL execution, liquidations, oracle moves and time passing by
+# several accounts on the Vault and MarginDex, checking the accounting
+# invariants after every step. boa anchors every Hypothesis example, so
+# each one starts over from the "fuzz market" checkpoint the test
+# restored. Raise FUZZ_EXAMPLES for a longer run.
+FUZZ_EXAMPLES = int(os.environ.get("FUZZ_EXAMPLES", "10"))
+FUZZ_STEPS = int(os.environ.get("FUZZ_STEPS", "20"))
+
+ACTORS = ["carol", "dave", "erin", "frank"]
+PERCENTAGE_BASE = 100_00
+TRADE_OPEN_FEE = 30
+LIQUIDATION_PENALTY = 100
+MAX_LEVERAGE = 50
+
+actors = st.integers(min_value=0, max_value=len(ACTORS) - 1)
+tokens = st.sampled_from(["usdc", "weth"])
+percents = st.integers(min_value=1, max_value=100)
+
+OpenTrade = namedtuple("OpenTrade", ["account", "debt_token", "position_token", "position_uid"])
+
+
+class Market:
+    def __init__(self, vault, dex, usdc, weth, eth_usd_oracle, owner):
+        self.vault = vault
+        self.dex = dex
+        self.tokens = {"usdc": usdc, "weth": weth}
+        self.eth_usd_oracle = eth_usd_oracle
+        self.owner = owner
+        self.actors = []
+
+
+@pytest.fixture
+def market(checkpoints, funded_vault, dex, usdc, weth, eth_usd_oracle, owner):
+    market = Market(funded_vault, dex, usdc, weth, eth_usd_oracle, owner)
+
+    def build():
+        vault = market.vault
+        vault.set_fee_configuration(TRADE_OPEN_FEE, LIQUIDATION_PENALTY, 30_00, 80_00)
+        for debt_token, position_token in ((usdc, weth), (weth, usdc)):
+            vault.set_max_leverage_for_market(debt_token, position_token, MAX_LEVERAGE)
+            vault.set_liquidate_slippage_for_market(position_token, debt_token, 1_00)
+            vault.set_acceptable_amount_of_bad_debt(debt_token, 2**255)
+
+        weth.approve(vault, 2**256 - 1)
+        vault.provide_liquidity(weth, 1000 * 10**18, False)
+
+        actors = [boa.env.generate_address(name) for name in ACTORS]
+        for actor in actors:
+            usdc.transfer(actor, 1_000_000 * 10**6)
+            weth.transfer(actor, 1000 * 10**18)
+            with boa.env.prank(actor):
+                usdc.approve(vault, 2**256 - 1)
+                weth.approve(vault, 2**256 - 1)
+        return actors
+
+    market.actors = checkpoints("fuzz market", build, parent="funded vault")
+    return market
+
+
+def revert_reason(error):
+    frame = error.stack_trace.last_frame
+    if isinstance(frame, str):
+        return frame
+    return frame.pretty_vm_reason
+
+
+class VaultStateMachine(RuleBasedStateMachine):
+    def __init__(self, market):
+        super().__init__()
+        self.market = market
+        self.vault = market.vault
+        self.dex = market.dex
+        self.tokens = market.tokens
+        self.lp_holders = market.actors + [market.owner]
+        # trade uid -> OpenTrade
+        self.trades = {}
+
+    #
+    # helpers
+    #
+    def transact(self, sender, allowed_reverts, function, *args):
+        """Calls function as sender, reverts not in allowed_reverts fail."""
+        with boa.env.prank(sender):
+            try:
+                return function(*args)
+            except boa.BoaError as error:
+                reason = revert_reason(error)
+                assert reason in allowed_reverts, f"unexpected revert: {reason}"
+                return None
+
+    def quote(self, token_in, token_out, amount):
+        # Vault._quote at the current oracle prices
+        usd_value = (
+            self.vault.to_usd_oracle_price(token_in)
+            * amount
+            // 10 ** token_in.decimals()
+        )
+        return (
+            10 ** token_out.decimals() * usd_value // self.vault.to_usd_oracle_price(token_out)
+        )
+
+    def position(self, uid):
+        # (uid, account, debt_token, margin_amount, debt_shares, position_token, position_amount)
+        return self.vault.positions(self.trades[uid].position_uid)
+
+    def pool_is_wiped_out(self, token, is_safety_module):
+        bad_debt = self.vault.bad_debt(token)
+        safety_module = self.vault.safety_module_lp_total_amount(token)
+        if is_safety_module:
+            return (
+                self.vault.safety_module_lp_total_shares(token) > 0
+                and safety_module <= bad_debt
+            )
+        return (
+            self.vault.base_lp_total_shares(token) > 0
+            and self.vault.base_lp_total_amount(token) + safety_module <= bad_debt
+        )
+
+    def forget_closed_trades(self):
+        for uid in list(self.trades):
+            if self.position(uid)[1] == pytest.ZERO_ADDRESS:
+                del self.trades[uid]
+
+    def draw_trade(self, data):
+        return data.draw(st.sampled_from(sorted(self.trades)), label="trade")
+
+    #
+    # accounts and liquidity
+    #
+    @rule(actor=actors, token=tokens, percent=percents)
+    def fund_account(self, actor, token, percent):
+        account = self.market.actors[actor]
+        token = self.tokens[token]
+        amount = token.balanceOf(account) * percent // 100
+        self.transact(account, ("funding paused",), self.vault.fund_account, token, amount)
+
+    @rule(actor=actors, token=tokens, percent=percents)
+    def withdraw_from_account(self, actor, token, percent):
+        account = self.market.actors[actor]
+        token = self.tokens[token]
+        amount = self.vault.margin(account, token) * percent // 100
+        self.transact(account, (), self.vault.withdraw_from_account, token, amount)
+
+    @rule(actor=actors, token=tokens, percent=percents, is_safety_module=st.booleans())
+    def provide_liquidity(self, actor, token, percent, is_safety_module):
+        account = self.market.actors[actor]
+        token = self.tokens[token]
+        amount = token.balanceOf(account) * percent // 100
+        if amount == 0:
+            return  # the first share is held back for rounding
+        if self.pool_is_wiped_out(token, is_safety_module):
+            return  # shares are worth 0 until the bad debt is repaid
+
+        self.transact(
+            account,
+            ("LPing paused",),
+            self.vault.provide_liquidity,
+            token,
+            amount,
+            is_safety_module,
+        )
+
+    @rule(actor=actors, token=tokens, percent=percents, is_safety_module=st.booleans())
+    def withdraw_liquidity(self, actor, token, percent, is_safety_module):
+        account = self.market.actors[actor]
+        token = self.tokens[token]
+        if is_safety_module:
+            shares = self.vault.safety_module_lp_shares(token, account)
+        else:
+            shares = self.vault.base_lp_shares(token, account)
+        amount = self.vault.lp_shares_to_amount(
+            token, shares * percent // 100, is_safety_module
+        )
+        self.transact(
+            account,
+            ("liquidity not available", "cannot withdraw more than you own"),
+            self.vault.withdraw_liquidity,
+            token,
+            amount,
+            is_safety_module,
+        )
+
+    @rule(actor=actors, token=tokens, percent=percents)
+    def repay_bad_debt(self, actor, token, percent):
+        account = self.market.actors[actor]
+        token = self.tokens[token]
+        amount = min(self.vault.bad_debt(token) * percent // 100, token.balanceOf(account))
+        self.transact(account, (), self.vault.repay_bad_debt, token, amount)
+
+    #
+    # trading
+    #
+    @rule(
+        actor=actors,
+        debt_token=tokens,
+        percent=percents,
+        leverage=st.integers(min_value=1, max_value=MAX_LEVERAGE + 10),
+        tp_percent=st.none() | st.integers(min_value=101, max_value=150),
+        sl_percent=st.none() | st.integers(min_value=50, max_value=99),
+    )
+    def open_trade(self, actor, debt_token, percent, leverage, tp_percent, sl_percent):
+        account = self.market.actors[actor]
+        position_token = self.tokens["weth" if debt_token == "usdc" else "usdc"]
+        debt_token = self.tokens[debt_token]
+
+        budget = self.vault.margin(account, debt_token) * percent // 100
+        # leave room for the trading fee charged on margin + debt
+        margin = budget * PERCENTAGE_BASE // (PERCENTAGE_BASE + leverage * TRADE_OPEN_FEE)
+        debt = margin * (leverage - 1)
+        if margin == 0:
+            return
+
+        position_amount = self.quote(debt_token, position_token, margin + debt)
+        tp_orders = []
+        if tp_percent is not None:
+            min_amount_out = (margin + debt) * tp_percent // 100
+            tp_orders.append((position_amount, min_amount_out, False))
+        sl_orders = []
+        if sl_percent is not None:
+            exchange_rate = self.quote(
+                position_token, debt_token, 10 ** position_token.decimals()
+            )
+            sl_orders.append((exchange_rate * sl_percent // 100, position_amount // 2, False))
+
+        trade = self.transact(
+            account,
+            (
+                "invalid debt amount",
+                "insufficient liquidity",
+                "not enough margin for fee",
+                "cannot open liquidatable position",
+                "paused",
+            ),
+            self.dex.open_trade,
+            account,
+            position_token,
+            position_amount,
+            debt_token,
+            debt,
+            margin,
+            tp_orders,
+            sl_orders,
+        )
+        if trade is not None:
+            self.trades[trade[0]] = OpenTrade(account, debt_token, position_token, trade[2])
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), percent=st.integers(min_value=1, max_value=99))
+    def reduce_trade(self, data, percent):
+        uid = self.draw_trade(data)
+        account, debt_token, position_token, position_uid = self.trades[uid]
+        position = self.position(uid)
+        amount = position[6] * percent // 100
+        # reduce_position splits the proceeds in the margin to debt ratio
+        # of the position, selling a slice for more than the whole
+        # position is booked at underflows its margin
+        book_value = position[3] + self.vault.debt(position_uid)
+        if self.quote(position_token, debt_token, amount) > book_value:
+            return
+
+        self.transact(
+            account,
+            ("in liquidation", "cannot reduce into liquidation"),
+            self.dex.partial_close_trade,
+            uid,
+            amount,
+            0,
+        )
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data())
+    def close_trade(self, data):
+        uid = self.draw_trade(data)
+        account, debt_token, position_token, _ = self.trades[uid]
+        amount_out = self.quote(position_token, debt_token, self.position(uid)[6])
+        # closing below the debt is rejected, those positions get liquidated
+        self.transact(
+            account, ("invalid min_amount_out",), self.dex.close_trade, uid, amount_out
+        )
+        self.forget_closed_trades()
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), actor=actors)
+    def liquidate(self, data, actor):
+        uid = self.draw_trade(data)
+        self.transact(
+            self.market.actors[actor],
+            ("position not liquidateable",),
+            self.dex.liquidate,
+            uid,
+        )
+        self.forget_closed_trades()
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), percent=percents)
+    def add_margin(self, data, percent):
+        uid = self.draw_trade(data)
+        account, debt_token, _, _ = self.trades[uid]
+        amount = self.vault.margin(account, debt_token) * percent // 100
+        self.transact(account, (), self.dex.add_margin, uid, amount)
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), percent=percents)
+    def remove_margin(self, data, percent):
+        uid = self.draw_trade(data)
+        account = self.trades[uid].account
+        amount = self.position(uid)[3] * percent // 100
+        self.transact(
+            account, ("exceeds max leverage",), self.dex.remove_margin, uid, amount
+        )
+
+    #
+    # conditional orders, executed like a keeper would
+    #
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), actor=actors)
+    def execute_tp_order(self, data, actor):
+        uid = self.draw_trade(data)
+        _, debt_token, position_token, _ = self.trades[uid]
+        tp_orders = self.dex.open_trades(uid)[3]
+        for index, (reduce_by_amount, min_amount_out, executed) in enumerate(tp_orders):
+            reached = self.quote(position_token, debt_token, reduce_by_amount) >= min_amount_out
+            if executed or not reached:
+                continue
+
+            self.transact(
+                self.market.actors[actor],
+                (
+                    "invalid min_amount_out",
+                    "in liquidation",
+                    "cannot reduce into liquidation",
+                    "_reduce_by_amount > position",
+                ),
+                self.dex.execute_tp_order,
+                uid,
+                index,
+            )
+            break
+        self.forget_closed_trades()
+
+    @precondition(lambda self: self.trades)
+    @rule(data=st.data(), actor=actors)
+    def execute_sl_order(self, data, actor):
+        uid = self.draw_trade(data)
+        sl_orders = self.dex.open_trades(uid)[4]
+        for index, (_, _, executed) in enumerate(sl_orders):
+            if executed:
+                continue
+
+            # a full close passes min_amount_out 0 to close_position,
+            # which rejects it while the position has debt
+            self.transact(
+                self.market.actors[actor],
+                (
+                    "trigger price not reached",
+                    "invalid min_amount_out",
+                    "in liquidation",
+                    "cannot reduce into liquidation",
+                ),
+                self.dex.execute_sl_order,
+                uid,
+                index,
+            )
+            break
+        self.forget_closed_trades()
+
+    #
+    # market
+    #
+    @rule(percent=st.integers(min_value=50, max_value=150))
+    def move_eth_price(self, percent):
+        oracle = self.market.eth_usd_oracle
+        answer = oracle.answer() * percent // 100
+        oracle.set_answer(min(max(answer, 100_0000_0000), 10_000_0000_0000))
+
+    @rule(seconds=st.integers(min_value=1, max_value=30 * 24 * 60 * 60))
+    def time_travel(self, seconds):
+        boa.env.time_travel(seconds=seconds)
+
+    #
+    # invariants
+    #
+    @invariant()
+    def lp_shares_add_up_to_the_total(self):
+        for token in self.tokens.values():
+            base_lp_shares = sum(
+                self.vault.base_lp_shares(token, holder) for holder in self.lp_holders
+            )
+            assert base_lp_shares == self.vault.base_lp_total_shares(token)
+
+            safety_module_shares = sum(
+                self.vault.safety_module_lp_shares(token, holder)
+                for holder in self.lp_holders
+            )
+            assert safety_module_shares == self.vault.safety_module_lp_total_shares(token)
+
+    @invariant()
+    def debt_shares_match_the_positions(self):
+        for token in self.tokens.values():
+            position_debt_shares = sum(
+                self.position(uid)[4]
+                for uid, trade in self.trades.items()
+                if trade.debt_token == token
+            )
+            assert position_debt_shares == self.vault.total_debt_shares(token)
+
+    @invariant()
+    def available_liquidity_is_not_negative(self):
+        for token in self.tokens.values():
+            liquidity = (
+                self.vault.base_lp_total_amount(token)
+                + self.vault.safety_module_lp_total_amount(token)
+            )
+            debt = self.vault.bad_debt(token) + self.vault.total_debt_amount(token)
+            assert liquidity >= debt
+
+
+def test_vault_accounting_invariants(market):
+    run_state_machine_as_test(
+        lambda: VaultStateMachine(market),
+        settings=settings(
+            max_examples=FUZZ_EXAMPLES,
+            stateful_step_count=FUZZ_STEPS,
+            deadline=None,
+            derandomize=True,
+            suppress_health_check=[HealthCheck.too_slow],
+        ),
+    )
@@ -0,0 +1,235 @@
+import fcntl
+import json
+import os
+from pathlib import Path
+
+import pytest
+import boa
+
+# Gas benchmarks for the state-changing entry points, checked against
+# the committed gas_snapshot.json. A benchmark fails when it uses more
+# than GAS_TOLERANCE (relative, default 1%) above its snapshot value.
+# Run with UPDATE_GAS_SNAPSHOT=1 to rewrite the snapshot instead, under
+# pytest-xdist every worker merges its measurements into the file.
+#
+# Benchmarks start from the funded_vault checkpoint, whose storage is
+# committed like on chain, so first writes pay the full SSTORE cost.
+SNAPSHOT_PATH = Path(__file__).parent / "gas_snapshot.json"
+GAS_TOLERANCE = float(os.environ.get("GAS_TOLERANCE", "0.01"))
+UPDATE_GAS_SNAPSHOT = os.environ.get("UPDATE_GAS_SNAPSHOT") == "1"
+
+
+@pytest.fixture(scope="module")
+def gas_snapshot():
+    snapshot = json.loads(SNAPSHOT_PATH.read_text()) if SNAPSHOT_PATH.exists() else {}
+    measured = {}
+    yield snapshot, measured
+
+    if UPDATE_GAS_SNAPSHOT:
+        write_snapshot(measured)
+
+
+def write_snapshot(measured):
+    with open(SNAPSHOT_PATH, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        content = f.read()
+        snapshot = json.loads(content) if content else {}
+        snapshot.update(measured)
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(snapshot, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def benchmark(gas_snapshot):
+    snapshot, measured = gas_snapshot
+
+    def record(name, contract):
+        gas = contract._computation.get_gas_used()
+        measured[name] = gas
+        if UPDATE_GAS_SNAPSHOT:
+            return gas
+
+        assert name in snapshot, f"{name} missing from {SNAPSHOT_PATH.name}"
+        budget = int(snapshot[name] * (1 + GAS_TOLERANCE))
+        assert (
+            gas <= budget
+        ), f"{name} regressed: {gas} > {snapshot[name]} (+{GAS_TOLERANCE:.1%})"
+        return gas
+
+    return record
+
+
+#
+# Vault
+#
+def open_position(vault, owner, weth, usdc):
+    uid, _ = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        int(0.081 * 10**18),  # min_position_amount_out
+        usdc,  # debt_token
+        90 * 10**6,  # debt_amount
+        10 * 10**6,  # margin_amount
+    )
+    return uid
+
+
+def test_gas_open_position(funded_vault, owner, weth, usdc, benchmark):
+    open_position(funded_vault, owner, weth, usdc)
+    benchmark("Vault.open_position", funded_vault)
+
+
+def test_gas_close_position(funded_vault, weth_position, benchmark):
+    funded_vault.close_position(weth_position, 90 * 10**6)
+    benchmark("Vault.close_position", funded_vault)
+
+
+def test_gas_reduce_position(funded_vault, weth_position, benchmark):
+    funded_vault.reduce_position(weth_position, int(0.04 * 10**18), 0)
+    benchmark("Vault.reduce_position", funded_vault)
+
+
+def test_gas_liquidate(funded_vault, weth_position, eth_usd_oracle, benchmark):
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    funded_vault.liquidate(weth_position)
+    benchmark("Vault.liquidate", funded_vault)
+
+
+@pytest.fixture
+def standing_allowance_vault(funded_vault, checkpoints, weth, usdc):
+    """
+    funded_vault with standing swap_router allowances for USDC and WETH.
+    """
+
+    def build():
+        funded_vault.set_swap_router_allowance(usdc, 1000 * 10**6)
+        funded_vault.set_swap_router_allowance(weth, 10**18)
+        return funded_vault
+
+    return checkpoints("standing allowance", build, parent="funded vault")
+
+
+@pytest.fixture
+def standing_allowance_position(standing_allowance_vault, checkpoints, owner, weth, usdc):
+    return checkpoints(
+        "standing allowance position",
+        lambda: open_position(standing_allowance_vault, owner, weth, usdc),
+        parent="standing allowance",
+    )
+
+
+def test_gas_open_position_with_standing_allowance(
+    standing_allowance_vault, owner, weth, usdc, benchmark
+):
+    open_position(standing_allowance_vault, owner, weth, usdc)
+    benchmark("Vault.open_position (standing allowance)", standing_allowance_vault)
+
+
+def test_gas_close_position_with_standing_allowance(
+    standing_allowance_vault, standing_allowance_position, benchmark
+):
+    standing_allowance_vault.close_position(standing_allowance_position, 90 * 10**6)
+    benchmark("Vault.close_position (standing allowance)", standing_allowance_vault)
+
+
+def test_gas_provide_liquidity(vault, usdc, benchmark):
+    usdc.approve(vault.address, 100 * 10**6)
+    vault.provide_liquidity(usdc, 100 * 10**6, False)
+    benchmark("Vault.provide_liquidity", vault)
+
+
+def test_gas_withdraw_liquidity(funded_vault, usdc, benchmark):
+    # withdraws from the base LP liquidity of the checkpoint, so no slot
+    # is still warm from providing it in the same test
+    funded_vault.withdraw_liquidity(usdc, 50 * 10**6, False)
+    benchmark("Vault.withdraw_liquidity", funded_vault)
+
+
+#
+# MarginDex, trading through the funded Vault
+#
+def open_trade(dex, owner, weth, usdc, tp_orders=(), sl_orders=()):
+    return dex.open_trade(
+        owner,  # account
+        weth,  # position_token
+        1 * 10**18,  # min_position_amount_out
+        usdc,  # debt_token
+        1000 * 10**6,  # debt_amount
+        234 * 10**6,  # margin_amount
+        list(tp_orders),
+        list(sl_orders),
+    )[0]
+
+
+def test_gas_open_trade(dex, funded_vault, owner, weth, usdc, benchmark):
+    tp_orders = [(5 * 10**17, 700 * 10**6, False)]
+    sl_orders = [(1000 * 10**6, 5 * 10**17, False)]
+    open_trade(dex, owner, weth, usdc, tp_orders, sl_orders)
+    benchmark("MarginDex.open_trade", dex)
+
+
+def test_gas_execute_tp_order(dex, funded_vault, owner, weth, usdc, benchmark):
+    tp_orders = [(5 * 10**17, 700 * 10**6, False)]
+    uid = open_trade(dex, owner, weth, usdc, tp_orders=tp_orders)
+    dex.execute_tp_order(uid, 0)
+    benchmark("MarginDex.execute_tp_order", dex)
+
+
+def test_gas_execute_sl_order(dex, funded_vault, owner, weth, usdc, benchmark):
+    sl_orders = [(1300 * 10**6, 5 * 10**17, False)]
+    uid = open_trade(dex, owner, weth, usdc, sl_orders=sl_orders)
+    dex.execute_sl_order(uid, 0)
+    benchmark("MarginDex.execute_sl_order", dex)
+
+
+def test_gas_execute_limit_order(
+    dex, mock_vault, funded_vault, owner, weth, usdc, benchmark
+):
+    # the Vault does not expose is_enabled_market, which posting checks
+    dex.set_vault(mock_vault.address)
+    uid = dex.post_limit_order(
+        owner, weth, usdc, 100 * 10**6, 900 * 10**6, 1 * 10**18, 999999999999, [], []
+    )[0]
+    dex.set_vault(funded_vault.address)
+
+    dex.execute_limit_order(uid)
+    benchmark("MarginDex.execute_limit_order", dex)
+
+
+#
+# Spot
+#
+def test_gas_spot_execute_limit_order(spot_limit, owner, weth, usdc, benchmark):
+    usdc.approve(spot_limit, 100 * 10**6)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    uid = spot_limit.get_all_open_positions(owner)[-1][0]
+
+    spot_limit.execute_limit_order(uid, [usdc.address, weth.address], [500], False)
+    benchmark("LimitOrders.execute_limit_order", spot_limit)
+
+
+def test_gas_execute_dca_order(spot_dca, owner, weth, usdc, benchmark):
+    usdc.approve(spot_dca, 10 * 10**6)
+    spot_dca.post_dca_order(usdc, weth, 10**6, 60, 10, 50, 300)
+    uid = spot_dca.get_all_open_positions(owner)[-1][0]
+    boa.env.time_travel(seconds=61)
+
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+    benchmark("Dca.execute_dca_order", spot_dca)
+
+
+def test_gas_execute_dca_order_with_standing_allowance(
+    spot_dca, owner, weth, usdc, benchmark
+):
+    usdc.approve(spot_dca, 10 * 10**6)
+    spot_dca.post_dca_order(usdc, weth, 10**6, 60, 10, 50, 300)
+    uid = spot_dca.get_all_open_positions(owner)[-1][0]
+    boa.env.time_travel(seconds=61)
+    # the first execution tops up the standing router allowance
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+    boa.env.time_travel(seconds=61)
+
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+    benchmark("Dca.execute_dca_order (standing allowance)", spot_dca)
@@ -127,4 +127,18 @@ def test_NON_owner_CANNOT_cancel_order(spot_dca, owner, weth, usdc, alice):
 
     with boa.env.prank(alice):
         with boa.reverts("unauthorized"):
-            spot_dca.cancel_dca_order(order[0])
\ No newline at end of file
+            spot_dca.cancel_dca_order(order[0])
+
+def test_cancelling_a_middle_order_moves_the_last_order_into_its_slot(spot_dca, owner, weth, usdc):
+    usdc.approve(spot_dca, 4 * 10 * 10**6)
+    for _ in range(4):
+        spot_dca.post_dca_order(usdc, weth, 10 * 10**6, 60, 1, 50, 300)
+    uids = spot_dca.eval(f"self.dca_order_uids[{owner}]")
+
+    spot_dca.cancel_dca_order(uids[1])
+
+    remaining = [uids[0], uids[3], uids[2]]
+    assert spot_dca.eval(f"self.dca_order_uids[{owner}]") == remaining
+    for index, uid in enumerate(remaining):
+        assert spot_dca.eval(f"self.dca_order_uid_index[0x{uid.hex()}]") == index
+    assert spot_dca.eval(f"self.dca_order_uid_index[0x{uids[1].hex()}]") == 0
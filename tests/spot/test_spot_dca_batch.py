@@ -0,0 +1,107 @@
+import pytest
+import boa
+
+FEE_BASE = 1000000
+FEE = 1000
+TWAP = 8 * 10**14
+
+
+def post_dca_order(spot_dca, account, usdc, weth, amount_in, max_slippage=50, twap_length=300):
+    with boa.env.prank(account):
+        usdc.approve(spot_dca, amount_in * 10)
+        spot_dca.post_dca_order(usdc, weth, amount_in, 60, 10, max_slippage, twap_length)
+        return spot_dca.get_all_open_positions(account)[-1][0]
+
+
+def min_amount_out(amount_in, max_slippage, pool_fee=500):
+    return amount_in * TWAP * (FEE_BASE - pool_fee - max_slippage) // FEE_BASE // 10**6
+
+
+def test_execute_dca_orders_swaps_once_and_splits_pro_rata(
+    spot_dca, owner, alice, bob, usdc, weth, mock_uniswap_router
+):
+    uid1 = post_dca_order(spot_dca, alice, usdc, weth, 10 * 10**6, max_slippage=50)
+    uid2 = post_dca_order(spot_dca, bob, usdc, weth, 30 * 10**6, max_slippage=20)
+    boa.env.time_travel(seconds=61)
+
+    alice_before = weth.balanceOf(alice)
+    bob_before = weth.balanceOf(bob)
+
+    spot_dca.execute_dca_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    # one transfer of token_in to the router for the whole batch
+    transfers = [
+        log
+        for log in spot_dca.get_logs()
+        if log.event_type.name == "Transfer" and log.address == usdc.address
+    ]
+    assert [
+        log.args[0] for log in transfers if log.topics[1] == mock_uniswap_router.address
+    ] == [40 * 10**6]
+
+    # lowest max_slippage of the batch is used for the min_amount_out
+    amount_out = min_amount_out(40 * 10**6, 20)
+    alice_out = amount_out * 10 // 40
+    bob_out = amount_out * 30 // 40
+    assert weth.balanceOf(alice) - alice_before == alice_out * (FEE_BASE - FEE) // FEE_BASE
+    assert weth.balanceOf(bob) - bob_before == bob_out * (FEE_BASE - FEE) // FEE_BASE
+
+    assert spot_dca.dca_orders(uid1)[9] == 1
+    assert spot_dca.dca_orders(uid2)[9] == 1
+
+
+def test_execute_dca_orders_skips_orders_that_are_not_due(spot_dca, alice, bob, usdc, weth):
+    uid1 = post_dca_order(spot_dca, alice, usdc, weth, 10 * 10**6)
+    uid2 = post_dca_order(spot_dca, bob, usdc, weth, 10 * 10**6, twap_length=600)
+    boa.env.time_travel(seconds=61)
+    spot_dca.execute_dca_orders([uid1], [usdc.address, weth.address], [500], False)
+
+    # the twap_length is taken from the first order that is executed
+    spot_dca.execute_dca_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    failed = [log for log in spot_dca.get_logs() if log.event_type.name == "DcaOrderFailed"]
+    assert [(log.args[0], log.args[1]) for log in failed] == [(uid1, "too soon")]
+    assert spot_dca.dca_orders(uid1)[9] == 1
+    assert spot_dca.dca_orders(uid2)[9] == 1
+
+
+def test_execute_dca_orders_skips_stale_first_uid(spot_dca, alice, bob, usdc, weth):
+    uid1 = post_dca_order(spot_dca, alice, usdc, weth, 10 * 10**6, twap_length=600)
+    uid2 = post_dca_order(spot_dca, bob, usdc, weth, 10 * 10**6, twap_length=600)
+    boa.env.time_travel(seconds=61)
+    stale = b"\x01" * 32
+
+    spot_dca.execute_dca_orders([stale, uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    failed = [log for log in spot_dca.get_logs() if log.event_type.name == "DcaOrderFailed"]
+    assert [(log.args[0], log.args[1]) for log in failed] == [(stale, "[path] invalid pair")]
+    assert spot_dca.dca_orders(uid1)[9] == 1
+    assert spot_dca.dca_orders(uid2)[9] == 1
+
+
+def test_execute_dca_orders_skips_twap_length_mismatch(spot_dca, alice, bob, usdc, weth):
+    uid1 = post_dca_order(spot_dca, alice, usdc, weth, 10 * 10**6)
+    uid2 = post_dca_order(spot_dca, bob, usdc, weth, 10 * 10**6, twap_length=600)
+    boa.env.time_travel(seconds=61)
+
+    spot_dca.execute_dca_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    failed = [log for log in spot_dca.get_logs() if log.event_type.name == "DcaOrderFailed"]
+    assert [(log.args[0], log.args[1]) for log in failed] == [(uid2, "twap length mismatch")]
+    assert spot_dca.dca_orders(uid1)[9] == 1
+    assert spot_dca.dca_orders(uid2)[9] == 0
+
+
+def test_execute_dca_orders_skips_other_pairs(spot_dca, alice, bob, usdc, weth):
+    uid1 = post_dca_order(spot_dca, alice, usdc, weth, 10 * 10**6)
+    with boa.env.prank(bob):
+        weth.approve(spot_dca, 10**18)
+        spot_dca.post_dca_order(weth, usdc, 10**17, 60, 10, 50, 300)
+        uid2 = spot_dca.get_all_open_positions(bob)[-1][0]
+    boa.env.time_travel(seconds=61)
+
+    spot_dca.execute_dca_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    failed = [log for log in spot_dca.get_logs() if log.event_type.name == "DcaOrderFailed"]
+    assert [(log.args[0], log.args[1]) for log in failed] == [(uid2, "[path] invalid pair")]
+    assert spot_dca.dca_orders(uid1)[9] == 1
@@ -129,4 +129,91 @@ def test_NON_owner_CANNOT_cancel_order(spot_limit, owner, weth, usdc, alice):
 
     with boa.env.prank(alice):
         with boa.reverts("unauthorized"):
-            spot_limit.cancel_limit_order(order[0])
\ No newline at end of file
+            spot_limit.cancel_limit_order(order[0])
+
+def test_purge_expired_orders_pays_deposits(spot_limit, owner, weth, usdc, alice):
+    now = boa.env.vm.state.timestamp
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(spot_limit, 100 * 10**6 + 4 * 10**6)
+    for _ in range(3):
+        spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, now + 60)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, now + 600)
+    uids = spot_limit.get_open_position_uids(owner, 0, 4)
+    assert spot_limit.escrowed_purge_deposits(usdc) == 4 * 10**6
+    boa.env.time_travel(seconds=120)
+
+    alice_usdc = usdc.balanceOf(alice)
+    with boa.env.prank(alice):
+        purged = spot_limit.purge_expired(uids)
+
+    assert purged == 3
+    assert usdc.balanceOf(alice) == alice_usdc + 3 * 10**6
+    assert spot_limit.escrowed_purge_deposits(usdc) == 1 * 10**6
+    assert spot_limit.get_open_position_uids(owner, 0, 4) == [uids[3]]
+
+
+def test_purging_own_orders_only_returns_the_deposits(spot_limit, owner, weth, usdc):
+    now = boa.env.vm.state.timestamp
+    # accrued fees
+    usdc.transfer(spot_limit, 10 * 10**6)
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(spot_limit, 1 + 3 * 10**6)
+    for _ in range(3):
+        spot_limit.post_limit_order(usdc, weth, 1, 1, now)
+    uids = spot_limit.get_open_position_uids(owner, 0, 3)
+    boa.env.time_travel(seconds=1)
+
+    usdc_before = usdc.balanceOf(owner)
+    assert spot_limit.purge_expired(uids) == 3
+
+    assert usdc.balanceOf(owner) == usdc_before + 3 * 10**6
+    assert usdc.balanceOf(spot_limit) == 10 * 10**6
+
+
+def test_deposit_is_returned_on_cancel_and_execution(spot_limit, owner, weth, usdc):
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(spot_limit, 200 * 10**6 + 2 * 10**6)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    canceled, executed = spot_limit.get_open_position_uids(owner, 0, 2)
+    usdc_before = usdc.balanceOf(owner)
+
+    spot_limit.cancel_limit_order(canceled)
+    assert usdc.balanceOf(owner) == usdc_before + 1 * 10**6
+
+    spot_limit.execute_limit_order(executed, [usdc.address, weth.address], [500], False)
+    assert usdc.balanceOf(owner) == usdc_before + 2 * 10**6 - 100 * 10**6
+    assert spot_limit.escrowed_purge_deposits(usdc) == 0
+
+
+def test_deposit_is_escrowed_from_the_poster(spot_limit, weth, usdc, bob):
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    with boa.env.prank(bob):
+        # the deposit is taken before the allowance for amount_in is checked
+        usdc.approve(spot_limit, 10 * 10**6)
+        with boa.reverts("insufficient allowance"):
+            spot_limit.post_limit_order(usdc, weth, 10 * 10**6, 1, 99999999999)
+
+
+def test_withdraw_fees_keeps_escrowed_deposits(spot_limit, owner, weth, usdc):
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    usdc.approve(spot_limit, 100 * 10**6 + 1 * 10**6)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    usdc.transfer(spot_limit, 10 * 10**6)
+
+    usdc_before = usdc.balanceOf(owner)
+    spot_limit.withdraw_fees(usdc)
+
+    assert usdc.balanceOf(owner) == usdc_before + 10 * 10**6
+    assert usdc.balanceOf(spot_limit) == 1 * 10**6
+
+
+def test_CANNOT_post_limit_order_without_amount_in(spot_limit, usdc, weth):
+    with boa.reverts("invalid amount_in"):
+        spot_limit.post_limit_order(usdc, weth, 0, 1, boa.env.vm.state.timestamp + 60)
+
+
+def test_NON_owner_CANNOT_set_purge_rebate(spot_limit, usdc, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            spot_limit.set_purge_rebate(usdc, 1)
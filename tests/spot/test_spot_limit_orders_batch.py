@@ -0,0 +1,65 @@
+import pytest
+import boa
+
+
+def post_limit_order(spot_limit, owner, usdc, weth, amount_in, valid_until=99999999999):
+    usdc.approve(spot_limit, amount_in)
+    spot_limit.post_limit_order(usdc, weth, amount_in, 1 * 10**18, valid_until)
+    count = spot_limit.open_positions_count(owner)
+    return spot_limit.limit_order_uids(owner, count - 1)
+
+
+def test_execute_limit_orders_executes_all_orders(spot_limit, owner, usdc, weth):
+    amount_in = 100 * 10**6
+    uid1 = post_limit_order(spot_limit, owner, usdc, weth, amount_in)
+    uid2 = post_limit_order(spot_limit, owner, usdc, weth, amount_in)
+    # each post_limit_order overwrites the allowance
+    usdc.approve(spot_limit, 2 * amount_in)
+    count = spot_limit.open_positions_count(owner)
+
+    usdc_balance_before = usdc.balanceOf(owner)
+    weth_balance_before = weth.balanceOf(owner)
+
+    path = [usdc.address, weth.address]
+    spot_limit.execute_limit_orders([uid1, uid2], [path, path], [[500], [500]], False)
+
+    assert usdc.balanceOf(owner) == usdc_balance_before - 2 * amount_in
+    assert weth.balanceOf(owner) == weth_balance_before + 2 * 10**18
+    assert spot_limit.open_positions_count(owner) == count - 2
+    assert spot_limit.limit_orders(uid1)[1] == pytest.ZERO_ADDRESS
+
+
+def test_execute_limit_orders_skips_failing_orders(spot_limit, owner, usdc, weth):
+    amount_in = 100 * 10**6
+    uid_expiring = post_limit_order(
+        spot_limit, owner, usdc, weth, amount_in, boa.env.vm.state.timestamp + 60
+    )
+    uid_bad_path = post_limit_order(spot_limit, owner, usdc, weth, amount_in)
+    uid_ok = post_limit_order(spot_limit, owner, usdc, weth, amount_in)
+    boa.env.time_travel(seconds=120)
+    unknown_uid = b"\x01" * 32
+
+    path = [usdc.address, weth.address]
+    spot_limit.execute_limit_orders(
+        [uid_expiring, uid_bad_path, unknown_uid, uid_ok],
+        [path, [weth.address, usdc.address], path, path],
+        [[500], [500], [500], [500]],
+        False,
+    )
+
+    logs = spot_limit.get_logs()
+    failed = [log for log in logs if log.event_type.name == "LimitOrderFailed"]
+    assert [log.args[0] for log in failed] == [uid_expiring, uid_bad_path, unknown_uid]
+    assert [log.args[1] for log in failed] == ["order expired", "invalid path", "unknown order"]
+
+    # failed orders stay open, the valid order is executed
+    assert spot_limit.limit_orders(uid_expiring)[0] == uid_expiring
+    assert spot_limit.limit_orders(uid_bad_path)[0] == uid_bad_path
+    assert spot_limit.limit_orders(uid_ok)[1] == pytest.ZERO_ADDRESS
+
+
+def test_execute_limit_orders_rejects_mismatched_batch(spot_limit, owner, usdc, weth):
+    uid = post_limit_order(spot_limit, owner, usdc, weth, 100 * 10**6)
+
+    with boa.reverts("invalid batch"):
+        spot_limit.execute_limit_orders([uid], [], [[500]], False)
@@ -0,0 +1,98 @@
+import pytest
+import boa
+
+
+def post_limit_order(spot_limit, account, token_in, token_out, amount_in, min_amount_out):
+    with boa.env.prank(account):
+        token_in.approve(spot_limit, amount_in)
+        spot_limit.post_limit_order(token_in, token_out, amount_in, min_amount_out, 99999999999)
+        return spot_limit.get_all_open_positions(account)[-1][0]
+
+
+def test_crossing_orders_are_settled_internally(spot_limit, alice, bob, usdc, weth):
+    uid1 = post_limit_order(spot_limit, alice, usdc, weth, 1000 * 10**6, 5 * 10**17)
+    uid2 = post_limit_order(spot_limit, bob, weth, usdc, 1 * 10**18, 900 * 10**6)
+
+    alice_weth = weth.balanceOf(alice)
+    bob_usdc = usdc.balanceOf(bob)
+    contract_usdc = usdc.balanceOf(spot_limit.address)
+
+    spot_limit.match_limit_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    assert weth.balanceOf(alice) == alice_weth + 5 * 10**17
+    assert usdc.balanceOf(bob) == bob_usdc + 900 * 10**6
+    # the surplus of both sides stays in the contract
+    assert usdc.balanceOf(spot_limit.address) == contract_usdc + 100 * 10**6
+    assert weth.balanceOf(spot_limit.address) == 5 * 10**17
+
+    match = [log for log in spot_limit.get_logs() if log.event_type.name == "LimitOrdersMatched"]
+    assert tuple(match[0].args) == (900 * 10**6, 5 * 10**17, 0)
+    assert spot_limit.limit_orders(uid1)[1] == pytest.ZERO_ADDRESS
+    assert spot_limit.limit_orders(uid2)[1] == pytest.ZERO_ADDRESS
+
+
+def test_only_net_remainder_is_swapped(
+    spot_limit, alice, bob, usdc, weth, mock_uniswap_router
+):
+    uid1 = post_limit_order(spot_limit, alice, usdc, weth, 1000 * 10**6, 8 * 10**17)
+    uid2 = post_limit_order(spot_limit, bob, weth, usdc, 1 * 10**17, 100 * 10**6)
+
+    alice_weth = weth.balanceOf(alice)
+    bob_usdc = usdc.balanceOf(bob)
+    router_usdc = usdc.balanceOf(mock_uniswap_router)
+
+    spot_limit.match_limit_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    assert usdc.balanceOf(mock_uniswap_router) == router_usdc + 900 * 10**6
+    assert weth.balanceOf(alice) == alice_weth + 8 * 10**17
+    assert usdc.balanceOf(bob) == bob_usdc + 100 * 10**6
+
+
+def test_non_crossing_orders_revert(spot_limit, alice, bob, usdc, weth):
+    uid1 = post_limit_order(spot_limit, alice, usdc, weth, 100 * 10**6, 1 * 10**18)
+    uid2 = post_limit_order(spot_limit, bob, weth, usdc, 1 * 10**16, 200 * 10**6)
+
+    with boa.reverts("orders do not cross"):
+        spot_limit.match_limit_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+
+def test_exactly_covered_side_cannot_fund_the_shortfall(spot_limit, alice, bob, usdc, weth):
+    # the usdc of alice covers bob exactly, nothing is left to swap for weth
+    uid1 = post_limit_order(spot_limit, alice, usdc, weth, 100 * 10**6, 1 * 10**18)
+    uid2 = post_limit_order(spot_limit, bob, weth, usdc, 1 * 10**17, 100 * 10**6)
+
+    with boa.reverts("orders do not cross"):
+        spot_limit.match_limit_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+
+def test_net_remainder_must_be_swapped_along_path(spot_limit, alice, bob, usdc, weth):
+    uid1 = post_limit_order(spot_limit, alice, usdc, weth, 1000 * 10**6, 8 * 10**17)
+    uid2 = post_limit_order(spot_limit, bob, weth, usdc, 1 * 10**17, 100 * 10**6)
+
+    with boa.reverts("[path] invalid direction"):
+        spot_limit.match_limit_orders([uid1, uid2], [weth.address, usdc.address], [500], False)
+
+
+def test_matched_orders_get_their_deposits_back(spot_limit, alice, bob, usdc, weth):
+    spot_limit.set_purge_rebate(usdc, 1 * 10**6)
+    with boa.env.prank(alice):
+        usdc.approve(spot_limit, 990 * 10**6 + 1 * 10**6)
+        spot_limit.post_limit_order(usdc, weth, 990 * 10**6, 5 * 10**17, 99999999999)
+    with boa.env.prank(bob):
+        usdc.approve(spot_limit, 1 * 10**6)
+        weth.approve(spot_limit, 1 * 10**18)
+        spot_limit.post_limit_order(weth, usdc, 1 * 10**18, 900 * 10**6, 99999999999)
+    uid1 = spot_limit.get_all_open_positions(alice)[0][0]
+    uid2 = spot_limit.get_all_open_positions(bob)[0][0]
+
+    alice_usdc = usdc.balanceOf(alice)
+    bob_usdc = usdc.balanceOf(bob)
+    contract_usdc = usdc.balanceOf(spot_limit.address)
+
+    spot_limit.match_limit_orders([uid1, uid2], [usdc.address, weth.address], [500], False)
+
+    assert usdc.balanceOf(alice) == alice_usdc - 990 * 10**6 + 1 * 10**6
+    assert usdc.balanceOf(bob) == bob_usdc + 900 * 10**6 + 1 * 10**6
+    # only the surplus of the orders stays in the contract
+    assert usdc.balanceOf(spot_limit.address) == contract_usdc - 2 * 10**6 + 90 * 10**6
+    assert spot_limit.escrowed_purge_deposits(usdc) == 0
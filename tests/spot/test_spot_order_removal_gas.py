@@ -0,0 +1,54 @@
+import pytest
+
+# cancelling an order must cost the same regardless of how
+# many other orders the account has open
+ORDER_COUNTS = [1, 100, 1000]
+MAX_GAS_SPREAD = 1_000
+
+
+def post_orders(spot_limit, usdc, weth, count):
+    amount_in = 1 * 10**6
+    usdc.approve(spot_limit, amount_in * count)
+    for _ in range(count):
+        spot_limit.post_limit_order(usdc, weth, amount_in, 1, 99999999999)
+
+
+def cancel_gas(spot_limit, owner, usdc, weth, count):
+    for uid in spot_limit.eval(f"self.limit_order_uids[{owner}]"):
+        spot_limit.cancel_limit_order(uid)
+
+    post_orders(spot_limit, usdc, weth, count)
+
+    uid = spot_limit.limit_order_uids(owner, 0)
+    spot_limit.cancel_limit_order(uid)
+    return spot_limit._computation.get_gas_used()
+
+
+def test_cancel_limit_order_gas_is_constant(spot_limit, owner, usdc, weth):
+    gas = [cancel_gas(spot_limit, owner, usdc, weth, n) for n in ORDER_COUNTS]
+
+    assert max(gas) - min(gas) < MAX_GAS_SPREAD
+
+
+def post_dca_orders(spot_dca, usdc, weth, count):
+    amount_in = 1 * 10**6
+    usdc.approve(spot_dca, amount_in * count)
+    for _ in range(count):
+        spot_dca.post_dca_order(usdc, weth, amount_in, 60, 1, 50, 300)
+
+
+def cancel_dca_gas(spot_dca, owner, usdc, weth, count):
+    for uid in spot_dca.eval(f"self.dca_order_uids[{owner}]"):
+        spot_dca.cancel_dca_order(uid)
+
+    post_dca_orders(spot_dca, usdc, weth, count)
+
+    uid = spot_dca.dca_order_uids(owner, 0)
+    spot_dca.cancel_dca_order(uid)
+    return spot_dca._computation.get_gas_used()
+
+
+def test_cancel_dca_order_gas_is_constant(spot_dca, owner, usdc, weth):
+    gas = [cancel_dca_gas(spot_dca, owner, usdc, weth, n) for n in ORDER_COUNTS]
+
+    assert max(gas) - min(gas) < MAX_GAS_SPREAD
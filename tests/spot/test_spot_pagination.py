@@ -0,0 +1,40 @@
+import pytest
+import boa
+
+
+def post_limit_order(spot_limit, usdc, weth):
+    amount_in = 1 * 10**6
+    usdc.approve(spot_limit, amount_in)
+    spot_limit.post_limit_order(usdc, weth, amount_in, 1, 99999999999)
+
+
+def test_limit_orders_are_paginated(spot_limit, owner, usdc, weth):
+    count = spot_limit.open_positions_count(owner)
+    for _ in range(3):
+        post_limit_order(spot_limit, usdc, weth)
+
+    assert spot_limit.open_positions_count(owner) == count + 3
+    all_orders = spot_limit.get_all_open_positions(owner)
+
+    assert spot_limit.get_open_positions(owner, count, 2) == all_orders[count : count + 2]
+    assert spot_limit.get_open_positions(owner, count + 2, 2) == all_orders[count + 2 :]
+    assert spot_limit.get_open_positions(owner, count + 3, 2) == []
+
+    uids = spot_limit.get_open_position_uids(owner, 0, count + 3)
+    assert uids == [order[0] for order in all_orders]
+
+
+def test_dca_orders_are_paginated(spot_dca, owner, usdc, weth):
+    count = spot_dca.open_positions_count(owner)
+    usdc.approve(spot_dca, 3 * 10 * 100)
+    for _ in range(3):
+        spot_dca.post_dca_order(usdc, weth, 100, 60, 10, 100, 300)
+
+    assert spot_dca.open_positions_count(owner) == count + 3
+    all_orders = spot_dca.get_all_open_positions(owner)
+
+    assert spot_dca.get_open_positions(owner, count, 2) == all_orders[count : count + 2]
+    assert spot_dca.get_open_positions(owner, count + 3, 2) == []
+
+    uids = spot_dca.get_open_position_uids(owner, count, 3)
+    assert uids == [order[0] for order in all_orders[count:]]
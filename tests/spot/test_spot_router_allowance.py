@@ -0,0 +1,70 @@
+import boa
+
+MAX_UINT256 = 2**256 - 1
+
+
+def post_dca_order(spot_dca, account, usdc, weth, amount_in):
+    with boa.env.prank(account):
+        usdc.approve(spot_dca, amount_in * 10)
+        spot_dca.post_dca_order(usdc, weth, amount_in, 60, 10, 50, 300)
+        return spot_dca.get_all_open_positions(account)[-1][0]
+
+
+def test_standing_allowance_is_not_topped_up_again(
+    spot_dca, alice, usdc, weth, mock_uniswap_router
+):
+    uid = post_dca_order(spot_dca, alice, usdc, weth, 10**6)
+    boa.env.time_travel(seconds=61)
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+
+    boa.env.time_travel(seconds=61)
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+    approvals = [
+        log for log in spot_dca.get_logs() if log.event_type.name == "Approval"
+    ]
+    assert approvals == []
+    assert usdc.allowance(spot_dca, mock_uniswap_router) == MAX_UINT256 - 2 * 10**6
+
+
+def test_revoke_allowance(spot_dca, owner, alice, usdc, weth, mock_uniswap_router):
+    uid = post_dca_order(spot_dca, alice, usdc, weth, 10**6)
+    boa.env.time_travel(seconds=61)
+    spot_dca.execute_dca_order(uid, [usdc.address, weth.address], [500], False)
+    assert usdc.allowance(spot_dca, mock_uniswap_router) == MAX_UINT256 - 10**6
+
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            spot_dca.revoke_allowance(usdc)
+
+    spot_dca.revoke_allowance(usdc)
+    assert usdc.allowance(spot_dca, mock_uniswap_router) == 0
+
+
+def test_limit_orders_revoke_allowance(spot_limit, owner, alice, usdc, mock_uniswap_router):
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            spot_limit.revoke_allowance(usdc)
+
+    spot_limit.revoke_allowance(usdc)
+    assert usdc.allowance(spot_limit, mock_uniswap_router) == 0
+
+
+def test_limit_order_batch_tops_up_the_allowance_once(
+    spot_limit, owner, usdc, weth, mock_uniswap_router
+):
+    spot_limit.revoke_allowance(usdc)
+    usdc.approve(spot_limit, 2 * 10**6)
+    for _ in range(2):
+        spot_limit.post_limit_order(usdc, weth, 10**6, 1, 99999999999)
+    # each post_limit_order overwrites the allowance
+    usdc.approve(spot_limit, 2 * 10**6)
+    uids = [spot_limit.limit_order_uids(owner, i) for i in range(2)]
+
+    path = [usdc.address, weth.address]
+    spot_limit.execute_limit_orders(uids, [path, path], [[500], [500]], False)
+
+    approvals = [
+        log for log in spot_limit.get_logs() if log.event_type.name == "Approval"
+    ]
+    assert len(approvals) == 1
+    assert usdc.allowance(spot_limit, mock_uniswap_router) == MAX_UINT256 - 2 * 10**6
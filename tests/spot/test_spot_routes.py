@@ -0,0 +1,122 @@
+import pytest
+import boa
+
+
+@pytest.fixture(autouse=True)
+def setup(spot_limit, spot_dca, swap_router):
+    spot_limit.set_route_registry(swap_router)
+    spot_dca.set_route_registry(swap_router)
+
+
+def add_route(swap_router, tokens, fees):
+    swap_router.add_route(tokens, fees)
+    return swap_router.route_count()
+
+
+def test_add_route_encodes_path(swap_router, usdc, weth):
+    route_id = add_route(swap_router, [usdc.address, weth.address], [500])
+
+    path = swap_router.route_path(route_id)
+    assert path == bytes.fromhex(usdc.address[2:] + "0001f4" + weth.address[2:])
+    assert swap_router.route_ids(usdc, weth) == route_id
+    assert swap_router.routes(route_id) == (path, [usdc.address, weth.address], [500])
+
+
+def test_add_route_validates_hops(swap_router, usdc, weth, alice):
+    with boa.reverts("[path] invalid fees"):
+        swap_router.add_route([usdc.address, weth.address], [])
+    with boa.reverts("[path] invalid fees"):
+        swap_router.add_route([usdc.address, weth.address], [0])
+    with boa.reverts("[path] invalid hop"):
+        swap_router.add_route([usdc.address, usdc.address], [500])
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            swap_router.add_route([usdc.address, weth.address], [500])
+
+
+def test_execute_limit_order_with_route(spot_limit, swap_router, owner, usdc, weth):
+    route_id = add_route(swap_router, [usdc.address, weth.address], [500])
+    usdc.approve(spot_limit, 100 * 10**6)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    uid = spot_limit.limit_order_uids(owner, 0)
+    weth_before = weth.balanceOf(owner)
+
+    spot_limit.execute_limit_order_with_route(uid, route_id, False)
+
+    assert weth.balanceOf(owner) == weth_before + 1 * 10**18
+    assert spot_limit.open_positions_count(owner) == 0
+
+
+def test_execute_limit_order_with_route_checks_tokens(spot_limit, swap_router, owner, usdc, weth):
+    route_id = add_route(swap_router, [weth.address, usdc.address], [500])
+    usdc.approve(spot_limit, 100 * 10**6)
+    spot_limit.post_limit_order(usdc, weth, 100 * 10**6, 1 * 10**18, 99999999999)
+    uid = spot_limit.limit_order_uids(owner, 0)
+
+    with boa.reverts("[path] invalid token_in"):
+        spot_limit.execute_limit_order_with_route(uid, route_id, False)
+    with boa.reverts("[path] unknown route"):
+        spot_limit.execute_limit_order_with_route(uid, route_id + 1, False)
+
+
+def test_execute_dca_order_with_route(spot_dca, swap_router, owner, usdc, weth):
+    route_id = add_route(swap_router, [usdc.address, weth.address], [500])
+    usdc.approve(spot_dca, 100 * 10**6)
+    spot_dca.post_dca_order(usdc, weth, 10 * 10**6, 60, 10, 50, 300)
+    uid = spot_dca.dca_order_uids(owner, 0)
+    weth_before = weth.balanceOf(owner)
+    boa.env.time_travel(seconds=61)
+
+    spot_dca.execute_dca_order_with_route(uid, route_id, False)
+
+    assert weth.balanceOf(owner) > weth_before
+    assert spot_dca.dca_orders(uid)[9] == 1
+
+
+def encode_path(tokens, fees):
+    path = bytes.fromhex(tokens[0][2:])
+    for fee, token in zip(fees, tokens[1:]):
+        path += fee.to_bytes(3, "big") + bytes.fromhex(token[2:])
+    return path
+
+
+def test_add_path_registers_both_directions(swap_router, usdc, weth, wbtc):
+    forward = [wbtc.address, weth.address, usdc.address]
+    reverse = forward[::-1]
+    swap_router.add_path(wbtc, usdc, encode_path(forward, [3000, 500]), encode_path(reverse, [500, 3000]))
+
+    assert swap_router.paths(wbtc, usdc) == encode_path(forward, [3000, 500])
+    assert swap_router.paths(usdc, wbtc) == encode_path(reverse, [500, 3000])
+    route_id = swap_router.route_ids(usdc, wbtc)
+    assert swap_router.routes(route_id)[1:] == (reverse, [500, 3000])
+
+
+def test_add_path_validates_the_paths(swap_router, usdc, weth, wbtc, alice):
+    path = encode_path([wbtc.address, usdc.address], [3000])
+    with boa.reverts("[path] invalid token_in"):
+        swap_router.add_path(usdc, wbtc, path, path)
+    with boa.reverts("[path] invlid path"):
+        swap_router.add_path(wbtc, usdc, path[:-1], path)
+    with boa.reverts("[path] invalid fees"):
+        swap_router.add_path(wbtc, usdc, encode_path([wbtc.address, usdc.address], [0]), path)
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            swap_router.add_path(wbtc, usdc, path, path)
+
+
+def test_reverse_swap_needs_a_route_of_its_own(
+    swap_router, owner, usdc, weth, wbtc, mock_uniswap_router
+):
+    usdc.approve(swap_router, 2**256 - 1)
+    wbtc.approve(swap_router, 2**256 - 1)
+    swap_router.add_route([wbtc.address, weth.address, usdc.address], [3000, 500])
+
+    assert swap_router.swap(wbtc, usdc, 10**8, 30_000 * 10**6) == 30_000 * 10**6
+    with boa.reverts("no path configured"):
+        swap_router.swap(usdc, wbtc, 30_000 * 10**6, 10**8)
+
+    forward = [wbtc.address, weth.address, usdc.address]
+    swap_router.add_path(
+        wbtc, usdc, encode_path(forward, [3000, 500]), encode_path(forward[::-1], [500, 3000])
+    )
+    assert swap_router.swap(usdc, wbtc, 30_000 * 10**6, 10**8) == 10**8
@@ -0,0 +1,88 @@
+import copyreg
+import pickle
+
+import pytest
+import boa
+from vyper.semantics.namespace import Namespace
+from margin_dex import compiler_cache
+
+SOURCE = """
+value: public(uint256)
+
+@external
+def set_value(_value: uint256):
+    assert _value != 0, "zero value"
+    self.value = _value
+"""
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    previous = compiler_cache._cache_dir
+    compiler_cache.set_cache_dir(tmp_path)
+    yield tmp_path
+    compiler_cache.set_cache_dir(previous)
+
+
+def test_deploys_from_cached_artifacts(cache_dir):
+    first = boa.loads(SOURCE)
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+
+    data = compiler_cache.compiler_data(SOURCE, "VyperContract")
+    # served from the cache, no IR was generated
+    assert "_ir_output" not in data.__dict__
+    assert data.bytecode_runtime == first.compiler_data.bytecode_runtime
+
+    contract = boa.loads(SOURCE)
+    contract.set_value(42)
+    assert contract.value() == 42
+    with boa.reverts("zero value"):
+        contract.set_value(0)
+
+
+def test_changed_source_is_compiled_again(cache_dir):
+    first = boa.loads(SOURCE)
+    changed = boa.loads(SOURCE.replace('"zero value"', '"value is zero"'))
+
+    artifacts = [pickle.loads(path.read_bytes()) for path in cache_dir.glob("*.pickle")]
+    assert len(artifacts) == 2
+    assert artifacts[0]["bytecode_runtime"] != artifacts[1]["bytecode_runtime"]
+    assert {artifact["bytecode_runtime"] for artifact in artifacts} == {
+        first.compiler_data.bytecode_runtime,
+        changed.compiler_data.bytecode_runtime,
+    }
+
+
+def test_interface_file_imports_are_not_cached(cache_dir):
+    source = "from vyper.interfaces import ERC20\n" + SOURCE
+    boa.loads(source)
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+
+    assert compiler_cache._imports_interface_files("import interfaces.Vault as Vault\n")
+    assert not compiler_cache._imports_interface_files(source)
+
+
+def test_unreadable_entries_are_compiled_again(cache_dir):
+    boa.loads(SOURCE)
+    (path,) = cache_dir.glob("*.pickle")
+    # unpickling fails with AttributeError, not UnpicklingError
+    path.write_bytes(b"cmargin_dex.compiler_cache\n_missing\n.")
+
+    contract = boa.loads(SOURCE)
+    contract.set_value(42)
+    assert contract.value() == 42
+    assert pickle.loads(path.read_bytes())["bytecode_runtime"] == (
+        contract.compiler_data.bytecode_runtime
+    )
+
+
+def test_boa_version_is_part_of_the_key(cache_dir, monkeypatch):
+    data = compiler_cache.compiler_data(SOURCE, "VyperContract")
+    key = compiler_cache.cache_key(data)
+
+    monkeypatch.setattr(compiler_cache, "_BOA_VERSION", "0.0.0")
+    assert compiler_cache.cache_key(data) != key
+
+
+def test_namespace_pickling_is_not_registered_globally():
+    assert Namespace not in copyreg.dispatch_table
@@ -0,0 +1,177 @@
+import pytest
+import boa
+
+from margin_dex.indexer import SECONDS_PER_DAY, BoaLogRecorder, Indexer
+
+TRADE_OPEN_FEE = 100  # 1%
+
+
+@pytest.fixture(autouse=True)
+def setup(funded_vault, owner, weth, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+    weth.approve(funded_vault, 2**256 - 1)
+    funded_vault.provide_liquidity(weth, 100 * 10**18, False)
+    funded_vault.fund_account(weth, 10**18)
+
+
+@pytest.fixture
+def recorder():
+    return BoaLogRecorder()
+
+
+@pytest.fixture
+def contracts(vault, dex, spot_limit, spot_dca):
+    return {
+        "Vault": vault.address,
+        "MarginDex": dex.address,
+        "LimitOrders": spot_limit.address,
+        "Dca": spot_dca.address,
+    }
+
+
+@pytest.fixture
+def indexer(tmp_path, contracts, recorder):
+    return Indexer(tmp_path / "index.db", contracts, recorder.debt_before)
+
+
+def quote(vault, token_in, token_out, amount):
+    usd_value = vault.to_usd_oracle_price(token_in) * amount // 10 ** vault.token_decimals(token_in)
+    return 10 ** vault.token_decimals(token_out) * usd_value // vault.to_usd_oracle_price(token_out)
+
+
+def open_trade(recorder, dex, vault, owner, debt_token, position_token, margin, leverage):
+    debt = margin * (leverage - 1)
+    amount = quote(vault, debt_token, position_token, margin + debt)
+    trade = dex.open_trade(owner, position_token, amount, debt_token, debt, margin, [], [])
+    recorder.record(dex.get_logs())
+    return trade[0]
+
+
+def close_trade(recorder, dex, vault, uid):
+    _, _, debt_token, _, _, position_token, position_amount = vault.positions(uid)
+    recorder.read_debts(vault, [uid])
+    dex.close_trade(uid, quote(vault, position_token, debt_token, position_amount))
+    recorder.record(dex.get_logs())
+
+
+def test_events_are_stored_in_typed_tables(indexer, recorder, dex, vault, owner, usdc, weth):
+    uid = open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, 10)
+    assert indexer.sync(recorder) == len(recorder.entries)
+
+    row = indexer.db.execute(
+        "SELECT account, position_uid, position_debt_shares, position_position_amount"
+        " FROM Vault_PositionOpened"
+    ).fetchone()
+    position = vault.positions(uid)
+    assert row == (owner, uid, str(position[4]), str(position[6]))
+
+    # indexed arguments are indexed in the table too
+    indexes = {
+        name
+        for (name,) in indexer.db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    }
+    assert "Vault_PositionOpened_account" in indexes
+    assert "MarginDex_TradeOpened_account" in indexes
+
+    (tp_orders,) = indexer.db.execute("SELECT trade_tp_orders FROM MarginDex_TradeOpened").fetchone()
+    assert tp_orders == "[]"
+
+
+def test_sync_resumes_from_the_saved_cursor(
+    tmp_path, contracts, indexer, recorder, dex, vault, owner, usdc, weth
+):
+    first = open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, 10)
+    indexed = indexer.sync(recorder)
+    assert indexer.sync(recorder) == 0
+
+    boa.env.time_travel(seconds=60)
+    close_trade(recorder, dex, vault, first)
+    open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, 5)
+
+    restarted = Indexer(tmp_path / "index.db", contracts)
+    assert restarted.cursor() == indexer.cursor()
+    assert restarted.sync(recorder) == len(recorder.entries) - indexed
+    assert restarted.cursor() == tuple(recorder.entries[-1][:2])
+
+    (opened,) = restarted.db.execute("SELECT COUNT(*) FROM Vault_PositionOpened").fetchone()
+    (closed,) = restarted.db.execute("SELECT COUNT(*) FROM Vault_PositionClosed").fetchone()
+    assert (opened, closed) == (2, 1)
+
+
+def test_open_interest_per_market(indexer, recorder, dex, vault, owner, usdc, weth):
+    longs = [open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, lev) for lev in (3, 5, 10)]
+    shorts = [open_trade(recorder, dex, vault, owner, weth, usdc, 10**16, lev) for lev in (4, 8)]
+    indexer.sync(recorder)
+
+    dex.partial_close_trade(longs[0], vault.positions(longs[0])[6] // 3, 0)
+    recorder.record(dex.get_logs())
+    close_trade(recorder, dex, vault, longs[1])
+    close_trade(recorder, dex, vault, shorts[0])
+    indexer.sync(recorder)
+
+    expected = {}
+    for debt_token, position_token in ((usdc, weth), (weth, usdc)):
+        count = vault.open_positions_count(debt_token, position_token)
+        uids = vault.get_open_positions(debt_token, position_token, 0, count)
+        expected[(debt_token.address, position_token.address)] = sum(
+            vault.positions(uid)[6] for uid in uids
+        )
+    assert indexer.open_interest() == expected
+
+
+def test_fees_per_token_per_day(indexer, recorder, dex, vault, owner, usdc, weth):
+    vault.set_fee_configuration(TRADE_OPEN_FEE, 0, 0, 50_00)
+    day = boa.env.vm.state.timestamp // SECONDS_PER_DAY
+
+    open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, 10)
+    open_trade(recorder, dex, vault, owner, usdc, weth, 20 * 10**6, 5)
+    indexer.sync(recorder)
+
+    boa.env.time_travel(seconds=SECONDS_PER_DAY)
+    open_trade(recorder, dex, vault, owner, usdc, weth, 30 * 10**6, 3)
+    open_trade(recorder, dex, vault, owner, weth, usdc, 10**16, 10)
+    indexer.sync(recorder)
+
+    fee = lambda volume: volume * TRADE_OPEN_FEE // 100_00
+    assert indexer.fees_per_day(usdc.address) == {
+        day: fee(100 * 10**6) + fee(100 * 10**6),
+        day + 1: fee(90 * 10**6),
+    }
+    assert indexer.fees_per_day(weth.address) == {day + 1: fee(10**17)}
+
+
+def test_realized_pnl_per_account(
+    indexer, recorder, dex, vault, owner, usdc, weth, eth_usd_oracle
+):
+    margin_before = vault.margin(owner, usdc)
+
+    profit = open_trade(recorder, dex, vault, owner, usdc, weth, 10 * 10**6, 10)
+    loss = open_trade(recorder, dex, vault, owner, usdc, weth, 20 * 10**6, 5)
+    dex.add_margin(loss, 5 * 10**6)
+    recorder.record(dex.get_logs())
+    boa.env.time_travel(seconds=30 * SECONDS_PER_DAY)
+
+    eth_usd_oracle.set_answer(1300_0000_0000)
+    dex.partial_close_trade(profit, vault.positions(profit)[6] // 4, 0)
+    recorder.record(dex.get_logs())
+    close_trade(recorder, dex, vault, profit)
+    eth_usd_oracle.set_answer(1200_0000_0000)
+    close_trade(recorder, dex, vault, loss)
+    indexer.sync(recorder)
+
+    assert indexer.pnl(owner) == {usdc.address: vault.margin(owner, usdc) - margin_before}
+    assert indexer.pnl(owner)[usdc.address] != 0
+
+
+def test_spot_dex_events_are_indexed(indexer, recorder, spot_dca, alice, usdc, weth):
+    with boa.env.prank(alice):
+        usdc.approve(spot_dca, 100 * 10**6)
+        spot_dca.post_dca_order(usdc, weth, 10 * 10**6, 60, 10, 50, 300)
+    recorder.record(spot_dca.get_logs())
+    indexer.sync(recorder)
+
+    row = indexer.db.execute(
+        "SELECT account, token_in, amount_in_per_execution, max_number_of_executions"
+        " FROM Dca_DcaOrderPosted"
+    ).fetchone()
+    assert row == (alice, usdc.address, str(10 * 10**6), 10)
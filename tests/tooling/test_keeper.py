@@ -0,0 +1,176 @@
+import os
+import random
+import time
+
+import pytest
+import boa
+
+from margin_dex.keeper import (
+    CUTOFF_TOLERANCE,
+    LiquidationKeeper,
+    Position,
+    liquidation_cutoff,
+    liquidation_key,
+)
+
+# synthetic open positions in the throughput benchmark
+BENCHMARK_POSITIONS = int(os.environ.get("KEEPER_BENCHMARK_POSITIONS", "10000"))
+BENCHMARK_PRICE_UPDATES = 200
+
+
+@pytest.fixture(autouse=True)
+def setup(funded_vault, owner, weth, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+    weth.approve(funded_vault, 2**256 - 1)
+    funded_vault.provide_liquidity(weth, 100 * 10**18, False)
+    funded_vault.fund_account(weth, 10**18)
+
+
+@pytest.fixture
+def keeper(vault, dex):
+    return LiquidationKeeper(vault, dex)
+
+
+def quote(vault, token_in, token_out, amount):
+    usd_value = vault.to_usd_oracle_price(token_in) * amount // 10 ** token_in.decimals()
+    return 10 ** token_out.decimals() * usd_value // vault.to_usd_oracle_price(token_out)
+
+
+def open_trade(keeper, owner, debt_token, position_token, margin, leverage):
+    debt = margin * (leverage - 1)
+    amount = quote(keeper.vault, debt_token, position_token, margin + debt)
+    trade = keeper.dex.open_trade(owner, position_token, amount, debt_token, debt, margin, [], [])
+    keeper.apply_logs(keeper.dex.get_logs())
+    return trade[0]
+
+
+def liquidatable(vault, uids):
+    return {uid for uid in uids if vault.is_liquidatable(uid)}
+
+
+def test_keeper_follows_position_events(keeper, vault, dex, owner, usdc, weth):
+    first = open_trade(keeper, owner, usdc, weth, 10 * 10**6, 10)
+    second = open_trade(keeper, owner, usdc, weth, 10 * 10**6, 20)
+    assert set(keeper.positions) == {first, second}
+
+    dex.partial_close_trade(first, vault.positions(first)[6] // 2, 0)
+    keeper.apply_logs(dex.get_logs())
+    assert keeper.positions[first] == Position(*vault.positions(first))
+    assert keeper.markets[(usdc.address, weth.address)].keys[first] == liquidation_key(
+        keeper.positions[first]
+    )
+
+    dex.add_margin(second, 10**6)
+    keeper.apply_logs(dex.get_logs())
+    dex.close_trade(second, quote(vault, weth, usdc, vault.positions(second)[6]))
+    keeper.apply_logs(dex.get_logs())
+    assert set(keeper.positions) == {first}
+    assert set(keeper.markets[(usdc.address, weth.address)].keys) == {first}
+
+
+def test_keeper_liquidates_crossed_positions_on_price_moves(
+    keeper, vault, owner, usdc, weth, eth_usd_oracle
+):
+    longs = [open_trade(keeper, owner, usdc, weth, 10 * 10**6, lev) for lev in range(5, 50, 4)]
+    shorts = [
+        open_trade(keeper, owner, weth, usdc, 10**16, lev) for lev in range(5, 50, 4)
+    ]
+
+    for answer in [1200, 1150, 1100, 1300, 1250, 1000, 1400, 1600]:
+        eth_usd_oracle.set_answer(answer * 10**8)
+        expected = liquidatable(vault, keeper.positions)
+
+        assert set(keeper.on_oracle_update()) == expected
+        assert liquidatable(vault, keeper.positions) == set()
+
+    assert set(keeper.positions) == set()
+    for uid in longs + shorts:
+        assert vault.positions(uid)[1] == pytest.ZERO_ADDRESS
+
+
+def test_keeper_liquidates_positions_crossed_by_interest(keeper, vault, owner, usdc, weth):
+    safe = open_trade(keeper, owner, usdc, weth, 100 * 10**6, 5)
+    risky = open_trade(keeper, owner, usdc, weth, 10 * 10**6, 49)
+    assert keeper.on_oracle_update() == []
+
+    boa.env.time_travel(seconds=365 * 24 * 60 * 60)
+    assert liquidatable(vault, [safe, risky]) == {risky}
+    assert keeper.on_oracle_update() == [risky]
+    assert set(keeper.positions) == {safe}
+
+
+def test_keeper_loads_open_positions(keeper, vault, dex, owner, usdc, weth):
+    uids = [open_trade(keeper, owner, usdc, weth, 10 * 10**6, lev) for lev in (5, 10, 40)]
+
+    restarted = LiquidationKeeper(vault, dex)
+    restarted.load_market(usdc, weth)
+    assert restarted.positions == keeper.positions
+    assert set(restarted.positions) == set(uids)
+
+
+def test_keeper_throughput_with_10k_positions(keeper, vault, owner, usdc, weth):
+    """
+    Heap maintenance and crossing detection for BENCHMARK_POSITIONS open
+    positions against a brute force scan, and the time polling
+    is_liquidatable on all of them would take, extrapolated from a sample.
+    """
+    rng = random.Random(1234)
+    market = (usdc.address, weth.address)
+    max_leverage = vault.max_leverage(usdc, weth)
+    # debt shares are minted at 10**18 per wei before interest
+    amount_per_debt_share = 10**18
+
+    positions = []
+    for i in range(BENCHMARK_POSITIONS):
+        position_amount = rng.randrange(10**16, 10**20)
+        leverage = rng.uniform(2, max_leverage)
+        value = position_amount * 1234 // 10**12  # in USDC
+        debt_shares = int(value * (1 - 1 / leverage)) * 10**18
+        uid = i.to_bytes(32, "big")
+        positions.append(
+            Position(uid, owner, usdc.address, 0, debt_shares, weth.address, position_amount)
+        )
+
+    start = time.perf_counter()
+    for position in positions:
+        keeper.on_position(position)
+    ingest = time.perf_counter() - start
+
+    heap = keeper.markets[market]
+    open_keys = dict(heap.keys)
+    price = 1234.0
+    heap_time = scan_time = 0
+    popped = 0
+    for _ in range(BENCHMARK_PRICE_UPDATES):
+        price *= rng.uniform(0.998, 1.002)
+        cutoff = liquidation_cutoff(
+            max_leverage, int(price * 10**8), 10**8, 10**18, 10**6, amount_per_debt_share
+        )
+
+        start = time.perf_counter()
+        crossed = heap.pop_crossed(cutoff)
+        heap_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        threshold = cutoff * (1 - CUTOFF_TOLERANCE)
+        expected = {uid for uid, key in open_keys.items() if key >= threshold}
+        scan_time += time.perf_counter() - start
+
+        assert set(crossed) == expected
+        for uid in crossed:
+            del open_keys[uid]
+        popped += len(crossed)
+
+    sample = [open_trade(keeper, owner, usdc, weth, 10 * 10**6, 10)] * 50
+    start = time.perf_counter()
+    liquidatable(vault, sample)
+    polling = (time.perf_counter() - start) / len(sample) * BENCHMARK_POSITIONS
+
+    print(
+        f"\n{BENCHMARK_POSITIONS} positions: ingest {ingest * 1000:.1f}ms, "
+        f"{BENCHMARK_PRICE_UPDATES} price updates liquidating {popped}: "
+        f"heap {heap_time * 1000:.1f}ms, brute force scan {scan_time * 1000:.1f}ms, "
+        f"polling is_liquidatable ~{polling * BENCHMARK_PRICE_UPDATES:.0f}s"
+    )
+    assert 0 < popped < BENCHMARK_POSITIONS
+    assert heap_time < scan_time
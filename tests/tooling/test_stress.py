@@ -0,0 +1,182 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from margin_dex.stress import SECONDS_PER_YEAR, Market, Pool, PositionBook, PriceModel, simulate
+
+# position-paths in the throughput benchmark
+BENCHMARK_POSITION_PATHS = int(os.environ.get("STRESS_BENCHMARK_POSITION_PATHS", "1000000"))
+LIQUIDATION_PENALTY = 1_00  # 1%
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+def random_book(rng, n_markets, n_positions, prices, max_leverage):
+    """Positions with leverages up to max_leverage, prices of the markets' rates."""
+    market = rng.integers(0, n_markets, n_positions)
+    leverage = rng.uniform(1.5, max_leverage, n_positions)
+    position_amount = rng.uniform(0.1, 10, n_positions)
+    debt_amount = position_amount * np.asarray(prices)[market] * (1 - 1 / leverage)
+    return PositionBook(market, position_amount, debt_amount)
+
+
+def test_liquidations_match_the_vault(funded_vault, owner, usdc, weth, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+    funded_vault.set_fee_configuration(0, LIQUIDATION_PENALTY, 0, 50_00)
+    funded_vault.set_liquidate_slippage_for_market(weth, usdc, 1_00)
+    uids = []
+    for leverage in range(3, 50, 3):
+        debt = 2 * 10**6 * (leverage - 1)
+        amount = (2 * 10**6 + debt) * 10**20 // 1234_0000_0000
+        uid, _ = funded_vault.open_position(owner, weth, amount, usdc, debt, 2 * 10**6)
+        uids.append(uid)
+
+    # the mock router returns exactly min_amount_out, the quote less liquidate_slippage
+    market = Market.from_vault(funded_vault, usdc, weth, swap_fee=0.01)
+    pool = Pool.from_vault(funded_vault, usdc)
+    book = PositionBook.from_vault(funded_vault, [market])
+    assert len(book) == len(uids)
+
+    # the price drops and the positions are liquidated in the next block
+    paths = np.array([[1234.0, 1.0], [1170.0, 1.0]])[:, :, None]
+    horizon = 12 / SECONDS_PER_YEAR
+    result = simulate(
+        book, [market], [pool], [weth.address, usdc.address], paths, horizon, LIQUIDATION_PENALTY
+    )
+
+    eth_usd_oracle.set_answer(1170_0000_0000)
+    liquidated = [uid for uid in uids if funded_vault.is_liquidatable(uid)]
+    margin_before = funded_vault.margin(owner, usdc)
+    for uid in liquidated:
+        funded_vault.liquidate(uid)
+
+    assert 0 < result.liquidations[0, 0] == len(liquidated) < len(uids)
+    bad_debt = funded_vault.bad_debt(usdc) / 10**6
+    assert bad_debt > 0
+    assert result.bad_debt[0, 0] == pytest.approx(bad_debt, rel=1e-6)
+    # the owner is credited what is left after the debt and the penalty
+    leverage = market.max_leverage
+    received = book.position_amount * 1170 * 0.99
+    crossed = (leverage + 1) * book.debt_amount >= leverage * book.position_amount * 1170
+    remaining = np.maximum(received - book.debt_amount, 0)[crossed].sum()
+    assert result.penalties[0, 0] > 0
+    assert (funded_vault.margin(owner, usdc) - margin_before) / 10**6 == pytest.approx(
+        remaining - result.penalties[0, 0], rel=1e-6, abs=1e-6
+    )
+    assert result.open_bad_debt[0, 0] == 0
+
+
+def test_price_paths_have_the_configured_moments(rng):
+    volatility = np.array([0.8, 0.6, 0.0])
+    correlation = np.array([[1, 0.7, 0], [0.7, 1, 0], [0, 0, 1]])
+    model = PriceModel(["weth", "wbtc", "usdc"], [1234, 30_000, 1], volatility, correlation)
+
+    paths = model.paths(rng, 100_000, 1 / 12, 30)
+    assert paths.shape == (31, 3, 100_000)
+    assert (paths[:, 2] == 1).all()
+
+    log_returns = np.log(paths[-1] / paths[0])
+    assert log_returns[:2].std(axis=1) == pytest.approx(volatility[:2] * np.sqrt(1 / 12), rel=0.02)
+    assert np.corrcoef(log_returns[:2])[0, 1] == pytest.approx(0.7, abs=0.01)
+    # martingales, with and without jumps
+    assert paths[-1, :2].mean(axis=1) == pytest.approx([1234, 30_000], rel=0.01)
+    jumps = PriceModel(
+        ["weth"], [1234], [0.5], jump_intensity=12, jump_mean=[-0.1], jump_std=[0.05]
+    ).paths(rng, 100_000, 1 / 12, 30)
+    assert jumps[-1].mean() == pytest.approx(1234, rel=0.01)
+
+
+def test_jumps_and_thin_liquidity_create_bad_debt(rng):
+    tokens = ["weth", "usdc"]
+    book = random_book(rng, 1, 2_000, [1234], 50)
+    pools = [Pool("usdc", safety_module_amount=10_000)]
+
+    def run(liquidity, **jumps):
+        model = PriceModel(tokens, [1234, 1], [0.8, 0], **jumps)
+        paths = model.paths(np.random.default_rng(1), 1_000, 7 / 365, 7 * 24)
+        markets = [Market("usdc", "weth", 50, 1_00, liquidity=liquidity)]
+        return simulate(book, markets, pools, tokens, paths, 7 / 365, LIQUIDATION_PENALTY)
+
+    diffusion = run(np.inf)
+    crashes = run(np.inf, jump_intensity=50, jump_mean=[-0.05], jump_std=[0.03])
+    thin = run(10_000)
+
+    # without jumps prices move little per step and liquidations are clean
+    assert diffusion.bad_debt.mean() < crashes.bad_debt.mean()
+    assert diffusion.failed_liquidations.sum() == crashes.failed_liquidations.sum() == 0
+
+    # large positions move a thin pool more than liquidate_slippage and get stuck
+    assert thin.failed_liquidations.sum() > 0
+    assert thin.open_bad_debt.mean() > diffusion.open_bad_debt.mean()
+    assert thin.liquidations.mean() < diffusion.liquidations.mean()
+
+
+def test_bad_debt_drains_the_safety_module_before_the_base_lps(rng):
+    tokens = ["weth", "usdc"]
+    book = PositionBook(np.array([0, 0]), np.array([1.0, 2.0]), np.array([1000.0, 1700.0]))
+    markets = [Market("usdc", "weth", 10, 1_00)]
+    pools = [
+        Pool("usdc", safety_module_amount=100, bad_debt=50, acceptable_amount_of_bad_debt=150)
+    ]
+    # liquidatable below 1100 and 935, both gap through into bad debt
+    paths = np.array([[1234, 1], [1150, 1], [950, 1], [800, 1]], dtype=float)[:, :, None]
+
+    result = simulate(book, markets, pools, tokens, paths, 1 / 365, LIQUIDATION_PENALTY)
+    first = 1000 - 950
+    second = 1700 - 2 * 800
+    assert result.liquidations[0, 0] == 2
+    assert result.bad_debt[0, 0] == pytest.approx(first + second)
+    assert result.penalties[0, 0] == 0
+    assert result.safety_module_drawdown[0, 0] == 1
+    assert result.base_lp_loss[0, 0] == pytest.approx(first + second - 100)
+    assert result.defensive_step[0, 0] == 3
+
+    summary = result.summary()
+    assert summary["markets"][("usdc", "weth")]["probability_of_bad_debt"] == 1
+    assert summary["pools"]["usdc"]["probability_of_wipeout"] == 1
+
+
+def test_throughput_with_1m_position_paths(rng):
+    tokens = ["weth", "wbtc", "usdc"]
+    model = PriceModel(
+        tokens,
+        [1234, 30_000, 1],
+        [0.8, 0.6, 0.0],
+        np.array([[1, 0.7, 0], [0.7, 1, 0], [0, 0, 1]]),
+        jump_intensity=20,
+        jump_mean=[-0.08, -0.06, 0],
+        jump_std=[0.04, 0.03, 0],
+    )
+    markets = [
+        Market("usdc", "weth", 50, 1_00, liquidity=5_000_000),
+        Market("usdc", "wbtc", 50, 1_00, liquidity=5_000_000),
+        Market("weth", "usdc", 50, 1_00, liquidity=5_000_000),
+    ]
+    pools = [Pool("usdc", 100_000), Pool("weth", 50)]
+    book = random_book(rng, 3, 1_000, [1234, 30_000, 1 / 1234], 50)
+    n_paths = BENCHMARK_POSITION_PATHS // len(book)
+    n_steps = 24
+
+    start = time.perf_counter()
+    paths = model.paths(rng, n_paths, 1 / 365, n_steps)
+    generated = time.perf_counter() - start
+    result = simulate(book, markets, pools, tokens, paths, 1 / 365, LIQUIDATION_PENALTY)
+    simulated = time.perf_counter() - start - generated
+
+    summary = result.summary()
+    print(
+        f"\n{len(book) * n_paths} position-paths, {n_steps} steps: "
+        f"paths {generated:.2f}s, liquidations {simulated:.2f}s, "
+        f"P(bad debt) per market "
+        + ", ".join(
+            f"{'/'.join(market)} {stats['probability_of_bad_debt']:.2f}"
+            for market, stats in summary["markets"].items()
+        )
+    )
+    assert result.bad_debt.shape == (3, n_paths)
+    assert result.liquidations.sum() > 0
@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+import pytest
+import boa
+
+from margin_dex import differential
+from margin_dex import vault_model as model
+from margin_dex.vault_model import Uint256
+
+# states evaluated by the model and sampled against the Vault per function,
+# raise DIFFERENTIAL_SAMPLES for a longer run
+STATES = 10_000
+SAMPLES = int(os.environ.get("DIFFERENTIAL_SAMPLES", "25"))
+
+
+def uint256(*values):
+    return Uint256(np.array(values, dtype=object))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+@pytest.fixture
+def token():
+    return boa.env.generate_address("reference token")
+
+
+@pytest.fixture
+def states(rng):
+    return differential.random_states(rng, STATES)
+
+
+def test_checked_arithmetic_reverts_like_the_evm():
+    result = uint256(1, 2**255, 7, 3) * 2 // uint256(1, 1, 0, 2) - 3
+    assert list(result.reverted) == [True, True, True, False]
+    assert result.values[3] == 0
+
+    # only the reverts of the taken branch count
+    chosen = model.select(np.array([True, False]), uint256(1, 2) - 2, uint256(3, 4))
+    assert list(chosen.values) == [0, 4]
+    assert list(chosen.reverted) == [True, False]
+
+
+def test_interest_rate_matches_hand_picked_values():
+    curve = model.pack_interest_curve(
+        uint256(3_00_000), uint256(20_00_000), uint256(100_00_000), uint256(80_00_000)
+    )
+    utilization = uint256(0, 40_00_000, 80_00_000)
+    rates = model.interest_rate(
+        Uint256(np.repeat(curve.values, 3)), utilization
+    )
+    assert list(rates.values) == [3_00_000, 11_50_000, 20_00_000]
+
+
+def test_debt_shares_round_trip_rounds_down(states):
+    amount = Uint256(np.full(len(states), 10**6, dtype=object))
+    shares = model.amount_to_debt_shares(states, amount)
+    amount_back = model.debt_shares_to_amount(states, shares)
+
+    ok = ~shares.reverted & ~amount_back.reverted
+    assert ok.any()
+    assert (amount_back.values[ok] <= amount.values[ok]).all()
+
+
+def test_differential_utilization_rate(vault, token, states, rng):
+    assert (
+        differential.differential(
+            vault, token, model.utilization_rate, states, sample=SAMPLES, rng=rng
+        )
+        == []
+    )
+
+
+def test_differential_interest_rate_by_utilization(vault, token, states, rng):
+    utilization = differential.random_uint256(rng, STATES, max_bits=48)
+    assert (
+        differential.differential(
+            vault,
+            token,
+            model.interest_rate_by_utilization,
+            states,
+            utilization,
+            sample=SAMPLES,
+            rng=rng,
+        )
+        == []
+    )
+
+
+def test_differential_debt_interest_since_last_update(vault, token, states, rng):
+    assert (
+        differential.differential(
+            vault,
+            token,
+            model.debt_interest_since_last_update,
+            states,
+            sample=SAMPLES,
+            rng=rng,
+        )
+        == []
+    )
+
+
+def test_differential_amount_to_debt_shares(vault, token, states, rng):
+    amount = differential.random_uint256(rng, STATES, max_bits=128)
+    assert (
+        differential.differential(
+            vault,
+            token,
+            model.amount_to_debt_shares,
+            states,
+            amount,
+            sample=SAMPLES,
+            rng=rng,
+        )
+        == []
+    )
+
+
+def test_differential_amount_to_lp_shares(vault, token, states, rng):
+    amount = differential.random_uint256(rng, STATES, max_bits=128)
+    is_safety_module = rng.random(STATES) < 0.5
+    assert (
+        differential.differential(
+            vault,
+            token,
+            model.amount_to_lp_shares,
+            states,
+            amount,
+            is_safety_module,
+            sample=SAMPLES,
+            rng=rng,
+        )
+        == []
+    )
+
+
+def test_differential_lp_shares_to_amount(vault, token, states, rng):
+    shares = differential.random_uint256(rng, STATES, max_bits=160)
+    is_safety_module = rng.random(STATES) < 0.5
+    assert (
+        differential.differential(
+            vault,
+            token,
+            model.lp_shares_to_amount,
+            states,
+            shares,
+            is_safety_module,
+            sample=SAMPLES,
+            rng=rng,
+        )
+        == []
+    )
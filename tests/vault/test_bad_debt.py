@@ -1,13 +1,9 @@
 import pytest
 
 
-@pytest.fixture(scope="session")
-def setup(vault, mock_router, owner, weth, usdc):
-    vault.set_swap_router(mock_router.address)
-    vault.set_is_whitelisted_dex(owner, True)
-    usdc.approve(vault.address, 999999999999999999)
-    vault.fund_account(usdc, 1000000000)
-    vault.provide_liquidity(usdc, 1000000000000, False)
+@pytest.fixture(autouse=True)
+def setup(funded_vault):
+    return funded_vault
 
 
 def open_position(vault, owner, weth, usdc):
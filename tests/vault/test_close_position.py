@@ -2,13 +2,9 @@ import pytest
 import boa
 
 
-@pytest.fixture(scope="session")
-def setup(vault, mock_router, owner, weth, usdc):
-    vault.set_swap_router(mock_router.address)
-    vault.set_is_whitelisted_dex(owner, True)
-    usdc.approve(vault.address, 999999999999999999)
-    vault.fund_account(usdc, 1000000000)
-    vault.provide_liquidity(usdc, 1000000000000, False)
+@pytest.fixture(autouse=True)
+def setup(funded_vault):
+    return funded_vault
 
 
 def open_position(vault, owner, weth, usdc):
@@ -138,6 +134,35 @@ def test_reduce_position_partially_reduces_debt(vault, usdc, weth, owner):
     assert debt_shares_after_reduce == expected_debt_shares
 
 
+def test_close_position_burns_all_debt_shares_of_the_position(vault, weth, usdc, owner):
+    first_uid, _ = open_position(vault, owner, weth, usdc)
+    boa.env.time_travel(seconds=7 * 24 * 60 * 60)
+    second_uid, _ = open_position(vault, owner, weth, usdc)
+    boa.env.time_travel(seconds=7 * 24 * 60 * 60)
+
+    vault.close_position(first_uid, 2000 * 10**6)
+    assert vault.total_debt_shares(usdc) == vault.positions(second_uid)[4]
+
+    vault.close_position(second_uid, 2000 * 10**6)
+    assert vault.total_debt_shares(usdc) == 0
+
+
+def test_reduce_position_burns_debt_shares_of_the_position_only(vault, weth, usdc, owner):
+    first_uid, _ = open_position(vault, owner, weth, usdc)
+    boa.env.time_travel(seconds=7 * 24 * 60 * 60)
+    second_uid, _ = open_position(vault, owner, weth, usdc)
+    boa.env.time_travel(seconds=7 * 24 * 60 * 60)
+
+    vault.reduce_position(first_uid, vault.positions(first_uid)[6] // 3, 1)
+    assert vault.total_debt_shares(usdc) == (
+        vault.positions(first_uid)[4] + vault.positions(second_uid)[4]
+    )
+
+    vault.close_position(first_uid, 2000 * 10**6)
+    vault.close_position(second_uid, 2000 * 10**6)
+    assert vault.total_debt_shares(usdc) == 0
+
+
 def test_close_position_in_bad_debt_records_bad_debt(vault, usdc, weth, owner):
     position_uid, _ = open_position(vault, owner, weth, usdc)
     bad_debt_before = vault.bad_debt(usdc)
@@ -2,13 +2,9 @@ import pytest
 import boa
 
 
-@pytest.fixture(scope="session")
-def setup(vault, mock_router, owner, weth, usdc):
-    vault.set_swap_router(mock_router.address)
-    vault.set_is_whitelisted_dex(owner, True)
-    usdc.approve(vault.address, 999999999999999999)
-    vault.fund_account(usdc, 1000000000)
-    vault.provide_liquidity(usdc, 1000000000000, False)
+@pytest.fixture(autouse=True)
+def setup(funded_vault):
+    return funded_vault
 
 
 def open_position(vault, owner, weth, usdc):
@@ -214,3 +210,49 @@ def test_liquidate_008(vault, owner, alice, weth, usdc, eth_usd_oracle):
     )
 
     assert vault.margin(owner, usdc) == margin_before - loss
+
+
+def test_liquidate_many_liquidates_all_liquidatable_positions(vault, owner, weth, usdc, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+    position_uid_1, _ = open_position(vault, owner, weth, usdc)
+    position_uid_2, _ = open_position(vault, owner, weth, usdc)
+
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    assert vault.is_liquidatable(position_uid_1)
+    assert vault.is_liquidatable(position_uid_2)
+
+    liquidated = vault.liquidate_many([position_uid_1, position_uid_2])
+
+    assert liquidated == [True, True]
+    assert vault.position_amount(position_uid_1) == 0
+    assert vault.position_amount(position_uid_2) == 0
+
+
+def test_liquidate_many_skips_positions_that_are_not_liquidatable(vault, owner, weth, usdc, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+    liquidatable_uid, _ = open_position(vault, owner, weth, usdc)
+    healthy_uid, _ = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        int(0.081 * 10**18),  # min_position_amount_out
+        usdc,  # debt_token
+        50 * 10**6,  # debt_amount
+        50 * 10**6,  # margin_amount
+    )
+    closed_uid, _ = open_position(vault, owner, weth, usdc)
+    vault.close_position(closed_uid, vault.debt(closed_uid))
+
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    unknown_uid = b"\x01" * 32
+
+    liquidated = vault.liquidate_many([liquidatable_uid, healthy_uid, closed_uid, unknown_uid])
+
+    assert liquidated == [True, False, False, False]
+    assert vault.position_amount(liquidatable_uid) == 0
+    assert vault.position_amount(healthy_uid) == int(0.081 * 10**18)
+
+
+def test_liquidate_many_unauthorized(vault, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            vault.liquidate_many([])
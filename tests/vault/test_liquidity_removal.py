@@ -4,7 +4,7 @@ import boa
 BASE_LP = False
 SAFETY_MODULE = True
 
-@pytest.fixture(scope="session")
+@pytest.fixture(autouse=True)
 def setup(owner, vault, weth, usdc, alice):
     weth.approve(vault, 1000*10**18)
     usdc.approve(vault, 1000000*10**6)
@@ -73,4 +73,5 @@ def test_can_withdraw_liquidity_after_cooldown_expires(vault, usdc):
 
     boa.env.time_travel(30)
 
-    vault.withdraw_liquidity(usdc, amount, BASE_LP)
\ No newline at end of file
+    # the first LP owns one share less than amount * 10**18
+    vault.withdraw_liquidity(usdc, amount // 2, BASE_LP)
\ No newline at end of file
@@ -4,7 +4,7 @@ import boa
 BASE_LP = False
 SAFETY_MODULE = True
 
-@pytest.fixture(scope="session")
+@pytest.fixture(autouse=True)
 def setup(owner, vault, weth, usdc, alice):
     weth.approve(vault, 1000*10**18)
     usdc.approve(vault, 1000000*10**6)
@@ -4,12 +4,8 @@ import boa
 BASE_LP = False
 
 @pytest.fixture(autouse=True)
-def setup(vault, mock_router, owner, usdc, weth):
-    vault.set_swap_router(mock_router.address)
-    vault.set_is_whitelisted_dex(owner, True)
-    usdc.approve(vault.address, 999999999999999999)
-    vault.fund_account(usdc.address, 1000000000)
-    vault.provide_liquidity(usdc, 1000000000000, BASE_LP)
+def setup(funded_vault):
+    return funded_vault
 
 
 def test_can_add_margin(vault, owner, weth, usdc, mock_router, eth_usd_oracle):
@@ -9,7 +9,9 @@ def test_market_order_slippage(vault, weth, usdc):
     assert vault.to_usd_oracle_price(weth.address) == 1234_00000000
     assert vault.internal._quote_token_to_token(weth, usdc, 1 * 10**18) == 1234_000000
 
-    min_amount_out = vault.internal._market_order_min_amount_out(weth, usdc, 1 * 10**18)
+    prices = [vault.to_usd_oracle_price(weth), vault.to_usd_oracle_price(usdc)]
+
+    min_amount_out = vault.internal._market_order_min_amount_out(weth, usdc, 1 * 10**18, prices)
     assert min_amount_out == 1234_000000 * 0.95
 
 
@@ -19,6 +21,6 @@ def test_market_order_slippage(vault, weth, usdc):
     assert vault.to_usd_oracle_price(weth.address) == 1234_00000000
     assert vault.internal._quote_token_to_token(weth, usdc, 2 * 10**18) == 2468_000000
 
-    min_amount_out = vault.internal._market_order_min_amount_out(weth, usdc, 2 * 10**18)
+    min_amount_out = vault.internal._market_order_min_amount_out(weth, usdc, 2 * 10**18, prices)
     expected = 2468_000000 * 0.82
     assert min_amount_out == pytest.approx(expected)
\ No newline at end of file
@@ -5,12 +5,8 @@ BASE_LP = False
 
 
 @pytest.fixture(autouse=True)
-def setup(vault, mock_router, owner, usdc):
-    vault.set_swap_router(mock_router.address)
-    vault.set_is_whitelisted_dex(owner, True)
-    usdc.approve(vault.address, 999999999999999999)
-    vault.fund_account(usdc, 1000000000)
-    vault.provide_liquidity(usdc, 1000000000000, False)
+def setup(funded_vault):
+    return funded_vault
 
 
 def test_open_position_records_position(vault, owner, weth, usdc):
@@ -0,0 +1,75 @@
+import pytest
+import boa
+
+
+@pytest.fixture(autouse=True)
+def setup(funded_vault, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+
+
+def open_position(vault, owner, weth, usdc):
+    margin_amount = 10 * 10**6
+    usdc_in = 90 * 10**6
+    min_weth_out = int(0.081 * 10**18)
+
+    uid, _ = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        min_weth_out,  # min_position_amount_out
+        usdc,  # debt_token
+        usdc_in,  # debt_amount
+        margin_amount,  # margin_amount
+    )
+
+    return uid
+
+
+def open_positions(vault, usdc, weth):
+    count = vault.open_positions_count(usdc, weth)
+    return vault.get_open_positions(usdc, weth, 0, count)
+
+
+def test_open_position_is_registered(vault, owner, weth, usdc):
+    before = open_positions(vault, usdc, weth)
+
+    uid = open_position(vault, owner, weth, usdc)
+
+    after = open_positions(vault, usdc, weth)
+    assert after == before + [uid]
+    assert vault.open_positions_count(weth, usdc) == 0
+
+
+def test_close_position_swaps_last_position_into_its_slot(vault, owner, weth, usdc):
+    before = open_positions(vault, usdc, weth)
+    uid1 = open_position(vault, owner, weth, usdc)
+    uid2 = open_position(vault, owner, weth, usdc)
+    uid3 = open_position(vault, owner, weth, usdc)
+
+    vault.close_position(uid1, 90 * 10**6)
+    assert open_positions(vault, usdc, weth) == before + [uid3, uid2]
+
+    vault.close_position(uid2, 90 * 10**6)
+    assert open_positions(vault, usdc, weth) == before + [uid3]
+
+    vault.close_position(uid3, 90 * 10**6)
+    assert open_positions(vault, usdc, weth) == before
+
+
+def test_liquidate_removes_position(vault, owner, weth, usdc, eth_usd_oracle):
+    before = open_positions(vault, usdc, weth)
+    uid = open_position(vault, owner, weth, usdc)
+
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    vault.liquidate(uid)
+
+    assert open_positions(vault, usdc, weth) == before
+
+
+def test_get_open_positions_is_paginated(vault, owner, weth, usdc):
+    count = vault.open_positions_count(usdc, weth)
+    uids = [open_position(vault, owner, weth, usdc) for _ in range(5)]
+
+    assert vault.get_open_positions(usdc, weth, count, 2) == uids[:2]
+    assert vault.get_open_positions(usdc, weth, count + 2, 2) == uids[2:4]
+    assert vault.get_open_positions(usdc, weth, count + 4, 2) == uids[4:]
+    assert vault.get_open_positions(usdc, weth, count + 5, 2) == []
@@ -0,0 +1,76 @@
+from collections import Counter
+
+import pytest
+from eth_utils import to_checksum_address
+
+# every oracle feed and the sequencer are read at most once per
+# Vault call, gas is tracked in tests/gas/gas_snapshot.json
+
+
+def called_addresses(computation):
+    for child in computation.children:
+        yield to_checksum_address(child.msg.code_address)
+        yield from called_addresses(child)
+
+
+@pytest.fixture
+def oracle_reads(eth_usd_oracle, usdc_usd_oracle, arbitrum_sequencer):
+    def reads(contract):
+        calls = Counter(called_addresses(contract._computation))
+        return [
+            calls[to_checksum_address(feed.address)]
+            for feed in (eth_usd_oracle, usdc_usd_oracle, arbitrum_sequencer)
+        ]
+
+    return reads
+
+
+def open_position(vault, owner, weth, usdc):
+    uid, _ = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        int(0.081 * 10**18),  # min_position_amount_out
+        usdc,  # debt_token
+        90 * 10**6,  # debt_amount
+        10 * 10**6,  # margin_amount
+    )
+    return uid
+
+
+def test_open_position_reads_each_feed_once(funded_vault, owner, weth, usdc, oracle_reads):
+    open_position(funded_vault, owner, weth, usdc)
+    assert oracle_reads(funded_vault) == [1, 1, 1]
+
+
+def test_close_position_without_market_order_reads_no_feed(
+    funded_vault, owner, weth, usdc, oracle_reads
+):
+    uid = open_position(funded_vault, owner, weth, usdc)
+    funded_vault.close_position(uid, 90 * 10**6)
+    assert oracle_reads(funded_vault) == [0, 0, 0]
+
+
+def test_reduce_position_market_order_reads_each_feed_once(
+    funded_vault, owner, weth, usdc, oracle_reads
+):
+    uid = open_position(funded_vault, owner, weth, usdc)
+    funded_vault.reduce_position(uid, int(0.04 * 10**18), 0)
+    assert oracle_reads(funded_vault) == [1, 1, 1]
+
+
+def test_liquidate_reads_each_feed_once(
+    funded_vault, owner, weth, usdc, eth_usd_oracle, oracle_reads
+):
+    uid = open_position(funded_vault, owner, weth, usdc)
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    funded_vault.liquidate(uid)
+    assert oracle_reads(funded_vault) == [1, 1, 1]
+
+
+def test_liquidate_many_reads_each_feed_once_per_market(
+    funded_vault, owner, weth, usdc, eth_usd_oracle, oracle_reads
+):
+    uids = [open_position(funded_vault, owner, weth, usdc) for _ in range(3)]
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    assert funded_vault.liquidate_many(uids) == [True, True, True]
+    assert oracle_reads(funded_vault) == [1, 1, 1]
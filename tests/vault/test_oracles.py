@@ -18,3 +18,9 @@ def test_token_to_token_conversion(vault, weth, usdc, usdc_usd_oracle, wbtc):
 
     weth_in_wbtc = vault.internal._quote_token_to_token(weth, wbtc, one_eth)
     assert weth_in_wbtc == 4099667  # ~0.041
+
+
+def test_token_decimals_recorded_on_whitelist(vault, weth, usdc, wbtc):
+    assert vault.token_decimals(weth) == 18
+    assert vault.token_decimals(usdc) == 6
+    assert vault.token_decimals(wbtc) == 8
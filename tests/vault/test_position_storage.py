@@ -0,0 +1,60 @@
+import pytest
+import boa
+from eth_utils import keccak
+
+# a Position is packed into 4 storage slots, gas is tracked in
+# tests/gas/gas_snapshot.json
+POSITION_SLOTS = 4
+AMOUNT_OFFSET = 2**160
+
+
+def open_position(vault, owner, weth, usdc):
+    return vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        int(0.081 * 10**18),  # min_position_amount_out
+        usdc,  # debt_token
+        90 * 10**6,  # debt_amount
+        10 * 10**6,  # margin_amount
+    )
+
+
+def position_slots(vault, uid):
+    layout = vault.compiler_data.storage_layout["storage_layout"]
+    slot = layout["packed_positions"]["slot"]
+    first = int.from_bytes(keccak(slot.to_bytes(32, "big") + uid), "big")
+    address = bytes.fromhex(vault.address[2:])
+    return [boa.env.vm.state.get_storage(address, first + i) for i in range(POSITION_SLOTS)]
+
+
+def test_position_is_packed_into_four_slots(funded_vault, owner, weth, usdc):
+    uid, amount_bought = open_position(funded_vault, owner, weth, usdc)
+    debt_shares = funded_vault.positions(uid)[4]
+
+    assert position_slots(funded_vault, uid) == [
+        int(owner, 16) + 10 * 10**6 * AMOUNT_OFFSET,
+        int(usdc.address, 16),
+        debt_shares,
+        int(weth.address, 16) + amount_bought * AMOUNT_OFFSET,
+    ]
+
+
+def test_close_position_clears_all_slots(funded_vault, owner, weth, usdc):
+    uid, _ = open_position(funded_vault, owner, weth, usdc)
+    funded_vault.close_position(uid, 90 * 10**6)
+
+    assert position_slots(funded_vault, uid) == [0] * POSITION_SLOTS
+
+
+def test_packed_position_getter(funded_vault, owner, weth, usdc):
+    uid, amount_bought = open_position(funded_vault, owner, weth, usdc)
+
+    position = funded_vault.positions(uid)
+    assert position[0] == uid
+    assert position[1:4] == (owner, usdc.address, 10 * 10**6)
+    assert position[5:] == (weth.address, amount_bought)
+    assert funded_vault.position_amount(uid) == amount_bought
+
+    funded_vault.close_position(uid, 90 * 10**6)
+    assert funded_vault.positions(uid)[0] == b"\x00" * 32
+    assert funded_vault.positions(uid)[1] == pytest.ZERO_ADDRESS
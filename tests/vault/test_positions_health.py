@@ -0,0 +1,73 @@
+import pytest
+import boa
+
+
+@pytest.fixture(autouse=True)
+def setup(funded_vault, eth_usd_oracle):
+    eth_usd_oracle.set_answer(1234_0000_0000)
+
+
+def open_position(vault, owner, weth, usdc):
+    margin_amount = 10 * 10**6
+    usdc_in = 90 * 10**6
+    min_weth_out = int(0.081 * 10**18)
+
+    uid, amount_bought = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        min_weth_out,  # min_position_amount_out
+        usdc,  # debt_token
+        usdc_in,  # debt_amount
+        margin_amount,  # margin_amount
+    )
+
+    return uid, amount_bought
+
+
+def test_positions_health_matches_single_position_views(vault, owner, weth, usdc):
+    uid1, _ = open_position(vault, owner, weth, usdc)
+    uid2, _ = open_position(vault, owner, weth, usdc)
+    boa.env.time_travel(seconds=60 * 60 * 24)
+
+    health = vault.positions_health([uid1, uid2])
+
+    assert len(health) == 2
+    for uid, h in zip([uid1, uid2], health):
+        debt, position_value, margin_amount, leverage, liquidatable, rate = h
+        assert debt == vault.debt(uid)
+        assert position_value == vault.position_amount(uid) * 1234_0000_0000 // 10**18
+        assert margin_amount == 10 * 10**6
+        assert leverage == vault.effective_leverage(uid)
+        assert liquidatable == vault.is_liquidatable(uid)
+        assert rate == vault.current_exchange_rate(uid)
+
+
+def test_positions_health_flags_liquidatable_positions(
+    vault, owner, weth, usdc, eth_usd_oracle
+):
+    uid, _ = open_position(vault, owner, weth, usdc)
+    assert not vault.positions_health([uid])[0][4]
+
+    eth_usd_oracle.set_answer(1133_0000_0000)
+    assert vault.positions_health([uid])[0][4]
+
+
+def test_positions_health_returns_empty_for_unknown_positions(vault, owner, weth, usdc):
+    uid, _ = open_position(vault, owner, weth, usdc)
+
+    health = vault.positions_health([b"\x01" * 32, uid])
+
+    assert health[0] == (0, 0, 0, 0, False, 0)
+    assert health[1][0] == vault.debt(uid)
+
+
+def test_positions_health_reverts_when_sequencer_down(
+    vault, owner, weth, usdc, arbitrum_sequencer
+):
+    uid, _ = open_position(vault, owner, weth, usdc)
+    arbitrum_sequencer.set_answer(1)
+
+    with boa.reverts("sequencer down"):
+        vault.positions_health([uid])
+
+    arbitrum_sequencer.set_answer(0)
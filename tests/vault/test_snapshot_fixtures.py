@@ -0,0 +1,39 @@
+import pytest
+import boa
+
+
+@pytest.fixture
+def lp_alice(vault, usdc, alice):
+    with boa.env.prank(alice):
+        usdc.approve(vault.address, 100 * 10**6)
+        vault.provide_liquidity(usdc, 100 * 10**6, False)
+
+
+def test_fixture_state_is_visible_in_test(vault, usdc, alice, lp_alice):
+    assert vault.base_lp_total_amount(usdc) == 100 * 10**6
+
+
+def test_fixture_state_is_rolled_back_after_test(vault, usdc, alice):
+    assert vault.base_lp_total_amount(usdc) == 0
+    assert usdc.allowance(alice, vault) == 0
+
+
+def test_funded_vault_checkpoint(funded_vault, owner, usdc, mock_router):
+    assert funded_vault.swap_router() == mock_router.address
+    assert funded_vault.margin(owner, usdc) == 1000 * 10**6
+    assert funded_vault.base_lp_total_amount(usdc) == 1_000_000 * 10**6
+
+
+def test_weth_position_checkpoint(weth_position, funded_vault, owner, usdc, weth):
+    assert funded_vault.positions(weth_position)[1:3] == (owner, usdc.address)
+    assert funded_vault.margin(owner, usdc) == 990 * 10**6
+    assert funded_vault.get_open_positions(usdc, weth, 0, 10) == [weth_position]
+
+
+def test_close_checkpoint_position(weth_position, funded_vault):
+    funded_vault.close_position(weth_position, 90 * 10**6)
+
+
+def test_checkpoint_is_restored_unchanged(weth_position, funded_vault, usdc, weth):
+    assert funded_vault.get_open_positions(usdc, weth, 0, 10) == [weth_position]
+
@@ -0,0 +1,81 @@
+import boa
+
+
+def open_position(vault, owner, weth, usdc):
+    uid, _ = vault.open_position(
+        owner,  # account
+        weth,  # position_token
+        int(0.081 * 10**18),  # min_position_amount_out
+        usdc,  # debt_token
+        90 * 10**6,  # debt_amount
+        10 * 10**6,  # margin_amount
+    )
+    return uid
+
+
+def approvals(vault):
+    return [log for log in vault.get_logs() if log.event_type.name == "Approval"]
+
+
+def test_swap_router_is_approved_per_swap_by_default(
+    funded_vault, owner, weth, usdc, mock_router
+):
+    assert funded_vault.swap_router_allowance(usdc) == 0
+
+    open_position(funded_vault, owner, weth, usdc)
+    assert len(approvals(funded_vault)) == 1
+    assert usdc.allowance(funded_vault, mock_router) == 0
+
+
+def test_standing_allowance_is_only_topped_up_when_too_low(
+    funded_vault, owner, weth, usdc, mock_router
+):
+    funded_vault.set_swap_router_allowance(usdc, 250 * 10**6)
+    assert usdc.allowance(funded_vault, mock_router) == 250 * 10**6
+
+    open_position(funded_vault, owner, weth, usdc)
+    open_position(funded_vault, owner, weth, usdc)
+    assert approvals(funded_vault) == []
+    assert usdc.allowance(funded_vault, mock_router) == 50 * 10**6
+
+    # tops up to the standing allowance, not to max_value(uint256)
+    open_position(funded_vault, owner, weth, usdc)
+    assert len(approvals(funded_vault)) == 1
+    assert usdc.allowance(funded_vault, mock_router) == 150 * 10**6
+
+
+def test_standing_allowance_below_swap_amount_approves_the_swap(
+    funded_vault, owner, weth, usdc, mock_router
+):
+    funded_vault.set_swap_router_allowance(usdc, 10 * 10**6)
+
+    open_position(funded_vault, owner, weth, usdc)
+    assert usdc.allowance(funded_vault, mock_router) == 0
+
+
+def test_zero_swap_router_allowance_revokes(funded_vault, owner, weth, usdc, mock_router):
+    funded_vault.set_swap_router_allowance(usdc, 250 * 10**6)
+    open_position(funded_vault, owner, weth, usdc)
+
+    funded_vault.set_swap_router_allowance(usdc, 0)
+    assert usdc.allowance(funded_vault, mock_router) == 0
+
+    open_position(funded_vault, owner, weth, usdc)
+    assert usdc.allowance(funded_vault, mock_router) == 0
+
+
+def test_replacing_swap_router_revokes_standing_allowances(
+    funded_vault, owner, weth, usdc, mock_router, swap_router
+):
+    funded_vault.set_swap_router_allowance(usdc, 250 * 10**6)
+    funded_vault.set_swap_router_allowance(weth, 10**18)
+
+    funded_vault.set_swap_router(swap_router)
+    assert usdc.allowance(funded_vault, mock_router) == 0
+    assert weth.allowance(funded_vault, mock_router) == 0
+
+
+def test_NON_admin_CANNOT_set_swap_router_allowance(funded_vault, usdc, alice):
+    with boa.env.prank(alice):
+        with boa.reverts("unauthorized"):
+            funded_vault.set_swap_router_allowance(usdc, 250 * 10**6)
@@ -122,91 +122,91 @@ def test_variable_interest_rate_setters_002(vault):
 
 
 def test_low_dynamic_utilization_rate_001(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 0
     )
     assert i == MIN_INTEREST_RATE
 
 
 def test_low_dynamic_utilization_rate_002(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, FOURTY_PERCENT
     )
     assert i == 11_50_000
 
 
 def test_low_dynamic_utilization_rate_003(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 70_00_000
     )
     assert i == 17_87_500
 
 
 def test_low_dynamic_utilization_rate_004(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, RATE_SWITCH_UTILIZATION
     )
     assert i == MID_INTEREST_RATE
 
 
 def test_low_dynamic_utilization_rate_005(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 0
     )
     assert i == 5_00_000
 
 
 def test_low_dynamic_utilization_rate_006(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 40_00_000
     )
     assert i == 33_00_000
 
 
 def test_low_dynamic_utilization_rate_007(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_low_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 50_00_000
     )
     assert i == 40_00_000
 
 
 def test_high_dynamic_utilization_rate_001(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, RATE_SWITCH_UTILIZATION
     )
     assert i == MID_INTEREST_RATE
 
 
 def test_high_dynamic_utilization_rate_002(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, NINETY_PERCENT
     )
     assert i == 60_00_000
 
 
 def test_high_dynamic_utilization_rate_003(vault_with_weth_interst_configured):
-    i = vault_with_weth_interst_configured.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interst_configured.internal._interest_rate_by_utilization(
         WETH_ADDRESS, ONE_HUNDRED_PERCENT
     )
     assert i == MAX_INTEREST_RATE
 
 
 def test_high_dynamic_utilization_rate_004(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 50_00_000
     )
     assert i == 40_00_000
 
 
 def test_high_dynamic_utilization_rate_005(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, 75_00_000
     )
     assert i == 80_00_000
 
 
 def test_high_dynamic_utilization_rate_006(vault_with_weth_interest_configured2):
-    i = vault_with_weth_interest_configured2.internal._dynamic_interest_rate_high_utilization(
+    i = vault_with_weth_interest_configured2.internal._interest_rate_by_utilization(
         WETH_ADDRESS, ONE_HUNDRED_PERCENT
     )
     assert i == 120_00_000
@@ -331,3 +331,44 @@ def test_variable_interest_rate_based_on_utilization_003(vault_configured, weth,
         expected_interest_per_second
         == vault_configured.internal._current_interest_per_second(usdc.address)
     )
+
+
+def test_variable_interest_rate_setters_003(vault):
+    # the interest rates must be increasing with the utilization
+    with boa.reverts("invalid interest rates"):
+        vault.set_variable_interest_parameters(
+            WETH_ADDRESS, 20_00_000, 3_00_000, 100_00_000, RATE_SWITCH_UTILIZATION
+        )
+
+    # the rate switch must be strictly between 0% and 100% utilization
+    with boa.reverts("invalid rate switch utilization"):
+        vault.set_variable_interest_parameters(
+            WETH_ADDRESS,
+            MIN_INTEREST_RATE,
+            MID_INTEREST_RATE,
+            MAX_INTEREST_RATE,
+            ONE_HUNDRED_PERCENT,
+        )
+
+
+def test_curve_endpoints_are_exact_with_uneven_slopes(vault):
+    # neither slope divides evenly
+    min_rate, mid_rate, max_rate, switch = 3_33_333, 21_11_111, 99_99_999, 77_77_777
+    vault.set_variable_interest_parameters(WETH_ADDRESS, min_rate, mid_rate, max_rate, switch)
+
+    def rate(utilization):
+        return vault.internal._interest_rate_by_utilization(WETH_ADDRESS, utilization)
+
+    assert rate(0) == min_rate
+    assert rate(switch) == mid_rate
+    assert rate(ONE_HUNDRED_PERCENT) == max_rate
+
+    # both lines stay within one unit of the exact rate
+    for utilization in (12_34_567, switch - 1, switch + 1, 88_88_888, ONE_HUNDRED_PERCENT - 1):
+        if utilization < switch:
+            exact = min_rate + (mid_rate - min_rate) * utilization // switch
+        else:
+            exact = mid_rate + (max_rate - mid_rate) * (utilization - switch) // (
+                ONE_HUNDRED_PERCENT - switch
+            )
+        assert exact <= rate(utilization) <= exact + 1